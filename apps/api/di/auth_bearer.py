@@ -1,7 +1,14 @@
 from __future__ import annotations
+import hmac
+from uuid import UUID
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .security_async import get_token_service
+from .container import get_user_repo
+from ..settings import settings
+from packages.core.application.identity.dto import PrincipalDTO
+from packages.infra.cache.principal import principal_cache
+from packages.infra.repos.core.user_repo import UserRepo
 from packages.infra.security.tokens_async import AsyncJWTService  # type: ignore
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -34,3 +41,37 @@ async def get_current_payload(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
+
+
+async def get_current_principal(
+    payload: dict = Depends(get_current_payload),
+    users: UserRepo = Depends(get_user_repo),
+) -> PrincipalDTO:
+    """User + roles + customer_id của token, lấy từ PrincipalCache (miss → 1 query)."""
+    try:
+        user_id = UUID(payload["sub"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    principal = await principal_cache.resolve(users, user_id)
+    if principal is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return principal
+
+async def require_admin(principal: PrincipalDTO = Depends(get_current_principal)) -> PrincipalDTO:
+    if "admin" not in principal.user.roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return principal
+
+async def require_internal_access(
+    request: Request,
+    creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    token_service: AsyncJWTService = Depends(get_token_service),
+    users: UserRepo = Depends(get_user_repo),
+) -> None:
+    """/internal/*: header X-Internal-Token khớp INTERNAL_API_TOKEN (scraper, probe) hoặc user admin."""
+    expected = settings.internal_api_token
+    given = request.headers.get("x-internal-token")
+    if expected and given and hmac.compare_digest(given.encode(), expected.encode()):
+        return
+    payload = await get_current_payload(request, creds, token_service)
+    await require_admin(await get_current_principal(payload, users))
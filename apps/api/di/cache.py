@@ -0,0 +1,9 @@
+from __future__ import annotations
+from ..settings import settings
+from packages.infra.cache.availability import AvailabilityCache
+
+availability_cache = AvailabilityCache(
+    ttl=settings.availability_cache_ttl,
+    maxsize=settings.availability_cache_size,
+    low_stock=settings.availability_low_stock,
+)
@@ -1,19 +1,29 @@
 
 from __future__ import annotations
 from datetime import timedelta
+from typing import AsyncGenerator, Optional
 from fastapi import Depends
 from sqlalchemy.orm import Session
 
 from apps.api.presenters.auth_cookies import AuthCookieManager, CookieConfig
-from packages.infra.db.session import get_session
+from packages.infra.db.session import get_session, use_primary
+from packages.infra.db.uow import UnitOfWork
 from packages.infra.repos.core.address_repo import AddressRepo
 from packages.infra.repos.core.auth_session_repo import AuthSessionRepo
+from packages.infra.repos.core.category_repo import CategoryRepo
 from packages.infra.repos.core.customer_repo import CustomerRepo
+from packages.infra.repos.core.inventory_repo import InventoryRepo
+from packages.infra.repos.core.product_card_repo import ProductCardRepo
+from packages.infra.repos.core.product_repo import ProductRepo
 from packages.infra.repos.core.refresh_token_repo import RefreshTokenRepo
 from packages.infra.repos.core.role_repo import RoleRepo
 from packages.infra.repos.core.user_repo import UserRepo
 from packages.infra.repos.core.login_attemp_repo import LoginAttemptRepo
+from packages.infra.security.lockout import LoginLockout, QueuedAttemptAudit, SqlLockoutBackend
 from packages.infra.security.passwords import default_password_hasher, BcryptPasswordHasher
+from apps.api.di.jobs import audit_writer
+from packages.infra.jobs.audit_writer import AuditWriter
+from apps.api.di.security_async import get_lockout_backend
 from packages.infra.security.tokens import TokenService
 from apps.api.settings import settings
 
@@ -36,9 +46,37 @@ def get_auth_cookie_manager() -> AuthCookieManager:
     )
     return AuthCookieManager(cfg)
 
+# ---------- Unit of work ----------
+async def get_uow(db: Session = Depends(get_session)) -> AsyncGenerator[UnitOfWork, None]:
+    """Cùng session với mọi repo trong request (FastAPI cache get_session theo request).
+
+    Có UoW là có ghi: ghim session vào primary để cả các SELECT trước lần ghi đầu
+    (vd. tra user lúc login, tra refresh token lúc rotate) không đọc replica bị trễ.
+    """
+    uow = UnitOfWork(use_primary(db))
+    try:
+        yield uow
+    except Exception:
+        await uow.rollback()
+        raise
+
+def pin_primary(db: Session = Depends(get_session)) -> None:
+    """Dependency cho route ghi không dùng UoW: mọi statement của request đi primary."""
+    use_primary(db)
+
 def get_login_attempt_repo(db: Session = Depends(get_session)) -> LoginAttemptRepo:
     return LoginAttemptRepo(db)
 
+def get_login_lockout(attempts: LoginAttemptRepo = Depends(get_login_attempt_repo)) -> LoginLockout:
+    backend = get_lockout_backend() or SqlLockoutBackend(attempts)
+    # Audit row đi qua AuditWriter: request không còn INSERT login_attempts trong transaction của nó
+    audit = QueuedAttemptAudit(audit_writer) if settings.audit_writer_enabled else attempts
+    return LoginLockout(backend, audit=audit)
+
+def get_audit_writer() -> Optional[AuditWriter]:
+    """Ghi ops.audit_logs cho sự kiện auth; None khi writer tắt (route bỏ qua audit)."""
+    return audit_writer if settings.audit_writer_enabled else None
+
 def get_auth_session_repo(db: Session = Depends(get_session)) -> AuthSessionRepo: 
     return AuthSessionRepo(db)
 
@@ -58,6 +96,18 @@ def get_customer_repo(db: Session = Depends(get_session)) -> CustomerRepo:
 def get_address_repo(db: Session = Depends(get_session)) -> AddressRepo:
     return AddressRepo(db)
 
+def get_product_repo(db: Session = Depends(get_session)) -> ProductRepo:
+    return ProductRepo(db)
+
+def get_product_card_repo(db: Session = Depends(get_session)) -> ProductCardRepo:
+    return ProductCardRepo(db)
+
+def get_category_repo(db: Session = Depends(get_session)) -> CategoryRepo:
+    return CategoryRepo(db)
+
+def get_inventory_repo(db: Session = Depends(get_session)) -> InventoryRepo:
+    return InventoryRepo(db, hold_ttl=timedelta(minutes=settings.inventory_hold_ttl_minutes))
+
 # ---------- App config ----------
 def get_access_token_ttl() -> timedelta:
     return timedelta(hours=settings.access_token_expires_hours)
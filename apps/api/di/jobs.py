@@ -0,0 +1,75 @@
+from __future__ import annotations
+from datetime import timedelta
+from ..settings import settings
+from packages.infra.db.partitions import PartitionedTable, PartitionManager
+from packages.infra.db.session import AsyncSessionLocal, engine
+from packages.infra.jobs.audit_writer import AuditWriter
+from packages.infra.jobs.outbox import FileSink, InMemorySink, OutboxDispatcher
+from packages.infra.jobs.product_cards import ProductCardRefresher
+from packages.infra.jobs.reservations import ReservationExpirer
+from packages.infra.jobs.retention import RetentionWorker, default_policies
+from packages.infra.repos.core.product_card_repo import card_refresh_queue
+
+# login_attempts phải giữ lâu hơn cửa sổ đếm lockout, nếu không COUNT sẽ thiếu
+login_attempts_retention = max(
+    timedelta(days=settings.retention_login_attempts_days),
+    timedelta(minutes=settings.login_window_minutes),
+)
+
+audit_writer = AuditWriter(
+    engine,
+    max_queue=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_ms / 1000,
+    overflow=settings.audit_overflow,
+    spill_path=settings.audit_spill_path,
+)
+
+outbox_dispatcher = OutboxDispatcher(
+    engine,
+    FileSink(settings.outbox_file_path) if settings.outbox_sink == "file" else InMemorySink(),
+    batch_size=settings.outbox_batch_size,
+    max_attempts=settings.outbox_max_attempts,
+    backoff_base=settings.outbox_backoff_base_seconds,
+    backoff_max=settings.outbox_backoff_max_seconds,
+    idle_sleep=settings.outbox_idle_sleep_ms / 1000,
+)
+
+partition_manager = PartitionManager(
+    engine,
+    [
+        PartitionedTable("ops", "login_attempts", "month", settings.partition_premake, login_attempts_retention),
+        PartitionedTable(
+            "ops", "audit_logs", "month", settings.partition_premake,
+            timedelta(days=settings.partition_audit_logs_retention_days)
+            if settings.partition_audit_logs_retention_days else None,
+        ),
+    ],
+)
+
+retention_worker = RetentionWorker(
+    engine,
+    default_policies(
+        # Khi bảng đã partition, retention của login_attempts là drop partition thay vì DELETE
+        login_attempts=None if settings.partition_maintenance_enabled else login_attempts_retention,
+        refresh_tokens=timedelta(days=settings.retention_refresh_tokens_days),
+        auth_sessions=timedelta(days=settings.retention_auth_sessions_days),
+        batch_size=settings.retention_batch_size,
+    ),
+    pause=settings.retention_batch_pause_ms / 1000,
+    max_batches_per_run=settings.retention_max_batches,
+)
+
+reservation_expirer = ReservationExpirer(
+    AsyncSessionLocal,
+    batch_size=settings.reservation_expiry_batch_size,
+)
+
+product_card_refresher = ProductCardRefresher(
+    engine,
+    card_refresh_queue,
+    currency=settings.product_card_currency,
+    batch_size=settings.product_card_refresh_batch_size,
+    sweep_interval=settings.product_card_sweep_interval_seconds,
+    stock_sweep_slice=settings.product_card_stock_sweep_slice,
+)
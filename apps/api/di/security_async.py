@@ -2,19 +2,66 @@
 from __future__ import annotations
 from datetime import timedelta
 from ..settings import settings
-from packages.infra.security.passwords_async import AsyncBcryptHasher  # type: ignore
+from packages.infra.security.hashing_pool import HashingExecutor
+from packages.infra.security.jwks import ASYMMETRIC_ALGORITHMS, KeyRing
+from packages.infra.security.lockout import InMemoryLockoutBackend, LockoutBackend, RedisLockoutBackend
+from packages.infra.security.passwords_async import MultiSchemeHasher  # type: ignore
 from packages.infra.security.tokens_async import AsyncJWTService  # type: ignore
 
-_password_hasher = AsyncBcryptHasher(rounds=12)
+hashing_executor = HashingExecutor(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    kind=settings.password_hash_pool,
+)
+_password_hasher = MultiSchemeHasher(
+    settings.password_scheme,
+    bcrypt_rounds=settings.bcrypt_rounds,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_parallelism=settings.argon2_parallelism,
+    executor=hashing_executor,
+)
+# Key cũ phải verify được tới khi token dài hạn nhất (refresh) ký bằng nó hết hạn
+keyring: KeyRing | None = None
+if settings.JWT_ALG in ASYMMETRIC_ALGORITHMS:
+    keyring = KeyRing.load(
+        settings.JWT_ALG,
+        grace=timedelta(days=settings.refresh_token_expires_days),
+        keys_dir=settings.JWT_KEYS_DIR,
+        # Worker khác reload + client hết cache JWKS trước khi token ký bằng key mới xuất hiện
+        publish_delay=timedelta(seconds=settings.JWT_KEY_RELOAD_SECONDS + settings.JWKS_MAX_AGE_SECONDS),
+    )
+
 _token_service = AsyncJWTService(
     secret=settings.JWT_SECRET,
     algorithm=settings.JWT_ALG,
     issuer=settings.JWT_ISS,
     audience=settings.JWT_AUD,
     default_ttl=timedelta(hours=12),
+    keyring=keyring,
 )
 
-async def get_password_hasher() -> AsyncBcryptHasher:
+def _build_lockout_backend() -> LockoutBackend | None:
+    opts = dict(
+        max_attempts=settings.login_max_attempts,
+        window=timedelta(minutes=settings.login_window_minutes),
+        lockout=timedelta(minutes=settings.login_lockout_minutes),
+    )
+    if settings.login_lockout_backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("LOGIN_LOCKOUT_BACKEND=redis requires REDIS_URL")
+        return RedisLockoutBackend.from_url(settings.redis_url, **opts)
+    if settings.login_lockout_backend == "memory":
+        return InMemoryLockoutBackend(**opts)
+    return None  # sql: backend gắn với session của request (xem container)
+
+# Process-wide: trạng thái lockout phải sống qua các request
+_lockout_backend = _build_lockout_backend()
+
+def get_lockout_backend() -> LockoutBackend | None:
+    return _lockout_backend
+
+async def get_password_hasher() -> MultiSchemeHasher:
     return _password_hasher
 
 async def create_refresh_token() -> AsyncJWTService:
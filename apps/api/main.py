@@ -1,12 +1,78 @@
 
 from __future__ import annotations
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 from apps.api.settings import settings
-from apps.api.routers.identity import router as auth_router, profile_router, addresses_router
+from apps.api.routers.identity import router as auth_router, profile_router, addresses_router, admin_users_router
+from apps.api.routers.catalog import router as catalog_router
+from apps.api.routers.internal import router as internal_router
+from apps.api.routers.wellknown import router as wellknown_router
+from apps.api.di.jobs import (
+    audit_writer, outbox_dispatcher, partition_manager, product_card_refresher, reservation_expirer,
+    retention_worker,
+)
+from apps.api.di.security_async import hashing_executor, keyring
+from packages.infra.db.partitions import run_partition_maintenance
+from packages.infra.db.session import engine, replica_engine
+from packages.infra.jobs.outbox import run_outbox_dispatcher
+from packages.infra.jobs.product_cards import run_product_card_refresher
+from packages.infra.jobs.reservations import run_reservation_expiry
+from packages.infra.jobs.retention import run_retention
+from packages.infra.security.jwks import run_key_rotation
+from packages.infra.security.hashing_pool import HashingPoolSaturated
 
-app = FastAPI(title=settings.app_name, version="0.1.0", debug=settings.debug)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks: list[asyncio.Task] = []
+    if settings.audit_writer_enabled:
+        await audit_writer.start()
+    if keyring is not None:
+        tasks.append(asyncio.create_task(run_key_rotation(
+            keyring,
+            interval=settings.JWT_KEY_RELOAD_SECONDS,
+            max_age=timedelta(days=settings.JWT_KEY_ROTATION_DAYS),
+        )))
+    if settings.partition_maintenance_enabled:
+        tasks.append(asyncio.create_task(run_partition_maintenance(
+            partition_manager,
+            interval=settings.partition_maintenance_interval_seconds,
+        )))
+    if settings.outbox_dispatcher_enabled:
+        tasks.append(asyncio.create_task(run_outbox_dispatcher(outbox_dispatcher)))
+    if settings.retention_enabled:
+        tasks.append(asyncio.create_task(run_retention(
+            retention_worker,
+            interval=settings.retention_interval_seconds,
+        )))
+    if settings.product_card_refresher_enabled:
+        tasks.append(asyncio.create_task(run_product_card_refresher(
+            product_card_refresher,
+            interval=settings.product_card_refresh_interval_ms / 1000,
+        )))
+    if settings.reservation_expiry_enabled:
+        tasks.append(asyncio.create_task(run_reservation_expiry(
+            reservation_expirer,
+            interval=settings.reservation_expiry_interval_seconds,
+        )))
+    yield
+    for t in tasks:
+        t.cancel()
+    # Chờ các job thực sự dừng (batch đang chạy, vd. DETACH CONCURRENTLY, nhận CancelledError
+    # và rollback) trước khi drain audit và đóng engine
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Drain audit queue trước khi engine bị đóng
+    await audit_writer.stop()
+    hashing_executor.shutdown()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+app = FastAPI(title=settings.app_name, version="0.1.0", debug=settings.debug, lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -17,10 +83,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Password hashing pool đầy → 503 thay vì xếp hàng vô hạn
+@app.exception_handler(HashingPoolSaturated)
+async def hashing_saturated_handler(request: Request, exc: HashingPoolSaturated):
+    return JSONResponse(status_code=503, content={"detail": "Server busy. Try again later."}, headers={"Retry-After": "1"})
+
 # Routers
 app.include_router(auth_router)
 app.include_router(profile_router)
 app.include_router(addresses_router)
+app.include_router(admin_users_router)
+app.include_router(catalog_router)
+app.include_router(wellknown_router)
+if settings.internal_endpoints_enabled:
+    app.include_router(internal_router)
 
 # Health
 @app.get("/healthz")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+import json
+from decimal import Decimal
+from typing import Annotated, Any, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from apps.api.di.cache import availability_cache
+from apps.api.di.container import get_category_repo, get_inventory_repo, get_product_card_repo, get_product_repo
+from apps.api.settings import settings
+from packages.core.application.catalog.dto import (
+    CategoryCrumb, CategoryNode, ProductListFilters, ProductListPage, ProductSearchPage, ProductSort,
+)
+from packages.core.application.inventory.dto import VariantAvailability
+from packages.infra.repos.core.category_repo import CategoryRepo
+from packages.infra.repos.core.inventory_repo import InventoryRepo
+from packages.infra.repos.core.product_card_repo import ProductCardRepo
+from packages.infra.repos.core.product_repo import ProductRepo
+from packages.infra.repos.exceptions import InvalidCursor, NotFoundError
+
+router = APIRouter(prefix="/api/catalog", tags=["catalog"])
+
+def _json_object(raw: Optional[str], name: str) -> Optional[Dict[str, Any]]:
+    if not raw:
+        return None
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a JSON object")
+    if not isinstance(value, dict):
+        raise HTTPException(status_code=400, detail=f"{name} must be a JSON object")
+    return value
+
+async def _list_page(
+    products: ProductRepo,
+    cards: ProductCardRepo,
+    filters: ProductListFilters,
+    *,
+    sort: ProductSort,
+    cursor: Optional[str],
+    size: int,
+) -> ProductListPage:
+    """Đọc core.product_cards (một bảng, không join) khi filter được read model hỗ trợ;
+    filter theo attributes của variant hoặc currency khác thì query trực tiếp bảng gốc."""
+    try:
+        if settings.catalog_read_model_enabled and cards.supports(filters):
+            page = await cards.list_cards(filters, sort=sort, cursor=cursor, size=size)
+        else:
+            page = await products.list_products(filters, sort=sort, cursor=cursor, size=size)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProductListPage(items=page.items, size=page.size, next_cursor=page.next_cursor)
+
+@router.get("/products", response_model=ProductListPage)
+async def list_products(
+    products: Annotated[ProductRepo, Depends(get_product_repo)],
+    cards: Annotated[ProductCardRepo, Depends(get_product_card_repo)],
+    brand_id: Annotated[List[UUID], Query()] = [],
+    category_id: Annotated[List[UUID], Query()] = [],
+    include_subcategories: bool = True,
+    specs: Annotated[Optional[str], Query(description='JSON object, vd {"socket": "AM5"}')] = None,
+    attributes: Annotated[Optional[str], Query(description='JSON object, vd {"color": "black"}')] = None,
+    price_min: Optional[Decimal] = None,
+    price_max: Optional[Decimal] = None,
+    currency: Annotated[str, Query(min_length=3, max_length=3)] = "VND",
+    sort: ProductSort = "newest",
+    cursor: Optional[str] = None,
+    size: Annotated[int, Query(ge=1, le=100)] = 24,
+):
+    """Listing sản phẩm đang bán: một câu SQL, keyset cursor (`next_cursor`).
+
+    `category_id` mặc định gồm cả category con (closure table); `include_subcategories=false`
+    chỉ lấy sản phẩm gắn trực tiếp.
+    """
+    filters = ProductListFilters(
+        brand_ids=brand_id,
+        category_ids=category_id,
+        include_descendants=include_subcategories,
+        specs=_json_object(specs, "specs"),
+        attributes=_json_object(attributes, "attributes"),
+        price_min=price_min,
+        price_max=price_max,
+        currency=currency.upper(),
+    )
+    return await _list_page(products, cards, filters, sort=sort, cursor=cursor, size=size)
+
+@router.get("/search", response_model=ProductSearchPage)
+async def search_products(
+    products: Annotated[ProductRepo, Depends(get_product_repo)],
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    brand_id: Annotated[List[UUID], Query()] = [],
+    category_id: Annotated[List[UUID], Query()] = [],
+    specs: Annotated[Optional[str], Query(description='JSON object, vd {"socket": "AM5"}')] = None,
+    price_min: Optional[Decimal] = None,
+    price_max: Optional[Decimal] = None,
+    currency: Annotated[str, Query(min_length=3, max_length=3)] = "VND",
+    cursor: Optional[str] = None,
+    size: Annotated[int, Query(ge=1, le=100)] = 24,
+):
+    """Tìm sản phẩm theo tên / model / brand / specs (không dấu, khớp tiền tố, model gõ gần đúng),
+    xếp theo độ liên quan; filter giống listing."""
+    filters = ProductListFilters(
+        brand_ids=brand_id,
+        category_ids=category_id,
+        specs=_json_object(specs, "specs"),
+        price_min=price_min,
+        price_max=price_max,
+        currency=currency.upper(),
+    )
+    try:
+        page = await products.search_products(q, filters, cursor=cursor, size=size)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProductSearchPage(items=page.items, size=page.size, next_cursor=page.next_cursor)
+
+@router.get("/availability", response_model=List[VariantAvailability])
+async def variant_availability(
+    inventory: Annotated[InventoryRepo, Depends(get_inventory_repo)],
+    variant_id: Annotated[List[UUID], Query(min_length=1, max_length=200)],
+):
+    """Còn hàng / sắp hết / hết hàng cho các variant trên trang (cache theo variant, miss nạp một query)."""
+    found = await availability_cache.get_many(inventory, variant_id)
+    return list(found.values())
+
+@router.get("/categories/{category_id}/products", response_model=ProductListPage)
+async def list_category_products(
+    category_id: UUID,
+    products: Annotated[ProductRepo, Depends(get_product_repo)],
+    cards: Annotated[ProductCardRepo, Depends(get_product_card_repo)],
+    brand_id: Annotated[List[UUID], Query()] = [],
+    specs: Annotated[Optional[str], Query(description='JSON object, vd {"socket": "AM5"}')] = None,
+    attributes: Annotated[Optional[str], Query(description='JSON object, vd {"color": "black"}')] = None,
+    price_min: Optional[Decimal] = None,
+    price_max: Optional[Decimal] = None,
+    currency: Annotated[str, Query(min_length=3, max_length=3)] = "VND",
+    sort: ProductSort = "newest",
+    cursor: Optional[str] = None,
+    size: Annotated[int, Query(ge=1, le=100)] = 24,
+):
+    """Sản phẩm của category và mọi category con; category không tồn tại → trang rỗng."""
+    filters = ProductListFilters(
+        brand_ids=brand_id,
+        category_ids=[category_id],
+        specs=_json_object(specs, "specs"),
+        attributes=_json_object(attributes, "attributes"),
+        price_min=price_min,
+        price_max=price_max,
+        currency=currency.upper(),
+    )
+    return await _list_page(products, cards, filters, sort=sort, cursor=cursor, size=size)
+
+@router.get("/categories/{category_id}/breadcrumb", response_model=List[CategoryCrumb])
+async def category_breadcrumb(
+    category_id: UUID,
+    categories: Annotated[CategoryRepo, Depends(get_category_repo)],
+):
+    """Đường dẫn từ category gốc tới category này."""
+    try:
+        return await categories.breadcrumb(category_id)
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+@router.get("/categories/{category_id}/subtree", response_model=List[CategoryNode])
+async def category_subtree(
+    category_id: UUID,
+    categories: Annotated[CategoryRepo, Depends(get_category_repo)],
+    max_depth: Annotated[Optional[int], Query(ge=0, le=32)] = None,
+):
+    """Category và các category con (theo depth rồi name); client tự dựng cây từ parent_id."""
+    try:
+        return await categories.subtree(category_id, max_depth=max_depth)
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Category not found")
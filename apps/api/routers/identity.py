@@ -2,11 +2,12 @@
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 import hashlib
-from typing import Annotated
+import logging
+from typing import Annotated, Optional
 from uuid import UUID
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
@@ -15,21 +16,50 @@ from apps.api.presenters.auth_cookies import AuthCookieManager
 from packages.core.application.errors import AlreadyExists, AuthenticationError
 
 from apps.api.di.security_async import get_password_hasher, get_token_service
-from apps.api.di.auth_bearer import get_current_payload
-from apps.api.di.container import get_auth_cookie_manager, get_auth_session_repo, get_login_attempt_repo, get_refresh_token_pepper, get_refresh_token_repo, get_refresh_token_ttl, get_user_repo, get_role_repo, get_customer_repo, get_address_repo, get_access_token_ttl
-from packages.core.application.identity.dto import AddressDTO, AddressInput, ChangePasswordInput, LoginInput, LoginResponse, RegisterInput, TokenResponse, UpdateProfileInput, UserDTO, user_to_dto
-from packages.core.application.identity.use_cases import AddAddress, ChangePassword, LoginUser, RegisterUser, UpdateProfile
+from apps.api.di.auth_bearer import get_current_payload, get_current_principal, require_admin
+from apps.api.di.container import get_uow, pin_primary, get_audit_writer, get_auth_cookie_manager, get_auth_session_repo, get_login_lockout, get_refresh_token_pepper, get_refresh_token_repo, get_refresh_token_ttl, get_user_repo, get_role_repo, get_customer_repo, get_address_repo, get_access_token_ttl
+from packages.core.application.identity.dto import AddressDTO, AddressInput, AdminUserSearchPage, ChangePasswordInput, LoginInput, LoginResponse, PrincipalDTO, RegisterInput, TokenResponse, UpdateProfileInput, UserDTO, user_to_dto
+from packages.core.application.identity.use_cases import AddAddress, ChangePassword, LoginUser, RegisterUser, RehashPassword, UpdateProfile
 from packages.core.application.ports.security_async import IAsyncPasswordHasher, IAsyncTokenService
+from packages.infra.cache.principal import principal_cache
+from packages.infra.db.session import session_scope
+from packages.infra.db.uow import UnitOfWork
+from packages.infra.jobs.audit_writer import AuditWriter
 from packages.infra.repos.core.address_repo import AddressRepo
 from packages.infra.repos.core.auth_session_repo import AuthSessionRepo
 from packages.infra.repos.core.customer_repo import CustomerRepo
-from packages.infra.repos.core.login_attemp_repo import LoginAttemptRepo
 from packages.infra.repos.core.refresh_token_repo import RefreshTokenRepo
 from packages.infra.repos.core.role_repo import RoleRepo
 from packages.infra.repos.core.user_repo import UserRepo
+from packages.infra.repos.exceptions import InvalidCursor
+from packages.infra.security.lockout import LoginLockout
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _hash_refresh_token(token: str, pepper: str) -> str:
+    return hashlib.sha256((token + pepper).encode("utf-8")).hexdigest()
+
+async def _rehash_password(user_id: UUID, plain: str, old_hash: str, hasher: IAsyncPasswordHasher) -> None:
+    """Chạy sau khi response đã gửi, với session riêng (session của request đã đóng)."""
+    try:
+        async with session_scope() as s:
+            await RehashPassword(UserRepo(s), hasher).execute(user_id, plain, old_hash)
+    except Exception:
+        logger.warning("password rehash failed for user %s", user_id, exc_info=True)
+
+async def _audit(writer: Optional[AuditWriter], event: str, request: Request, *, user_id: Optional[UUID], **meta) -> None:
+    """Enqueue một dòng ops.audit_logs (sau commit); audit không được làm hỏng request."""
+    if writer is None:
+        return
+    meta["ip"] = request.client.host if request.client else None
+    meta["user_agent"] = request.headers.get("user-agent")
+    try:
+        await writer.audit(event, user_id=user_id, meta=meta)
+    except Exception:
+        logger.warning("audit enqueue failed for %s", event, exc_info=True)
+
 @router.post("/register", response_model=UserDTO, status_code=201)
 async def register_user(
     body: RegisterInput,
@@ -37,8 +67,9 @@ async def register_user(
     roles: Annotated[RoleRepo, Depends(get_role_repo)],
     customers: Annotated[CustomerRepo, Depends(get_customer_repo)],
     hasher: Annotated[IAsyncPasswordHasher, Depends(get_password_hasher)],
+    uow: Annotated[UnitOfWork, Depends(get_uow)],
 ):
-    uc = RegisterUser(users, roles, customers, hasher)
+    uc = RegisterUser(users, roles, customers, hasher, uow)
     try:
         return await uc.execute(body)
     except AlreadyExists as e:
@@ -48,44 +79,54 @@ async def register_user(
 async def login_user(
     request: Request,
     body: LoginInput,
+    background: BackgroundTasks,
     users: Annotated[UserRepo, Depends(get_user_repo)],
     hasher: Annotated[IAsyncPasswordHasher, Depends(get_password_hasher)],
     tokens: Annotated[IAsyncTokenService, Depends(get_token_service)],
     access_ttl: Annotated[timedelta, Depends(get_access_token_ttl)],
     refresh_ttl: Annotated[timedelta, Depends(get_refresh_token_ttl)],
     cookies: Annotated[AuthCookieManager, Depends(get_auth_cookie_manager)],
-    attempts: Annotated[LoginAttemptRepo, Depends(get_login_attempt_repo)],
+    attempts: Annotated[LoginLockout, Depends(get_login_lockout)],
     sessions: Annotated[AuthSessionRepo, Depends(get_auth_session_repo)],
     refresh_repo: Annotated[RefreshTokenRepo, Depends(get_refresh_token_repo)],
     refresh_pepper: Annotated[str, Depends(get_refresh_token_pepper)],
+    uow: Annotated[UnitOfWork, Depends(get_uow)],
+    audit: Annotated[Optional[AuditWriter], Depends(get_audit_writer)],
 ):
     now = datetime.now(timezone.utc)
     ip = request.client.host if request.client else None
     ua = request.headers.get("user-agent")
 
+    async def fail(status_code: int, detail: str) -> HTTPException:
+        # Lần thử thất bại vẫn phải được lưu: commit (1 lần) rồi mới trả lỗi
+        await attempts.add(email=body.email, ip=ip or "", success=False)
+        await uow.commit()
+        return HTTPException(status_code=status_code, detail=detail)
+
     # 1) Rate-limit/lockout
     locked_until = await attempts.is_locked(body.email, ip or "")
     if locked_until and locked_until > now:
-        await attempts.add(email=body.email, ip=ip or "", success=False)
-        raise HTTPException(status_code=429, detail="Too many attempts. Try again later.")
+        raise await fail(429, "Too many attempts. Try again later.")
 
     # 2) Tìm user + verify mật khẩu
     try:
         user = await users.search_by_email(body.email)
     except Exception:
-        await attempts.add(email=body.email, ip=ip or "", success=False)
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+        raise await fail(401, "Invalid credentials")
 
     if not getattr(user, "is_active", True):
-        await attempts.add(email=body.email, ip=ip or "", success=False)
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+        raise await fail(401, "Invalid credentials")
 
     if not await hasher.verify(body.password, getattr(user, "password_hash")):
-        await attempts.add(email=body.email, ip=ip or "", success=False)
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+        raise await fail(401, "Invalid credentials")
 
     await attempts.add(email=body.email, ip=ip or "", success=True)
 
+    # Hash cũ (scheme/cost khác cấu hình hiện hành) → nâng cấp nền sau khi trả response
+    password_hash = getattr(user, "password_hash")
+    if hasher.needs_rehash(password_hash):
+        background.add_task(_rehash_password, getattr(user, "id"), body.password, password_hash, hasher)
+
     # 3) (MFA: later) — nếu bật thì return requires_mfa tại đây
 
     # 4) Tạo auth_session
@@ -100,7 +141,7 @@ async def login_user(
         expires_delta=refresh_ttl,
         extra=refresh_payload,
     )
-    token_hash = hashlib.sha256((refresh_token + refresh_pepper).encode("utf-8")).hexdigest()
+    token_hash = _hash_refresh_token(refresh_token, refresh_pepper)
     await refresh_repo.add(
         user_id=getattr(user, "id"),
         session_id=getattr(session, "id"),
@@ -119,8 +160,10 @@ async def login_user(
         extra=access_payload,
     )
 
-    # 7) Update users.last_login_at
-    await users.update(user, {"last_login_at": now}, commit=True, refresh=False)
+    # 7) Update users.last_login_at, rồi commit cả attempt + session + refresh token một lần
+    await users.update(user, {"last_login_at": now}, commit=False, refresh=False)
+    await uow.commit()
+    await _audit(audit, "auth.login", request, user_id=getattr(user, "id"), session_id=str(getattr(session, "id")))
 
     # 8) Set cookie access_token & refresh_token
     user_dto = user_to_dto(user)
@@ -134,6 +177,87 @@ async def login_user(
     cookies.set_refresh(resp, refresh_token, refresh_ttl)    
     return resp
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_tokens(
+    request: Request,
+    users: Annotated[UserRepo, Depends(get_user_repo)],
+    tokens: Annotated[IAsyncTokenService, Depends(get_token_service)],
+    access_ttl: Annotated[timedelta, Depends(get_access_token_ttl)],
+    refresh_ttl: Annotated[timedelta, Depends(get_refresh_token_ttl)],
+    cookies: Annotated[AuthCookieManager, Depends(get_auth_cookie_manager)],
+    sessions: Annotated[AuthSessionRepo, Depends(get_auth_session_repo)],
+    refresh_repo: Annotated[RefreshTokenRepo, Depends(get_refresh_token_repo)],
+    refresh_pepper: Annotated[str, Depends(get_refresh_token_pepper)],
+    uow: Annotated[UnitOfWork, Depends(get_uow)],
+    audit: Annotated[Optional[AuditWriter], Depends(get_audit_writer)],
+):
+    """Đổi refresh token lấy cặp access/refresh mới (rotation).
+
+    Token đã bị thay thế mà vẫn được trình lại = bị lộ → thu hồi cả family + phiên.
+    """
+    now = datetime.now(timezone.utc)
+    presented = request.cookies.get(cookies.cfg.refresh_name)
+    if not presented:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        claims = await tokens.decode(presented)
+        if claims.get("type") != "refresh":
+            raise ValueError("not a refresh token")
+        jti = UUID(claims["jti"])
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # 1) Tra token theo PK (jti) + hash trong một query
+    row = await refresh_repo.find_for_rotation(jti, _hash_refresh_token(presented, refresh_pepper))
+    if row is None or row.expires_at <= now:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    async def reuse_detected() -> HTTPException:
+        await refresh_repo.revoke_family(row.family_id)
+        await sessions.revoke(row.session_id)
+        await uow.commit()
+        await _audit(
+            audit, "auth.refresh_reuse", request,
+            user_id=row.user_id, session_id=str(row.session_id), family_id=str(row.family_id),
+        )
+        return HTTPException(status_code=401, detail="Refresh token reuse detected")
+
+    if row.revoked_at is not None:
+        raise await reuse_detected()
+
+    principal = await principal_cache.resolve(users, row.user_id)
+    if principal is None or not principal.user.is_active:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # 2) Phát hành refresh mới cùng family/session, rồi revoke + insert trong một câu lệnh
+    new_jti = uuid.uuid4()
+    refresh_token = await tokens.create_refresh_token(
+        str(row.user_id),
+        expires_delta=refresh_ttl,
+        extra={"type": "refresh", "jti": str(new_jti), "fam": str(row.family_id), "sid": str(row.session_id)},
+    )
+    rotated = await refresh_repo.rotate(
+        jti,
+        new_jti=new_jti,
+        token_hash=_hash_refresh_token(refresh_token, refresh_pepper),
+        expires_at=now + refresh_ttl,
+        ip=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent"),
+    )
+    if not rotated:
+        # Request song song đã rotate token này trước → cũng là reuse
+        raise await reuse_detected()
+
+    access_payload = {"type": "access", "sid": str(row.session_id), "roles": principal.user.roles, "email": str(principal.user.email)}
+    access_token = await tokens.create_access_token(str(row.user_id), expires_delta=access_ttl, extra=access_payload)
+    await uow.commit()
+
+    resp = JSONResponse(content=TokenResponse(access_token=access_token, token_type="bearer").model_dump(mode="json"))
+    cookies.set_access(resp, access_token, access_ttl)
+    cookies.set_refresh(resp, refresh_token, refresh_ttl)
+    return resp
+
 @router.post("/logout", status_code=204)
 async def logout():
     resp = JSONResponse(content=None, status_code=204)
@@ -142,16 +266,14 @@ async def logout():
 
 @router.get("/me", response_model=UserDTO)
 async def me(
-    payload: Annotated[dict, Depends(get_current_payload)],
-    users: Annotated[UserRepo, Depends(get_user_repo)],
+    principal: Annotated[PrincipalDTO, Depends(get_current_principal)],
 ):
-    user = await users.get(UUID(payload["sub"]))
-    return UserDTO.model_validate(user.__dict__ | {"roles": [r.code for r in getattr(user, "roles", [])]})
+    return principal.user
 
 # Profile
 profile_router = APIRouter(prefix="/users", tags=["users"])
 
-@profile_router.patch("/{user_id}/profile", response_model=UserDTO)
+@profile_router.patch("/{user_id}/profile", response_model=UserDTO, dependencies=[Depends(pin_primary)])
 async def update_profile(
     user_id: UUID,
     body: UpdateProfileInput,
@@ -164,41 +286,64 @@ async def update_profile(
     body.user_id = user_id
     return await uc.execute(body)
 
-@profile_router.post("/{user_id}/change-password", status_code=204)
+@profile_router.post("/{user_id}/change-password", status_code=204, dependencies=[Depends(pin_primary)])
 async def change_password(
     user_id: UUID,
     body: ChangePasswordInput,
+    request: Request,
     users: Annotated[UserRepo, Depends(get_user_repo)],
     hasher: Annotated[IAsyncPasswordHasher, Depends(get_password_hasher)],
     payload: Annotated[dict, Depends(get_current_payload)],
+    audit: Annotated[Optional[AuditWriter], Depends(get_audit_writer)],
 ):
     if str(payload["sub"]) != str(user_id) and "admin" not in payload.get("roles", []):
         raise HTTPException(status_code=403, detail="Forbidden")
     uc = ChangePassword(users, hasher)
     await uc.execute(body.model_copy(update={"user_id": user_id}))
+    await _audit(audit, "auth.password_changed", request, user_id=user_id, actor_id=str(payload["sub"]))
     return
 
+# Admin
+admin_users_router = APIRouter(prefix="/admin/users", tags=["admin"])
+
+@admin_users_router.get("", response_model=AdminUserSearchPage)
+async def admin_search_users(
+    users: Annotated[UserRepo, Depends(get_user_repo)],
+    principal: Annotated[PrincipalDTO, Depends(require_admin)],
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    is_active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    size: Annotated[int, Query(ge=1, le=200)] = 50,
+):
+    """Tìm user theo email (tiền tố / chứa) hoặc tên (gần đúng, không dấu), xếp theo độ liên quan."""
+    try:
+        page = await users.search_admin(q, is_active=is_active, cursor=cursor, size=size)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AdminUserSearchPage(items=page.items, size=page.size, next_cursor=page.next_cursor)
+
 # Addresses (current user)
 addresses_router = APIRouter(prefix="/me/addresses", tags=["addresses"])
 
+def _require_customer_id(principal: PrincipalDTO) -> UUID:
+    if principal.customer_id is None:
+        raise HTTPException(status_code=404, detail="Customer profile not found")
+    return principal.customer_id
+
 @addresses_router.get("", response_model=list[AddressDTO])
 async def list_my_addresses(
-    customers: Annotated[CustomerRepo, Depends(get_customer_repo)],
     addresses: Annotated[AddressRepo, Depends(get_address_repo)],
-    payload: Annotated[dict, Depends(get_current_payload)],
+    principal: Annotated[PrincipalDTO, Depends(get_current_principal)],
 ):
-    c = await customers.by_user_id(UUID(payload["sub"]))
-    rows = await addresses.list_by_customer(c.id)
+    rows = await addresses.list_by_customer(_require_customer_id(principal))
     return [AddressDTO.model_validate(r.__dict__) for r in rows]
 
-@addresses_router.post("", response_model=AddressDTO, status_code=201)
+@addresses_router.post("", response_model=AddressDTO, status_code=201, dependencies=[Depends(pin_primary)])
 async def add_my_address(
     body: AddressInput,
-    customers: Annotated[CustomerRepo, Depends(get_customer_repo)],
     addresses: Annotated[AddressRepo, Depends(get_address_repo)],
-    payload: Annotated[dict, Depends(get_current_payload)],
+    principal: Annotated[PrincipalDTO, Depends(get_current_principal)],
 ):
-    c = await customers.by_user_id(UUID(payload["sub"]))
-    body.customer_id = c.id
+    body.customer_id = _require_customer_id(principal)
     uc = AddAddress(addresses)
     return await uc.execute(body)
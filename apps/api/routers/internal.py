@@ -0,0 +1,68 @@
+
+from __future__ import annotations
+from fastapi import APIRouter, Depends
+
+from apps.api.di.cache import availability_cache
+from apps.api.di.jobs import (
+    audit_writer, outbox_dispatcher, partition_manager, product_card_refresher, reservation_expirer,
+    retention_worker,
+)
+from apps.api.di.auth_bearer import require_internal_access
+from apps.api.di.security_async import _token_service, hashing_executor
+from packages.infra.db.pool_metrics import pool_snapshot
+from packages.infra.db.session import engine, replica_engine
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_access)],
+)
+
+@router.get("/db/pool")
+async def db_pool():
+    pools = {"primary": pool_snapshot(engine)}
+    if replica_engine is not None:
+        pools["replica"] = pool_snapshot(replica_engine)
+    return pools
+
+@router.get("/security/hashing")
+async def password_hashing():
+    return {
+        "kind": hashing_executor.kind,
+        "workers": hashing_executor.workers,
+        "max_pending": hashing_executor.max_pending,
+        **hashing_executor.metrics.as_dict(),
+    }
+
+@router.get("/security/tokens")
+async def verified_token_cache():
+    return _token_service.verified_cache.stats()
+
+@router.get("/cache/availability")
+async def availability_cache_stats():
+    return availability_cache.stats()
+
+@router.get("/jobs/retention")
+async def retention_jobs():
+    return retention_worker.snapshot()
+
+@router.get("/jobs/partitions")
+async def partition_jobs():
+    return partition_manager.snapshot()
+
+@router.get("/jobs/audit-writer")
+async def audit_writer_stats():
+    return audit_writer.snapshot()
+
+@router.get("/jobs/outbox")
+async def outbox_stats():
+    return outbox_dispatcher.snapshot()
+
+@router.get("/jobs/reservations")
+async def reservation_jobs():
+    return reservation_expirer.snapshot()
+
+@router.get("/jobs/product-cards")
+async def product_card_jobs():
+    return product_card_refresher.snapshot()
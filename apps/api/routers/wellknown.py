@@ -0,0 +1,15 @@
+
+from __future__ import annotations
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from apps.api.di.security_async import keyring
+from apps.api.settings import settings
+
+router = APIRouter(tags=["well-known"])
+
+@router.get("/.well-known/jwks.json")
+async def jwks():
+    # HS256 (shared secret) không có public key để công bố
+    body = keyring.jwks() if keyring is not None else {"keys": []}
+    return JSONResponse(content=body, headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"})
@@ -9,16 +9,109 @@ class Settings(BaseSettings):
     app_name: str = "AskGear API"
     debug: bool = True
     cors_origins: list[str] = Field(default_factory=lambda: ["*"])
+    # /internal/* (pool, hashing, cache, job stats): tắt mặc định; bật thì cần admin hoặc X-Internal-Token
+    internal_endpoints_enabled: bool = Field(default=False, env="INTERNAL_ENDPOINTS_ENABLED")
+    internal_api_token: str | None = Field(default=None, env="INTERNAL_API_TOKEN")
     
     database_url_sync: str = Field(..., alias="DATABASE_URL_SYNC")
     database_url_async: str = Field(..., alias="DATABASE_URL_ASYNC")
 
+    # Pool: tổng connection mỗi worker process = DB_POOL_SIZE + DB_MAX_OVERFLOW,
+    # nhân với số worker gunicorn/uvicorn phải < max_connections của Postgres.
+    db_pool_size: int = Field(default=5, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, env="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=30.0, env="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=1800, env="DB_POOL_RECYCLE")  # giây, -1 = không recycle
+    # pre-ping = 1 round-trip mỗi lần checkout; có thể tắt khi đã recycle đủ ngắn
+    db_pool_pre_ping: bool = Field(default=True, env="DB_POOL_PRE_PING")
+    # Cache prepared statement phía SQLAlchemy (asyncpg adapter) và phía asyncpg;
+    # đặt DB_STATEMENT_CACHE_SIZE=0 khi đi qua pgbouncer transaction mode.
+    db_prepared_statement_cache_size: int = Field(default=100, env="DB_PREPARED_STATEMENT_CACHE_SIZE")
+    db_statement_cache_size: int = Field(default=100, env="DB_STATEMENT_CACHE_SIZE")
+
     access_token_expires_hours: int = Field(default=12, env="ACCESS_TOKEN_EXPIRES_HOURS")
     default_customer_role: str = Field(default="customer", env="DEFAULT_CUSTOMER_ROLE")
 
+    # Login lockout: memory (per-process) | redis (shared) | sql (COUNT trên ops.login_attempts)
+    login_lockout_backend: Literal["memory", "redis", "sql"] = Field(default="memory", env="LOGIN_LOCKOUT_BACKEND")
+    login_max_attempts: int = Field(default=5, env="LOGIN_MAX_ATTEMPTS")
+    login_window_minutes: int = Field(default=15, env="LOGIN_WINDOW_MINUTES")
+    login_lockout_minutes: int = Field(default=15, env="LOGIN_LOCKOUT_MINUTES")
+    # memory:// = LocalRedis trong process (dev/test, không chia sẻ giữa worker)
+    redis_url: str | None = Field(default=None, env="REDIS_URL")
+
+    # Password hashing: scheme cho hash mới; hash cũ được nâng cấp dần khi login
+    password_scheme: Literal["bcrypt", "argon2"] = Field(default="bcrypt", env="PASSWORD_SCHEME")
+    bcrypt_rounds: int = Field(default=12, env="BCRYPT_ROUNDS")
+    argon2_time_cost: int = Field(default=2, env="ARGON2_TIME_COST")
+    argon2_memory_cost: int = Field(default=102400, env="ARGON2_MEMORY_COST")  # KiB
+    argon2_parallelism: int = Field(default=8, env="ARGON2_PARALLELISM")
+
+    # Password hashing pool (tách khỏi default executor của asyncio)
+    password_hash_pool: Literal["thread", "process"] = Field(default="thread", env="PASSWORD_HASH_POOL")
+    password_hash_workers: int | None = Field(default=None, env="PASSWORD_HASH_WORKERS")  # None = số CPU
+    password_hash_max_pending: int = Field(default=64, env="PASSWORD_HASH_MAX_PENDING")
+
     refresh_token_expires_days: int = Field(default=30, env="REFRESH_TOKEN_EXPIRES_DAYS")
     refresh_token_pepper: str = Field(env="REFRESH_TOKEN_PEPPER")
 
+    # Retention worker cho ops.login_attempts / refresh_tokens / auth_sessions
+    retention_enabled: bool = Field(default=True, env="RETENTION_ENABLED")
+    retention_interval_seconds: int = Field(default=600, env="RETENTION_INTERVAL_SECONDS")
+    retention_login_attempts_days: int = Field(default=30, env="RETENTION_LOGIN_ATTEMPTS_DAYS")
+    retention_refresh_tokens_days: int = Field(default=7, env="RETENTION_REFRESH_TOKENS_DAYS")  # tính từ expires_at
+    retention_auth_sessions_days: int = Field(default=30, env="RETENTION_AUTH_SESSIONS_DAYS")
+    retention_batch_size: int = Field(default=5000, env="RETENTION_BATCH_SIZE")
+    retention_batch_pause_ms: int = Field(default=100, env="RETENTION_BATCH_PAUSE_MS")
+    retention_max_batches: int = Field(default=200, env="RETENTION_MAX_BATCHES")
+
+    # Partition theo tháng cho ops.audit_logs / ops.login_attempts (migration c3d81f0a9b12)
+    partition_maintenance_enabled: bool = Field(default=True, env="PARTITION_MAINTENANCE_ENABLED")
+    partition_maintenance_interval_seconds: int = Field(default=3600, env="PARTITION_MAINTENANCE_INTERVAL_SECONDS")
+    partition_premake: int = Field(default=3, env="PARTITION_PREMAKE")
+    partition_audit_logs_retention_days: int | None = Field(default=365, env="PARTITION_AUDIT_LOGS_RETENTION_DAYS")
+
+    # Audit writer: ghi ops.login_attempts / ops.audit_logs theo batch, ngoài đường request
+    audit_writer_enabled: bool = Field(default=True, env="AUDIT_WRITER_ENABLED")
+    audit_queue_size: int = Field(default=10000, env="AUDIT_QUEUE_SIZE")
+    audit_batch_size: int = Field(default=500, env="AUDIT_BATCH_SIZE")
+    audit_flush_ms: int = Field(default=200, env="AUDIT_FLUSH_MS")
+    audit_overflow: Literal["block", "drop", "spill"] = Field(default="drop", env="AUDIT_OVERFLOW")
+    audit_spill_path: str | None = Field(default=None, env="AUDIT_SPILL_PATH")
+
+    # Outbox dispatcher (ops.event_outbox)
+    outbox_dispatcher_enabled: bool = Field(default=False, env="OUTBOX_DISPATCHER_ENABLED")
+    outbox_sink: Literal["memory", "file"] = Field(default="file", env="OUTBOX_SINK")
+    outbox_file_path: str = Field(default="outbox-events.jsonl", env="OUTBOX_FILE_PATH")
+    outbox_batch_size: int = Field(default=100, env="OUTBOX_BATCH_SIZE")
+    outbox_max_attempts: int = Field(default=10, env="OUTBOX_MAX_ATTEMPTS")
+    outbox_backoff_base_seconds: float = Field(default=1.0, env="OUTBOX_BACKOFF_BASE_SECONDS")
+    outbox_backoff_max_seconds: float = Field(default=600.0, env="OUTBOX_BACKOFF_MAX_SECONDS")
+    outbox_idle_sleep_ms: int = Field(default=1000, env="OUTBOX_IDLE_SLEEP_MS")
+
+    # Listing đọc từ read model core.product_cards khi filter cho phép
+    catalog_read_model_enabled: bool = Field(default=True, env="CATALOG_READ_MODEL_ENABLED")
+    # Card lưu giá theo một currency; migration f2c6a8d03b57 đọc cùng biến môi trường khi backfill
+    product_card_currency: str = Field(default="VND", env="PRODUCT_CARD_CURRENCY")
+    # Refresher: refresh hoãn sau commit (checkout), giá hẹn giờ tới hạn, quét lệch in_stock
+    product_card_refresher_enabled: bool = Field(default=True, env="PRODUCT_CARD_REFRESHER_ENABLED")
+    product_card_refresh_interval_ms: int = Field(default=1000, env="PRODUCT_CARD_REFRESH_INTERVAL_MS")
+    product_card_sweep_interval_seconds: int = Field(default=60, env="PRODUCT_CARD_SWEEP_INTERVAL_SECONDS")
+    product_card_refresh_batch_size: int = Field(default=200, env="PRODUCT_CARD_REFRESH_BATCH_SIZE")
+    product_card_stock_sweep_slice: int = Field(default=5000, env="PRODUCT_CARD_STOCK_SWEEP_SLICE")
+
+    # Cache tồn khả dụng theo variant (catalog /availability), dựng ở apps/api/di/cache.py
+    availability_cache_ttl: float = Field(default=30.0, env="AVAILABILITY_CACHE_TTL")
+    availability_cache_size: int = Field(default=100000, env="AVAILABILITY_CACHE_SIZE")
+    # available <= ngưỡng này → band "low"
+    availability_low_stock: int = Field(default=5, env="AVAILABILITY_LOW_STOCK")
+
+    # Giữ hàng khi checkout (core.inventory_reservations) + job trả hàng của hold hết hạn
+    inventory_hold_ttl_minutes: int = Field(default=15, env="INVENTORY_HOLD_TTL_MINUTES")
+    reservation_expiry_enabled: bool = Field(default=True, env="RESERVATION_EXPIRY_ENABLED")
+    reservation_expiry_interval_seconds: int = Field(default=30, env="RESERVATION_EXPIRY_INTERVAL_SECONDS")
+    reservation_expiry_batch_size: int = Field(default=500, env="RESERVATION_EXPIRY_BATCH_SIZE")
+
     # Legacy secret (if used elsewhere)
     secret_key: str = Field("dev-secret-key-change-me", env="SECRET_KEY")
 
@@ -27,6 +120,12 @@ class Settings(BaseSettings):
     JWT_ALG: str = Field(default="HS256", env="JWT_ALG")
     JWT_ISS: str = Field(default="askgear", env="JWT_ISS")
     JWT_AUD: str | None = Field(default=None, env="JWT_AUD")
+    # RS256/EdDSA: thư mục chứa private key <kid>.pem (trống → sinh key trong process, chỉ dùng dev)
+    JWT_KEYS_DIR: str | None = Field(default=None, env="JWT_KEYS_DIR")
+    JWT_KEY_ROTATION_DAYS: int = Field(default=30, env="JWT_KEY_ROTATION_DAYS")
+    JWT_KEY_RELOAD_SECONDS: int = Field(default=300, env="JWT_KEY_RELOAD_SECONDS")
+    # Cache-Control max-age của /.well-known/jwks.json; key mới chỉ dùng để ký sau reload + max-age
+    JWKS_MAX_AGE_SECONDS: int = Field(default=300, env="JWKS_MAX_AGE_SECONDS")
 
     # Cookie
     cookie_access_name: str = "access_token"
@@ -0,0 +1,49 @@
+"""core.category_closure: category hierarchy index
+
+Revision ID: a4e7d2b96c18
+Revises: f2c6a8d03b57
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e7d2b96c18'
+down_revision: Union[str, None] = 'f2c6a8d03b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('category_closure',
+    sa.Column('ancestor_id', sa.UUID(), nullable=False),
+    sa.Column('descendant_id', sa.UUID(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['core.categories.id'], name=op.f('fk_category_closure_ancestor_id_categories'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['core.categories.id'], name=op.f('fk_category_closure_descendant_id_categories'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id', name=op.f('pk_category_closure')),
+    schema='core'
+    )
+    op.create_index('ix_category_closure_descendant', 'category_closure', ['descendant_id', 'depth'], unique=False, schema='core')
+
+    # Backfill từ parent_id; sau đó duy trì bởi listener trong CategoryRepo
+    op.execute("""
+    WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0 FROM core.categories
+        UNION ALL
+        SELECT t.ancestor_id, c.id, t.depth + 1
+        FROM tree t JOIN core.categories c ON c.parent_id = t.descendant_id
+        WHERE t.depth < 64
+    )
+    INSERT INTO core.category_closure (ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, descendant_id, depth FROM tree
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_category_closure_descendant', table_name='category_closure', schema='core')
+    op.drop_table('category_closure', schema='core')
@@ -0,0 +1,27 @@
+"""ops.login_attempts.ip nullable (request không có client IP)
+
+Revision ID: b4e1f7c2d903
+Revises: e7c2a9f41d08
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e1f7c2d903'
+down_revision: Union[str, None] = 'e7c2a9f41d08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bảng partitioned: ALTER trên bảng cha áp cho mọi partition
+    op.execute("ALTER TABLE ops.login_attempts ALTER COLUMN ip DROP NOT NULL")
+
+
+def downgrade() -> None:
+    op.execute("UPDATE ops.login_attempts SET ip = '0.0.0.0' WHERE ip IS NULL")
+    op.execute("ALTER TABLE ops.login_attempts ALTER COLUMN ip SET NOT NULL")
@@ -0,0 +1,88 @@
+"""product search: unaccent + pg_trgm, products.search_vector trigger and GIN indexes
+
+Revision ID: b8d3f61e2a97
+Revises: a4e7d2b96c18
+Create Date: 2026-10-18 14:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3f61e2a97'
+down_revision: Union[str, None] = 'a4e7d2b96c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # unaccent() chỉ STABLE (phụ thuộc dictionary) → wrapper IMMUTABLE, gọi rõ dictionary
+    # để dùng được trong index / trigger và ổn định với search_path
+    op.execute("""
+    CREATE OR REPLACE FUNCTION core.f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+
+    op.add_column('products', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True), schema='core')
+
+    # Trọng số: name/model A, brand B, giá trị specs C. Config 'simple' (không stemming tiếng Việt).
+    op.execute("""
+    CREATE OR REPLACE FUNCTION core.products_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', core.f_unaccent(coalesce(NEW.name, ''))), 'A') ||
+            setweight(to_tsvector('simple', core.f_unaccent(coalesce(NEW.model_number, ''))), 'A') ||
+            setweight(to_tsvector('simple', core.f_unaccent(coalesce(
+                (SELECT b.name FROM core.brands b WHERE b.id = NEW.brand_id), ''))), 'B') ||
+            setweight(to_tsvector('simple', core.f_unaccent(coalesce(
+                (SELECT string_agg(s.value, ' ') FROM jsonb_each_text(NEW.specs) s), ''))), 'C');
+        RETURN NEW;
+    END $$
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_products_search_vector
+    BEFORE INSERT OR UPDATE OF name, model_number, brand_id, specs ON core.products
+    FOR EACH ROW EXECUTE FUNCTION core.products_search_vector_update()
+    """)
+    # Đổi tên brand → tính lại vector các sản phẩm của brand (SET brand_id = brand_id kích trigger trên)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION core.brands_search_vector_touch() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE core.products SET brand_id = brand_id WHERE brand_id = NEW.id;
+        RETURN NULL;
+    END $$
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_brands_search_vector
+    AFTER UPDATE OF name ON core.brands
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION core.brands_search_vector_touch()
+    """)
+
+    op.execute("UPDATE core.products SET name = name")
+
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, schema='core',
+                    postgresql_using='gin')
+    op.create_index('ix_products_model_number_trgm', 'products', ['model_number'], unique=False, schema='core',
+                    postgresql_using='gin', postgresql_ops={'model_number': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_model_number_trgm', table_name='products', schema='core')
+    op.drop_index('ix_products_search_vector', table_name='products', schema='core')
+    op.execute("DROP TRIGGER IF EXISTS trg_brands_search_vector ON core.brands")
+    op.execute("DROP FUNCTION IF EXISTS core.brands_search_vector_touch()")
+    op.execute("DROP TRIGGER IF EXISTS trg_products_search_vector ON core.products")
+    op.execute("DROP FUNCTION IF EXISTS core.products_search_vector_update()")
+    op.drop_column('products', 'search_vector', schema='core')
+    op.execute("DROP FUNCTION IF EXISTS core.f_unaccent(text)")
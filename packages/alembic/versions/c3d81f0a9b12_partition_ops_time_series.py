@@ -0,0 +1,118 @@
+"""partition ops.audit_logs and ops.login_attempts by month
+
+Revision ID: c3d81f0a9b12
+Revises: a6f9ca9baec0
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d81f0a9b12'
+down_revision: Union[str, None] = 'a6f9ca9baec0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Số tháng tạo trước; sau đó PartitionManager (packages/infra/db/partitions.py) duy trì
+PREMAKE_MONTHS = 3
+
+TABLES = {
+    "login_attempts": {
+        "ts": "attempted_at",
+        "columns": """
+            id uuid NOT NULL,
+            email_canon citext NOT NULL,
+            ip inet NOT NULL,
+            attempted_at timestamptz NOT NULL DEFAULT now()
+        """,
+        "column_names": "id, email_canon, ip, attempted_at",
+        "constraints": "",
+        "indexes": {
+            "ix_login_attempts_email_time": "(email_canon, attempted_at)",
+            "ix_login_attempts_ip_time": "(ip, attempted_at)",
+        },
+    },
+    "audit_logs": {
+        "ts": "created_at",
+        "columns": """
+            id uuid NOT NULL,
+            user_id uuid NULL,
+            event text NOT NULL,
+            meta jsonb NOT NULL DEFAULT '{}'::jsonb,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz NOT NULL DEFAULT now()
+        """,
+        "column_names": "id, user_id, event, meta, created_at, updated_at",
+        "constraints": ", CONSTRAINT fk_audit_logs_user_id_users FOREIGN KEY (user_id) REFERENCES core.users (id)",
+        "indexes": {
+            "ix_audit_logs_created_at": "(created_at)",
+            "ix_audit_logs_meta_gin": "USING gin (meta)",
+        },
+    },
+}
+
+
+def _create_monthly_partitions(table: str, ts: str, source: str) -> None:
+    # Từ tháng của row cũ nhất trong `source` tới tháng hiện tại + PREMAKE_MONTHS (bound theo UTC)
+    op.execute(f"""
+    DO $$
+    DECLARE
+        s date;
+        stop date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{PREMAKE_MONTHS + 1} months')::date;
+    BEGIN
+        SELECT date_trunc('month', coalesce(min({ts}), now()) AT TIME ZONE 'UTC')::date INTO s FROM ops.{source};
+        WHILE s < stop LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS ops.%I PARTITION OF ops.{table} FOR VALUES FROM (%L) TO (%L)',
+                '{table}_p' || to_char(s, 'YYYYMM'),
+                s::timestamp AT TIME ZONE 'UTC',
+                (s + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+            );
+            s := (s + interval '1 month')::date;
+        END LOOP;
+    END $$;
+    """)
+
+
+def _rename_existing(table: str, spec: dict, suffix: str) -> None:
+    op.execute(f"ALTER TABLE ops.{table} RENAME TO {table}{suffix}")
+    op.execute(f"ALTER TABLE ops.{table}{suffix} RENAME CONSTRAINT pk_{table} TO pk_{table}{suffix}")
+    for name in spec["indexes"]:
+        op.execute(f"ALTER INDEX ops.{name} RENAME TO {name}{suffix}")
+
+
+def upgrade() -> None:
+    for table, spec in TABLES.items():
+        _rename_existing(table, spec, "_legacy")
+        # Khoá chính của bảng partitioned phải chứa cột partition key
+        op.execute(f"""
+        CREATE TABLE ops.{table} (
+            {spec["columns"]},
+            CONSTRAINT pk_{table} PRIMARY KEY (id, {spec["ts"]}){spec["constraints"]}
+        ) PARTITION BY RANGE ({spec["ts"]})
+        """)
+        for name, cols in spec["indexes"].items():
+            op.execute(f"CREATE INDEX {name} ON ops.{table} {cols}")
+        _create_monthly_partitions(table, spec["ts"], f"{table}_legacy")
+        op.execute(f"INSERT INTO ops.{table} ({spec['column_names']}) SELECT {spec['column_names']} FROM ops.{table}_legacy")
+        op.execute(f"DROP TABLE ops.{table}_legacy")
+
+
+def downgrade() -> None:
+    for table, spec in TABLES.items():
+        _rename_existing(table, spec, "_partitioned")
+        op.execute(f"""
+        CREATE TABLE ops.{table} (
+            {spec["columns"]},
+            CONSTRAINT pk_{table} PRIMARY KEY (id){spec["constraints"]}
+        )
+        """)
+        for name, cols in spec["indexes"].items():
+            op.execute(f"CREATE INDEX {name} ON ops.{table} {cols}")
+        op.execute(f"INSERT INTO ops.{table} ({spec['column_names']}) SELECT {spec['column_names']} FROM ops.{table}_partitioned")
+        # DROP bảng partitioned kéo theo mọi partition
+        op.execute(f"DROP TABLE ops.{table}_partitioned")
@@ -0,0 +1,38 @@
+"""admin user search: trigram indexes on users.email / full_name + email prefix index
+
+Revision ID: c5a1e8f4b2d6
+Revises: b8d3f61e2a97
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a1e8f4b2d6'
+down_revision: Union[str, None] = 'b8d3f61e2a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# pg_trgm và core.f_unaccent đã có từ b8d3f61e2a97 (product search).
+# citext không có opclass trigram / pattern → index trên biểu thức email::text.
+INDEXES = [
+    ("ix_users_email_trgm", "USING gin ((email::text) gin_trgm_ops)"),
+    ("ix_users_email_prefix", "(lower(email::text) text_pattern_ops)"),
+    ("ix_users_full_name_trgm", "USING gin (core.f_unaccent(full_name) gin_trgm_ops)"),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY: core.users đang được đọc/ghi (login), không khoá ghi trong lúc build
+    with op.get_context().autocommit_block():
+        for name, spec in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON core.users {spec}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS core.{name}")
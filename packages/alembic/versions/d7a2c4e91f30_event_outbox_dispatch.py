@@ -0,0 +1,41 @@
+"""event_outbox dispatch columns and pending partial index
+
+Revision ID: d7a2c4e91f30
+Revises: c3d81f0a9b12
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a2c4e91f30'
+down_revision: Union[str, None] = 'c3d81f0a9b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('event_outbox', 'published', server_default=sa.text('false'), schema='ops')
+    op.add_column('event_outbox', sa.Column('published_at', postgresql.TIMESTAMP(timezone=True), nullable=True), schema='ops')
+    op.add_column('event_outbox', sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False), schema='ops')
+    op.add_column('event_outbox', sa.Column('available_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False), schema='ops')
+    op.add_column('event_outbox', sa.Column('last_error', sa.Text(), nullable=True), schema='ops')
+    op.add_column('event_outbox', sa.Column('dead_lettered_at', postgresql.TIMESTAMP(timezone=True), nullable=True), schema='ops')
+    op.create_index('ix_event_outbox_pending', 'event_outbox', ['created_at'], unique=False, schema='ops',
+                    postgresql_where=sa.text('NOT published AND dead_lettered_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_outbox_pending', table_name='event_outbox', schema='ops',
+                  postgresql_where=sa.text('NOT published AND dead_lettered_at IS NULL'))
+    op.drop_column('event_outbox', 'dead_lettered_at', schema='ops')
+    op.drop_column('event_outbox', 'last_error', schema='ops')
+    op.drop_column('event_outbox', 'available_at', schema='ops')
+    op.drop_column('event_outbox', 'attempts', schema='ops')
+    op.drop_column('event_outbox', 'published_at', schema='ops')
+    op.alter_column('event_outbox', 'published', server_default=None, schema='ops')
@@ -0,0 +1,57 @@
+"""inventory reservations (holds) + reserved/on_hand check
+
+Revision ID: d9f4b7a1c3e5
+Revises: c5a1e8f4b2d6
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f4b7a1c3e5'
+down_revision: Union[str, None] = 'c5a1e8f4b2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_reservations',
+    sa.Column('hold_id', sa.UUID(), nullable=False),
+    sa.Column('reference', sa.String(), nullable=True),
+    sa.Column('variant_id', sa.UUID(), nullable=False),
+    sa.Column('location_id', sa.UUID(), nullable=False),
+    sa.Column('qty', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), server_default=sa.text("'active'"), nullable=False),
+    sa.Column('expires_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('qty > 0', name=op.f('ck_inventory_reservations_qty_pos')),
+    sa.CheckConstraint("status IN ('active', 'committed', 'released', 'expired')", name=op.f('ck_inventory_reservations_status')),
+    sa.ForeignKeyConstraint(['location_id'], ['core.inventory_locations.id'], name=op.f('fk_inventory_reservations_location_id_inventory_locations'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['variant_id'], ['core.product_variants.id'], name=op.f('fk_inventory_reservations_variant_id_product_variants'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_inventory_reservations')),
+    schema='core'
+    )
+    op.create_index('ix_inventory_reservations_hold_id', 'inventory_reservations', ['hold_id'], unique=False, schema='core')
+    op.create_index('ix_inventory_reservations_active_expires', 'inventory_reservations', ['expires_at'], unique=False, schema='core',
+                    postgresql_where=sa.text("status = 'active'"))
+
+    # NOT VALID: không quét (và khoá) cả bảng lúc thêm; row mới / row bị UPDATE vẫn được kiểm.
+    # Dữ liệu cũ sạch thì chạy riêng:
+    #   ALTER TABLE core.inventory_levels VALIDATE CONSTRAINT ck_inventory_levels_reserved_within_on_hand
+    op.execute(
+        "ALTER TABLE core.inventory_levels ADD CONSTRAINT ck_inventory_levels_reserved_within_on_hand "
+        "CHECK (reserved >= 0 AND reserved <= on_hand) NOT VALID"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(op.f('ck_inventory_levels_reserved_within_on_hand'), 'inventory_levels', schema='core', type_='check')
+    op.drop_index('ix_inventory_reservations_active_expires', table_name='inventory_reservations', schema='core')
+    op.drop_index('ix_inventory_reservations_hold_id', table_name='inventory_reservations', schema='core')
+    op.drop_table('inventory_reservations', schema='core')
@@ -0,0 +1,59 @@
+"""catalog listing: prices.effective_at timestamptz + listing indexes
+
+Revision ID: e5b19d7c4a06
+Revises: d7a2c4e91f30
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b19d7c4a06'
+down_revision: Union[str, None] = 'd7a2c4e91f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # effective_at là String ở bản init → sort theo chuỗi; chuyển sang timestamptz, NULL/'' = created_at
+    op.execute("""
+        ALTER TABLE core.prices
+        ALTER COLUMN effective_at TYPE timestamptz
+        USING COALESCE(NULLIF(effective_at, '')::timestamptz, created_at)
+    """)
+    op.alter_column('prices', 'effective_at', server_default=sa.text('now()'), nullable=False, schema='core')
+
+    op.create_index('ix_prices_variant_effective', 'prices', ['variant_id', 'currency', sa.text('effective_at DESC')],
+                    unique=False, schema='core', postgresql_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_products_specs_gin', 'products', ['specs'], unique=False, schema='core',
+                    postgresql_using='gin', postgresql_ops={'specs': 'jsonb_path_ops'})
+    op.create_index('ix_products_live_created', 'products', [sa.text('created_at DESC'), sa.text('id DESC')],
+                    unique=False, schema='core', postgresql_where=sa.text('deleted_at IS NULL AND is_published'))
+    op.create_index('ix_products_live_name', 'products', ['name', 'id'],
+                    unique=False, schema='core', postgresql_where=sa.text('deleted_at IS NULL AND is_published'))
+    op.create_index('ix_product_variants_product_id', 'product_variants', ['product_id'],
+                    unique=False, schema='core', postgresql_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_product_variants_attributes_gin', 'product_variants', ['attributes'], unique=False, schema='core',
+                    postgresql_using='gin', postgresql_ops={'attributes': 'jsonb_path_ops'})
+    op.create_index('ix_product_categories_category_id', 'product_categories', ['category_id', 'product_id'],
+                    unique=False, schema='core')
+    op.create_index('ix_media_assets_owner', 'media_assets', ['owner_type', 'owner_id', 'sort_order'],
+                    unique=False, schema='core', postgresql_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_assets_owner', table_name='media_assets', schema='core')
+    op.drop_index('ix_product_categories_category_id', table_name='product_categories', schema='core')
+    op.drop_index('ix_product_variants_attributes_gin', table_name='product_variants', schema='core')
+    op.drop_index('ix_product_variants_product_id', table_name='product_variants', schema='core')
+    op.drop_index('ix_products_live_name', table_name='products', schema='core')
+    op.drop_index('ix_products_live_created', table_name='products', schema='core')
+    op.drop_index('ix_products_specs_gin', table_name='products', schema='core')
+    op.drop_index('ix_prices_variant_effective', table_name='prices', schema='core')
+    op.alter_column('prices', 'effective_at', server_default=None, nullable=True, schema='core')
+    op.alter_column('prices', 'effective_at', type_=sa.String(), postgresql_using='effective_at::text', schema='core')
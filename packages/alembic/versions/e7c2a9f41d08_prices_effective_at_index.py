@@ -0,0 +1,31 @@
+"""prices.effective_at index for the product card refresher (scheduled prices)
+
+Revision ID: e7c2a9f41d08
+Revises: d9f4b7a1c3e5
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c2a9f41d08'
+down_revision: Union[str, None] = 'd9f4b7a1c3e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY: core.prices đang được listing đọc / admin ghi
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_prices_effective_at "
+            "ON core.prices (effective_at) WHERE deleted_at IS NULL"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS core.ix_prices_effective_at")
@@ -0,0 +1,100 @@
+"""core.product_cards read model
+
+Revision ID: f2c6a8d03b57
+Revises: e5b19d7c4a06
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8d03b57'
+down_revision: Union[str, None] = 'e5b19d7c4a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Cùng nguồn với Settings.product_card_currency (env / .env, env.py đã load_dotenv).
+# ProductCardRefresher dựng lại card nếu currency trong bảng lệch với setting.
+CARD_CURRENCY = os.getenv("PRODUCT_CARD_CURRENCY", "VND")
+if not (len(CARD_CURRENCY) == 3 and CARD_CURRENCY.isalpha()):
+    raise RuntimeError(f"PRODUCT_CARD_CURRENCY must be a 3-letter code, got {CARD_CURRENCY!r}")
+
+
+def upgrade() -> None:
+    op.create_table('product_cards',
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('slug', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('brand_id', sa.UUID(), nullable=True),
+    sa.Column('brand_name', sa.String(), nullable=True),
+    sa.Column('category_ids', postgresql.ARRAY(sa.UUID()), server_default=sa.text("'{}'::uuid[]"), nullable=False),
+    sa.Column('specs', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('price_min', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('price_max', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('compare_at', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('in_stock', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('refreshed_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['core.products.id'], name=op.f('fk_product_cards_product_id_products'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', name=op.f('pk_product_cards')),
+    schema='core'
+    )
+    op.create_index('ix_product_cards_created', 'product_cards', [sa.text('created_at DESC'), sa.text('product_id DESC')], unique=False, schema='core')
+    op.create_index('ix_product_cards_name', 'product_cards', ['name', 'product_id'], unique=False, schema='core')
+    op.create_index('ix_product_cards_price', 'product_cards', ['price_min', 'product_id'], unique=False, schema='core',
+                    postgresql_where=sa.text('price_min IS NOT NULL'))
+    op.create_index('ix_product_cards_brand_id', 'product_cards', ['brand_id'], unique=False, schema='core')
+    op.create_index('ix_product_cards_category_ids_gin', 'product_cards', ['category_ids'], unique=False, schema='core',
+                    postgresql_using='gin')
+    op.create_index('ix_product_cards_specs_gin', 'product_cards', ['specs'], unique=False, schema='core',
+                    postgresql_using='gin', postgresql_ops={'specs': 'jsonb_path_ops'})
+
+    # Backfill một lần; sau đó refresh tăng dần theo commit (ProductCardRepo / listener)
+    op.execute(f"""
+    INSERT INTO core.product_cards (product_id, slug, name, brand_id, brand_name, category_ids, specs, currency,
+                                    price_min, price_max, compare_at, in_stock, image_url, created_at, refreshed_at)
+    SELECT p.id, p.slug, p.name, p.brand_id, b.name,
+           (SELECT coalesce(array_agg(pc.category_id), '{{}}'::uuid[])
+              FROM core.product_categories pc WHERE pc.product_id = p.id),
+           p.specs, '{CARD_CURRENCY}', pv.price_min, pv.price_max, pv.compare_at,
+           EXISTS (SELECT 1 FROM core.inventory_levels il
+                     JOIN core.product_variants v ON v.id = il.variant_id
+                    WHERE v.product_id = p.id AND v.deleted_at IS NULL AND v.status = 'active'
+                      AND il.deleted_at IS NULL AND il.on_hand - il.reserved > 0),
+           (SELECT m.url FROM core.media_assets m
+             WHERE m.owner_type = 'product' AND m.owner_id = p.id AND m.deleted_at IS NULL
+             ORDER BY m.sort_order LIMIT 1),
+           p.created_at, now()
+    FROM core.products p
+    LEFT JOIN core.brands b ON b.id = p.brand_id
+    JOIN LATERAL (
+        SELECT min(lp.amount) AS price_min, max(lp.amount) AS price_max, max(lp.compare_at) AS compare_at
+        FROM core.product_variants v
+        LEFT JOIN LATERAL (
+            SELECT pr.amount, pr.compare_at FROM core.prices pr
+            WHERE pr.variant_id = v.id AND pr.deleted_at IS NULL
+              AND pr.currency = '{CARD_CURRENCY}' AND pr.effective_at <= now()
+            ORDER BY pr.effective_at DESC LIMIT 1
+        ) lp ON true
+        WHERE v.product_id = p.id AND v.deleted_at IS NULL AND v.status = 'active'
+    ) pv ON true
+    WHERE p.deleted_at IS NULL AND p.is_published
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_cards_specs_gin', table_name='product_cards', schema='core')
+    op.drop_index('ix_product_cards_category_ids_gin', table_name='product_cards', schema='core')
+    op.drop_index('ix_product_cards_brand_id', table_name='product_cards', schema='core')
+    op.drop_index('ix_product_cards_price', table_name='product_cards', schema='core')
+    op.drop_index('ix_product_cards_name', table_name='product_cards', schema='core')
+    op.drop_index('ix_product_cards_created', table_name='product_cards', schema='core')
+    op.drop_table('product_cards', schema='core')
@@ -0,0 +1,59 @@
+from __future__ import annotations
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+ProductSort = Literal["newest", "name", "price_asc", "price_desc"]
+
+class ProductListFilters(BaseModel):
+    brand_ids: List[UUID] = Field(default_factory=list)
+    category_ids: List[UUID] = Field(default_factory=list)
+    include_descendants: bool = True              # category_ids gồm cả category con (closure table)
+    specs: Optional[Dict[str, Any]] = None        # products.specs @> specs
+    attributes: Optional[Dict[str, Any]] = None   # có ít nhất một variant với attributes @> attributes
+    price_min: Optional[Decimal] = None
+    price_max: Optional[Decimal] = None
+    currency: str = "VND"
+    published: Optional[bool] = True              # None = không lọc
+
+class ProductListItem(BaseModel):
+    """Một dòng listing: chỉ các cột cần hiển thị, không phải ORM object."""
+    id: UUID
+    slug: str
+    name: str
+    brand_id: Optional[UUID] = None
+    brand_name: Optional[str] = None
+    price_min: Optional[Decimal] = None
+    price_max: Optional[Decimal] = None
+    compare_at: Optional[Decimal] = None
+    currency: str
+    image_url: Optional[str] = None
+    created_at: datetime
+
+class ProductListPage(BaseModel):
+    items: List[ProductListItem]
+    size: int
+    next_cursor: Optional[str] = None
+
+class ProductSearchItem(ProductListItem):
+    score: float                                  # ts_rank_cd + word_similarity(model_number)
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSearchItem]
+    size: int
+    next_cursor: Optional[str] = None
+
+class CategoryCrumb(BaseModel):
+    id: UUID
+    name: str
+    slug: str
+
+class CategoryNode(BaseModel):
+    """Một node trong subtree; depth tính từ category gốc của truy vấn (0 = chính nó)."""
+    id: UUID
+    parent_id: Optional[UUID] = None
+    name: str
+    slug: str
+    depth: int
@@ -14,3 +14,10 @@ class AuthorizationError(AppError):
 
 class NotFound(AppError):
     """Entity not found."""
+
+class InsufficientStock(AppError):
+    """Not enough available stock to reserve every requested line; `shortages` lists the failing lines."""
+
+    def __init__(self, shortages: list) -> None:
+        super().__init__("Insufficient stock")
+        self.shortages = shortages
@@ -14,6 +14,27 @@ class UserDTO(BaseModel):
     roles: List[str] = Field(default_factory=list)
     created_at: Optional[datetime] = None
 
+class AdminUserSearchItem(BaseModel):
+    """Một dòng kết quả admin search (chỉ cột, không load roles)."""
+    id: UUID
+    email: str
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+    is_active: bool
+    created_at: Optional[datetime] = None
+    last_login_at: Optional[datetime] = None
+    score: float
+
+class AdminUserSearchPage(BaseModel):
+    items: List[AdminUserSearchItem]
+    size: int
+    next_cursor: Optional[str] = None
+
+class PrincipalDTO(BaseModel):
+    """Danh tính đã resolve cho request: user + roles + customer_id (nếu có)."""
+    user: UserDTO
+    customer_id: Optional[UUID] = None
+
 class AccessTokenDTO(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -15,6 +15,7 @@ from .dto import (
 from ..errors import AlreadyExists, AuthenticationError
 from ..ports.identity import IUserRepo, IRoleRepo, ICustomerRepo, IAddressRepo
 from ..ports.security_async import IAsyncPasswordHasher, IAsyncTokenService
+from ..ports.uow import IUnitOfWork
 
 load_dotenv()
 ACCESS_TOKEN_EXPIRES_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRES_HOURS", "12"))
@@ -29,11 +30,13 @@ class RegisterUser:
         roles: IRoleRepo,
         customers: ICustomerRepo,
         hasher: IAsyncPasswordHasher,
+        uow: IUnitOfWork,
     ) -> None:
         self.users = users
         self.roles = roles
         self.customers = customers
         self.hasher = hasher
+        self.uow = uow
 
     async def execute(self, data: RegisterInput) -> UserDTO:
         # Check duplicate email
@@ -54,14 +57,17 @@ class RegisterUser:
         user.phone = data.phone
         user.is_active = True
 
-        user = await self.users.add(user, commit=True, refresh=True)
+        user = await self.users.add(user, commit=False, refresh=True)
 
         # Ensure role & assign
         await self.roles.ensure(DEFAULT_CUSTOMER_ROLE, name="Customer", commit=False)
         await self.users.add_role(user, DEFAULT_CUSTOMER_ROLE, commit=False)
 
         # Ensure customer row
-        await self.customers.ensure_for_user(user.id, tier="standard", commit=True)
+        await self.customers.ensure_for_user(user.id, tier="standard", commit=False)
+
+        # User + role + customer trong một transaction
+        await self.uow.commit()
 
         return user_to_dto(user)
 
@@ -137,6 +143,19 @@ class ChangePassword:
         await self.users.update(user, {"password_hash": new_hash}, commit=True, refresh=False)
 
 
+class RehashPassword:
+    """Nâng cấp hash mật khẩu sang scheme/tham số hiện hành sau khi login thành công."""
+    def __init__(self, users: IUserRepo, hasher: IAsyncPasswordHasher) -> None:
+        self.users = users
+        self.hasher = hasher
+
+    async def execute(self, user_id: UUID, plain: str, old_hash: str) -> bool:
+        if not self.hasher.needs_rehash(old_hash):
+            return False
+        new_hash = await self.hasher.hash(plain)
+        return await self.users.replace_password_hash(user_id, old_hash, new_hash, commit=True)
+
+
 class AddAddress:
     def __init__(self, addresses: IAddressRepo) -> None:
         self.addresses = addresses
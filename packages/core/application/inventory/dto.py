@@ -0,0 +1,31 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import List, Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+class ReserveLine(BaseModel):
+    variant_id: UUID
+    location_id: UUID
+    qty: int = Field(gt=0)
+
+class Shortage(BaseModel):
+    """Dòng không giữ được: `available` là on_hand - reserved lúc thất bại (None = không có tồn kho)."""
+    variant_id: UUID
+    location_id: UUID
+    requested: int
+    available: Optional[int] = None
+
+class Hold(BaseModel):
+    hold_id: UUID
+    reference: Optional[str] = None
+    expires_at: datetime
+    lines: List[ReserveLine]
+
+StockBand = Literal["out_of_stock", "low", "in_stock"]
+
+class VariantAvailability(BaseModel):
+    """Tồn khả dụng (on_hand - reserved, cộng mọi location) của một variant + mức hiển thị."""
+    variant_id: UUID
+    available: int
+    band: StockBand
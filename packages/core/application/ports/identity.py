@@ -13,6 +13,7 @@ class IUserRepo(Protocol):
     async def get(self, id: UUID, *, with_deleted: bool = False) -> User: ...
     async def add(self, obj: User, *, commit: bool = False, refresh: bool = True) -> User: ...
     async def update(self, obj: User, data: dict, *, commit: bool = False, refresh: bool = True) -> User: ...
+    async def replace_password_hash(self, user_id: UUID, old_hash: str, new_hash: str, *, commit: bool = False) -> bool: ...
     async def activate(self, user: User, *, commit: bool = False) -> User: ...
     async def deactivate(self, user: User, *, commit: bool = False) -> User: ...
     async def add_role(self, user: User, role_code: str, *, commit: bool = False) -> None: ...
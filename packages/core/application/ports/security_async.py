@@ -5,6 +5,7 @@ from datetime import timedelta
 class IAsyncPasswordHasher(Protocol):
     async def hash(self, plain: str) -> str: ...
     async def verify(self, plain: str, hashed: str) -> bool: ...
+    def needs_rehash(self, hashed: str) -> bool: ...
 
 class IAsyncTokenService(Protocol):
     async def create_access_token(self, subject: str, *, expires_delta: Optional[timedelta] = None, extra: Optional[Dict[str, Any]] = None) -> str: ...
@@ -0,0 +1,7 @@
+from __future__ import annotations
+from typing import Protocol
+
+
+class IUnitOfWork(Protocol):
+    async def commit(self) -> None: ...
+    async def rollback(self) -> None: ...
@@ -0,0 +1,119 @@
+"""
+Cache tồn khả dụng theo variant_id cho catalog ("còn hàng / còn N sản phẩm").
+
+- Trang listing / detail gọi `get_many` với mọi variant trên trang: hit trả từ cache,
+  toàn bộ miss nạp bằng một query (InventoryRepo.available, GROUP BY variant_id).
+- Ghi tồn kho đi qua InventoryRepo (reserve / release / commit / expire) gọi
+  `invalidate_availability`; sửa InventoryLevel qua ORM được gom ở after_flush.
+  Giống principal cache: xoá ngay và xoá lần nữa sau commit.
+- Cache là per-process và bị chặn bởi maxsize; TTL chặn độ trễ giữa các worker
+  (và độ trễ replica khi nạp lại).
+- Instance của app được dựng trong apps/api/di/cache.py theo Settings; mọi AvailabilityCache
+  đang sống đều nhận invalidate (listener ở đây không cần biết instance nào).
+"""
+from __future__ import annotations
+import weakref
+from typing import Any, Dict, Iterable, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from packages.core.application.inventory.dto import StockBand, VariantAvailability
+from packages.infra.cache.ttl_lru import TTLCache
+from packages.infra.db.models.core.inventory_level import InventoryLevel
+
+_PENDING_KEY = "availability.invalidate"
+
+_caches: "weakref.WeakSet[AvailabilityCache]" = weakref.WeakSet()
+
+
+class AvailabilityCache:
+    def __init__(self, *, ttl: float = 30.0, maxsize: int = 100_000, low_stock: int = 5) -> None:
+        self.cache: TTLCache[UUID, VariantAvailability] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.low_stock = low_stock
+        self.fills = 0          # số query nạp miss
+        self.filled = 0         # số variant đã nạp
+        self.invalidations = 0
+        _caches.add(self)
+
+    def band(self, available: int) -> StockBand:
+        if available <= 0:
+            return "out_of_stock"
+        return "low" if available <= self.low_stock else "in_stock"
+
+    async def get_many(self, inventory: Any, variant_ids: Iterable[UUID]) -> Dict[UUID, VariantAvailability]:
+        """Availability cho mọi variant_id (giữ thứ tự, bỏ trùng); miss → một query duy nhất."""
+        ids = list(dict.fromkeys(variant_ids))
+        out: Dict[UUID, VariantAvailability] = {}
+        missing = []
+        for variant_id in ids:
+            hit = self.cache.get(variant_id)
+            if hit is None:
+                missing.append(variant_id)
+            else:
+                out[variant_id] = hit
+        if missing:
+            loaded = await inventory.available(missing)
+            self.fills += 1
+            self.filled += len(missing)
+            for variant_id in missing:
+                n = max(loaded.get(variant_id, 0), 0)
+                value = VariantAvailability(variant_id=variant_id, available=n, band=self.band(n))
+                self.cache.set(variant_id, value)
+                out[variant_id] = value
+        return {variant_id: out[variant_id] for variant_id in ids}
+
+    def invalidate(self, variant_ids: Iterable[UUID]) -> None:
+        for variant_id in variant_ids:
+            self.cache.invalidate(variant_id)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "ttl_s": self.cache.ttl,
+            "low_stock": self.low_stock,
+            "fills": self.fills,
+            "filled": self.filled,
+            "invalidations": self.invalidations,
+        }
+
+
+def _invalidate_all(variant_ids: Iterable[UUID]) -> None:
+    ids = list(variant_ids)
+    for cache in list(_caches):
+        cache.invalidate(ids)
+
+
+def invalidate_availability(session: Any, variant_ids: Iterable[Optional[UUID]]) -> None:
+    """Gọi từ repo khi on_hand / reserved của variant thay đổi (session: AsyncSession hoặc Session)."""
+    ids = {v for v in variant_ids if v is not None}
+    if not ids:
+        return
+    _invalidate_all(ids)
+    session.info.setdefault(_PENDING_KEY, set()).update(ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_levels(session: Session, flush_context: Any) -> None:
+    # Điều chỉnh tồn kho qua ORM (nhập hàng, kiểm kê...) không đi qua InventoryRepo
+    ids: Set[UUID] = {
+        obj.variant_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, InventoryLevel)
+    }
+    if ids:
+        invalidate_availability(session, ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    _invalidate_all(session.info.pop(_PENDING_KEY, ()))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction: Any) -> None:
+    if previous_transaction.nested:
+        return
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,231 @@
+"""
+Redis giả trong process, tương thích redis.asyncio cho tập lệnh app đang dùng.
+
+Dùng cho dev/test khi không có Redis (`REDIS_URL=memory://`) và làm fake cho test
+của RedisLockoutBackend. Bám ngữ nghĩa redis-py với `decode_responses=False`:
+- giá trị/member trả về dạng bytes; str/int/float được encode như redis-py;
+- key có TTL (`set(ex=/px=)`, `expire`) hết hạn theo `clock` (mặc định time.time);
+- `pipeline()` gom lệnh rồi chạy liền một mạch trong `execute()` (như MULTI/EXEC,
+  vì không có await giữa các lệnh trên cùng event loop), trả list kết quả.
+
+Trạng thái là per-process: không thay được Redis thật khi chạy nhiều worker.
+"""
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+Scalar = Union[bytes, str, int, float]
+
+
+def _encode(value: Scalar) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, bool):
+        raise TypeError("Invalid input of type: 'bool'. Convert to a bytes, string, int or float first.")
+    if isinstance(value, (int, float)):
+        return repr(value).encode()
+    return str(value).encode("utf-8")
+
+
+def _score_bound(value: Union[str, bytes, int, float]) -> Tuple[float, bool]:
+    """Biên của ZRANGEBYSCORE: số, "-inf"/"+inf" hoặc "(x" (loại trừ). Trả (score, exclusive)."""
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str):
+        exclusive = value.startswith("(")
+        return float(value[1:] if exclusive else value), exclusive
+    return float(value), False
+
+
+class WrongTypeError(Exception):
+    """Tương đương ResponseError WRONGTYPE của Redis."""
+
+
+class LocalRedis:
+    def __init__(self, *, clock: Callable[[], float] = time.time) -> None:
+        self.clock = clock
+        self._data: Dict[bytes, Any] = {}
+        self._expires: Dict[bytes, float] = {}
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "LocalRedis":
+        if not url.startswith("memory://"):
+            raise ValueError(f"LocalRedis chỉ nhận URL memory://, không phải {url!r}")
+        return cls(**kwargs)
+
+    # ---------- keyspace ----------
+
+    def _alive(self, key: bytes) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= self.clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def _typed(self, key: bytes, kind: type) -> Any:
+        if not self._alive(key):
+            return None
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise WrongTypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _get(self, name: Scalar) -> Optional[bytes]:
+        return self._typed(_encode(name), bytes)
+
+    def _set(
+        self,
+        name: Scalar,
+        value: Scalar,
+        ex: Optional[float] = None,
+        px: Optional[float] = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> Optional[bool]:
+        key = _encode(name)
+        exists = self._alive(key)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._data[key] = _encode(value)
+        self._expires.pop(key, None)
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        if ttl is not None:
+            self._expires[key] = self.clock() + float(ttl)
+        return True
+
+    def _delete(self, *names: Scalar) -> int:
+        removed = 0
+        for name in names:
+            key = _encode(name)
+            if self._alive(key):
+                del self._data[key]
+                self._expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def _expire(self, name: Scalar, time: float) -> bool:
+        key = _encode(name)
+        if not self._alive(key):
+            return False
+        if time <= 0:
+            self._delete(key)
+        else:
+            self._expires[key] = self.clock() + float(time)
+        return True
+
+    def _ttl(self, name: Scalar) -> int:
+        key = _encode(name)
+        if not self._alive(key):
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else int(round(expires_at - self.clock()))
+
+    # ---------- sorted set ----------
+
+    def _zadd(self, name: Scalar, mapping: Mapping[Scalar, float]) -> int:
+        key = _encode(name)
+        zset = self._typed(key, dict)
+        if zset is None:
+            zset = self._data[key] = {}
+        added = 0
+        for member, score in mapping.items():
+            member = _encode(member)
+            added += member not in zset
+            zset[member] = float(score)
+        return added
+
+    def _zremrangebyscore(self, name: Scalar, min: Any, max: Any) -> int:
+        key = _encode(name)
+        zset = self._typed(key, dict)
+        if zset is None:
+            return 0
+        lo, lo_ex = _score_bound(min)
+        hi, hi_ex = _score_bound(max)
+        doomed = [
+            m for m, s in zset.items()
+            if (s > lo if lo_ex else s >= lo) and (s < hi if hi_ex else s <= hi)
+        ]
+        for member in doomed:
+            del zset[member]
+        if not zset:
+            self._delete(key)  # Redis xoá key khi sorted set rỗng
+        return len(doomed)
+
+    def _zcard(self, name: Scalar) -> int:
+        zset = self._typed(_encode(name), dict)
+        return len(zset) if zset else 0
+
+    def _zrange(self, name: Scalar, start: int, end: int, withscores: bool = False) -> List[Any]:
+        zset = self._typed(_encode(name), dict)
+        if not zset:
+            return []
+        items = sorted(zset.items(), key=lambda kv: (kv[1], kv[0]))
+        end = len(items) if end == -1 else end + 1
+        picked = items[start:end]
+        return [(m, s) for m, s in picked] if withscores else [m for m, _ in picked]
+
+    # ---------- API async kiểu redis.asyncio ----------
+
+    async def get(self, name: Scalar) -> Optional[bytes]:
+        return self._get(name)
+
+    async def set(self, name: Scalar, value: Scalar, ex: Optional[float] = None, px: Optional[float] = None,
+                  nx: bool = False, xx: bool = False) -> Optional[bool]:
+        return self._set(name, value, ex=ex, px=px, nx=nx, xx=xx)
+
+    async def delete(self, *names: Scalar) -> int:
+        return self._delete(*names)
+
+    async def expire(self, name: Scalar, time: float) -> bool:
+        return self._expire(name, time)
+
+    async def ttl(self, name: Scalar) -> int:
+        return self._ttl(name)
+
+    async def zadd(self, name: Scalar, mapping: Mapping[Scalar, float]) -> int:
+        return self._zadd(name, mapping)
+
+    async def zremrangebyscore(self, name: Scalar, min: Any, max: Any) -> int:
+        return self._zremrangebyscore(name, min, max)
+
+    async def zcard(self, name: Scalar) -> int:
+        return self._zcard(name)
+
+    async def zrange(self, name: Scalar, start: int, end: int, withscores: bool = False) -> List[Any]:
+        return self._zrange(name, start, end, withscores=withscores)
+
+    def pipeline(self, transaction: bool = True) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class LocalPipeline:
+    """Gom lệnh như redis.asyncio Pipeline: gọi lệnh trả về chính pipeline, `execute()` chạy hết."""
+
+    _COMMANDS = ("get", "set", "delete", "expire", "ttl", "zadd", "zremrangebyscore", "zcard", "zrange")
+
+    def __init__(self, client: LocalRedis) -> None:
+        self.client = client
+        self._queued: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "LocalPipeline"]:
+        if name not in self._COMMANDS:
+            raise AttributeError(name)
+
+        def queue(*args: Any, **kwargs: Any) -> "LocalPipeline":
+            self._queued.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        queued, self._queued = self._queued, []
+        return [getattr(self.client, f"_{name}")(*args, **kwargs) for name, args, kwargs in queued]
+
+    async def __aenter__(self) -> "LocalPipeline":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._queued = []
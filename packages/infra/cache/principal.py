@@ -0,0 +1,79 @@
+"""
+Cache "principal" (user DTO + role codes + customer_id) theo user_id.
+
+- Miss → một query duy nhất (UserRepo.load_principal), hit → không query.
+- Các repo ghi vào user/role/customer gọi `invalidate_principal(session, user_id)`:
+  xoá ngay và xoá lần nữa sau commit (tránh request khác nạp lại bản cũ trong lúc
+  transaction chưa commit). Cache là per-process; TTL chặn độ trễ giữa các worker.
+- Mỗi user_id có generation, tăng khi invalidate: lần nạp bắt đầu trước invalidate
+  (đọc được bản cũ) không được ghi kết quả vào cache.
+"""
+from __future__ import annotations
+import os
+from collections import OrderedDict
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from packages.core.application.identity.dto import PrincipalDTO
+from packages.infra.cache.ttl_lru import TTLCache
+
+_PENDING_KEY = "principal.invalidate"
+
+
+class PrincipalCache:
+    def __init__(self, *, ttl: float = 60.0, maxsize: int = 50_000) -> None:
+        self.cache: TTLCache[UUID, PrincipalDTO] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Generation theo user_id (LRU, cùng trần với cache); key không có = 0
+        self._generations: "OrderedDict[UUID, int]" = OrderedDict()
+        self._maxsize = maxsize
+        self.stale_loads = 0  # số lần nạp bị bỏ vì có invalidate trong lúc nạp
+
+    def generation(self, user_id: UUID) -> int:
+        return self._generations.get(user_id, 0)
+
+    async def resolve(self, users: Any, user_id: UUID) -> Optional[PrincipalDTO]:
+        principal = self.cache.get(user_id)
+        if principal is None:
+            generation = self.generation(user_id)
+            principal = await users.load_principal(user_id)
+            if principal is not None:
+                if self.generation(user_id) == generation:
+                    self.cache.set(user_id, principal)
+                else:
+                    self.stale_loads += 1
+        return principal
+
+    def invalidate(self, user_id: UUID) -> None:
+        self.cache.invalidate(user_id)
+        self._generations[user_id] = self.generation(user_id) + 1
+        self._generations.move_to_end(user_id)
+        while len(self._generations) > self._maxsize:
+            self._generations.popitem(last=False)
+
+
+principal_cache = PrincipalCache(
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "50000")),
+)
+
+
+def invalidate_principal(session: Any, user_id: Optional[UUID]) -> None:
+    """Gọi từ repo khi dữ liệu của principal thay đổi (session: AsyncSession hoặc Session)."""
+    if user_id is None:
+        return
+    principal_cache.invalidate(user_id)
+    session.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -5,12 +5,14 @@ from .user_role import UserRole
 from .customer import Customer
 from .address import Address
 from .brand import Brand
-from .category import Category, ProductCategory
+from .category import Category, CategoryClosure, ProductCategory
 from .product import Product
 from .product_variant import ProductVariant
+from .product_card import ProductCard
 from .media_asset import MediaAsset
 from .inventory_location import InventoryLocation
 from .inventory_level import InventoryLevel
+from .inventory_reservation import InventoryReservation
 from .price import Price
 from .cart import Cart
 from .cart_item import CartItem
@@ -29,8 +31,8 @@ from .mfa_totp import MfaTotp
 from .oauth_account import OAuthAccount
 
 __all__ = [
-    "User", "Role", "UserRole", "Customer", "Address", "Brand", "Category", "ProductCategory",
-    "Product", "ProductVariant", "MediaAsset", "InventoryLocation", "InventoryLevel", "Price",
+    "User", "Role", "UserRole", "Customer", "Address", "Brand", "Category", "CategoryClosure", "ProductCategory",
+    "Product", "ProductVariant", "ProductCard", "MediaAsset", "InventoryLocation", "InventoryLevel", "InventoryReservation", "Price",
     "Cart", "CartItem", "Order", "OrderItem", "Payment", "Shipment", "ShipmentItem",
     "Return", "ReturnItem", "Review", "Coupon", "PasswordReset", "ApiKey", "MfaTotp", "OAuthAccount"
 ]
@@ -2,7 +2,7 @@
 from __future__ import annotations
 import uuid
 from typing import List, Optional
-from sqlalchemy import String, Index, text, ForeignKey, UniqueConstraint
+from sqlalchemy import Integer, String, Index, text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from ..base import Base, UUIDPk, TimestampMixin, SoftDeleteMixin
@@ -19,17 +19,36 @@ class Category(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
     parent_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("core.categories.id", ondelete="SET NULL"))
 
     parent: Mapped[Optional["Category"]] = relationship(remote_side="Category.id")
+    # Một category có thể có hàng nghìn sản phẩm: không load theo category,
+    # listing dùng ProductRepo / CategoryRepo (closure table)
     products: Mapped[List["Product"]] = relationship(
         secondary="core.product_categories",
         back_populates="categories",
-        lazy="selectin"
+        lazy="raise_on_sql"
     )
 
 class ProductCategory(Base):
     __tablename__ = "product_categories"
     __table_args__ = (
         UniqueConstraint("product_id", "category_id", name="uq_product_categories_product_category"),
+        # PK bắt đầu bằng product_id; lọc theo category cần index bắt đầu bằng category_id
+        Index("ix_product_categories_category_id", "category_id", "product_id"),
         {"schema": "core"}
     )
     product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.products.id", ondelete="CASCADE"), primary_key=True)
     category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.categories.id", ondelete="CASCADE"), primary_key=True)
+
+class CategoryClosure(Base):
+    """Closure table của cây category: mỗi cặp (tổ tiên, hậu duệ) một row, kể cả (id, id, 0).
+
+    Được duy trì từ packages/infra/repos/core/category_repo.py khi category được tạo / đổi parent.
+    """
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        # PK (ancestor_id, descendant_id) phục vụ subtree; ancestors / breadcrumb đi theo descendant_id
+        Index("ix_category_closure_descendant", "descendant_id", "depth"),
+        {"schema": "core"}
+    )
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.categories.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.categories.id", ondelete="CASCADE"), primary_key=True)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
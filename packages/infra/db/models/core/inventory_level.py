@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 import uuid
-from sqlalchemy import Integer, UniqueConstraint, ForeignKey
+from sqlalchemy import CheckConstraint, Integer, UniqueConstraint, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from ..base import Base, TimestampMixin, SoftDeleteMixin
@@ -10,6 +10,8 @@ class InventoryLevel(Base, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "inventory_levels"
     __table_args__ = (
         UniqueConstraint("variant_id", "location_id", name="uq_inventory_levels_variant_location"),
+        # Chốt chặn cuối cho reserve/commit đồng thời (InventoryRepo): không bao giờ giữ quá tồn
+        CheckConstraint("reserved >= 0 AND reserved <= on_hand", name="reserved_within_on_hand"),
         {"schema": "core"}
     )
 
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import CheckConstraint, ForeignKey, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
+from ..base import Base, UUIDPk, TimestampMixin
+
+class InventoryReservation(Base, UUIDPk, TimestampMixin):
+    """Một dòng giữ hàng (variant, location, qty) thuộc một hold của checkout.
+
+    Trong lúc status = 'active', qty đã được cộng vào inventory_levels.reserved; commit / release /
+    expire trả lại (và trừ on_hand khi commit) trong cùng câu lệnh đổi status, xem InventoryRepo.
+    """
+    __tablename__ = "inventory_reservations"
+    __table_args__ = (
+        CheckConstraint("qty > 0", name="qty_pos"),
+        CheckConstraint("status IN ('active', 'committed', 'released', 'expired')", name="status"),
+        Index("ix_inventory_reservations_hold_id", "hold_id"),
+        # Job hết hạn chỉ quét hold đang active
+        Index("ix_inventory_reservations_active_expires", "expires_at",
+            postgresql_where=text("status = 'active'")),
+        {"schema": "core"},
+    )
+
+    hold_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    reference: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # cart / order id phía caller
+    variant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.product_variants.id", ondelete="CASCADE"), nullable=False)
+    location_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.inventory_locations.id", ondelete="CASCADE"), nullable=False)
+    qty: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default="active", server_default=text("'active'"), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
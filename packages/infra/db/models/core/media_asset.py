@@ -2,13 +2,17 @@
 from __future__ import annotations
 import uuid
 from typing import Optional
-from sqlalchemy import Integer, String, Text
+from sqlalchemy import Index, Integer, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column
 from ..base import Base, UUIDPk, TimestampMixin, SoftDeleteMixin
 
 class MediaAsset(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "media_assets"
-    __table_args__ = {"schema": "core"}
+    __table_args__ = (
+        Index("ix_media_assets_owner", "owner_type", "owner_id", "sort_order",
+            postgresql_where=text("deleted_at IS NULL")),
+        {"schema": "core"},
+    )
 
     owner_type: Mapped[str] = mapped_column(String, nullable=False)  # product|variant
     owner_id: Mapped[uuid.UUID]
@@ -1,20 +1,28 @@
 
 from __future__ import annotations
 import uuid
+from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Numeric, ForeignKey
+from sqlalchemy import String, Numeric, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
 from ..base import Base, UUIDPk, TimestampMixin, SoftDeleteMixin
 
 class Price(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "prices"
-    __table_args__ = {"schema": "core"}
+    __table_args__ = (
+        # Giá hiện hành của variant: LATERAL (... ORDER BY effective_at DESC LIMIT 1) đọc đúng 1 entry index
+        Index("ix_prices_variant_effective", "variant_id", "currency", text("effective_at DESC"),
+            postgresql_where=text("deleted_at IS NULL")),
+        # ProductCardRefresher: giá hẹn giờ vừa tới hạn (effective_at trong khoảng từ lượt quét trước)
+        Index("ix_prices_effective_at", "effective_at", postgresql_where=text("deleted_at IS NULL")),
+        {"schema": "core"},
+    )
 
     variant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("core.product_variants.id", ondelete="CASCADE"))
     currency: Mapped[str] = mapped_column(String(3), default="VND", nullable=False)
     amount: Mapped[float] = mapped_column(Numeric(12, 2), nullable=False)
     compare_at: Mapped[Optional[float]] = mapped_column(Numeric(12, 2))
-    effective_at: Mapped[Optional[str]]  # TIMESTAMPTZ at DB
+    effective_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
 
     variant: Mapped["ProductVariant"] = relationship(back_populates="prices")
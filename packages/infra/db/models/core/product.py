@@ -2,9 +2,9 @@
 from __future__ import annotations
 import uuid
 from typing import List, Optional
-from sqlalchemy import Boolean, String, Text, Index, text, ForeignKey
+from sqlalchemy import Boolean, FetchedValue, String, Text, Index, text, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from ..base import Base, UUIDPk, TimestampMixin, SoftDeleteMixin
 
 class Product(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
@@ -12,6 +12,17 @@ class Product(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
     __table_args__ = (
         Index("ux_products_slug_live", "slug", unique=True,
             postgresql_where=text("deleted_at IS NULL")),
+        # Listing: specs @> {...} và keyset theo (created_at, id) / (name, id) trên sản phẩm đang bán
+        Index("ix_products_specs_gin", "specs", postgresql_using="gin",
+            postgresql_ops={"specs": "jsonb_path_ops"}),
+        Index("ix_products_live_created", text("created_at DESC"), text("id DESC"),
+            postgresql_where=text("deleted_at IS NULL AND is_published")),
+        Index("ix_products_live_name", "name", "id",
+            postgresql_where=text("deleted_at IS NULL AND is_published")),
+        # Search: full-text trên search_vector + trigram cho model_number gõ thiếu / sai
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_products_model_number_trgm", "model_number", postgresql_using="gin",
+            postgresql_ops={"model_number": "gin_trgm_ops"}),
         {"schema": "core"},
     )
 
@@ -22,6 +33,11 @@ class Product(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
     specs: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
     description: Mapped[Optional[str]]
     is_published: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    # Do trigger trg_products_search_vector ghi (name, model_number, brand, specs; đã unaccent).
+    # Không phải generated column: cần tên brand ở bảng khác và unaccent() chỉ STABLE.
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, server_default=FetchedValue(), server_onupdate=FetchedValue(), deferred=True
+    )
 
     brand: Mapped[Optional["Brand"]] = relationship(back_populates="products")
     variants: Mapped[List["ProductVariant"]] = relationship(back_populates="product", cascade="all, delete-orphan")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import Boolean, ForeignKey, Index, Numeric, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TIMESTAMP, UUID
+from ..base import Base
+
+class ProductCard(Base):
+    """Read model cho listing: 1 row / sản phẩm đang bán, đã gộp sẵn giá, tồn kho, ảnh, brand, category.
+
+    Không ghi trực tiếp: được refresh theo product_id từ packages/infra/repos/core/product_card_repo.py.
+    """
+    __tablename__ = "product_cards"
+    __table_args__ = (
+        Index("ix_product_cards_created", text("created_at DESC"), text("product_id DESC")),
+        Index("ix_product_cards_name", "name", "product_id"),
+        Index("ix_product_cards_price", "price_min", "product_id",
+            postgresql_where=text("price_min IS NOT NULL")),
+        Index("ix_product_cards_brand_id", "brand_id"),
+        Index("ix_product_cards_category_ids_gin", "category_ids", postgresql_using="gin"),
+        Index("ix_product_cards_specs_gin", "specs", postgresql_using="gin",
+            postgresql_ops={"specs": "jsonb_path_ops"}),
+        {"schema": "core"},
+    )
+
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("core.products.id", ondelete="CASCADE"), primary_key=True
+    )
+    slug: Mapped[str] = mapped_column(String, nullable=False)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    brand_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True))
+    brand_name: Mapped[Optional[str]]
+    category_ids: Mapped[List[uuid.UUID]] = mapped_column(
+        ARRAY(UUID(as_uuid=True)), server_default=text("'{}'::uuid[]"), nullable=False
+    )
+    specs: Mapped[dict] = mapped_column(JSONB, server_default=text("'{}'::jsonb"), nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    price_min: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 2))
+    price_max: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 2))
+    compare_at: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 2))
+    in_stock: Mapped[bool] = mapped_column(Boolean, server_default=text("false"), nullable=False)
+    image_url: Mapped[Optional[str]]
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
@@ -11,6 +11,9 @@ class ProductVariant(Base, UUIDPk, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "product_variants"
     __table_args__ = (
         Index("ux_variants_sku_live", "sku", unique=True, postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_product_variants_product_id", "product_id", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_product_variants_attributes_gin", "attributes", postgresql_using="gin",
+            postgresql_ops={"attributes": "jsonb_path_ops"}),
         {"schema": "core"}
     )
 
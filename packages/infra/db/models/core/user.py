@@ -2,14 +2,21 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import TIMESTAMP, Boolean, Text
+from sqlalchemy import TIMESTAMP, Boolean, Index, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import CITEXT
 from ..base import Base, UUIDPk, TimestampMixin
 
 class User(Base, UUIDPk, TimestampMixin):
     __tablename__ = "users"
-    __table_args__ = {"schema": "core"}
+    __table_args__ = (
+        # Admin search (UserRepo.search_admin): trigram cho email / tên (không dấu),
+        # btree text_pattern_ops cho tìm email theo tiền tố (LIKE 'abc%')
+        Index("ix_users_email_trgm", text("(email::text) gin_trgm_ops"), postgresql_using="gin"),
+        Index("ix_users_email_prefix", text("lower(email::text) text_pattern_ops")),
+        Index("ix_users_full_name_trgm", text("core.f_unaccent(full_name) gin_trgm_ops"), postgresql_using="gin"),
+        {"schema": "core"},
+    )
 
     email: Mapped[str] = mapped_column(CITEXT, unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(Text, nullable=False)
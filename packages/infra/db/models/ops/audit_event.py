@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, ForeignKey, Text, Index, text
+from sqlalchemy import BigInteger, ForeignKey, PrimaryKeyConstraint, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
@@ -7,11 +7,21 @@ from ..base import Base, TimestampMixin, UUIDPk
 
 
 class AuditLog(Base, UUIDPk, TimestampMixin):
+    """Partition theo tháng trên created_at (xem packages/infra/db/partitions.py)."""
     __tablename__ = "audit_logs"
     __table_args__ = (
         Index("ix_audit_logs_created_at", "created_at"),
         Index("ix_audit_logs_meta_gin", "meta", postgresql_using="gin"),
-        {"schema": "ops"},
+        PrimaryKeyConstraint("id", "created_at", name="pk_audit_logs"),
+        {"schema": "ops", "postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Partition key phải nằm trong khoá chính → PK (id, created_at)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        primary_key=True,
+        server_default=text("now()"),
+        nullable=False,
     )
 
     user_id: Mapped[Optional[UUID]] = mapped_column(
@@ -1,17 +1,30 @@
-
 from __future__ import annotations
 import uuid
-from sqlalchemy import Boolean, String
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Boolean, Index, Integer, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TIMESTAMP
 from ..base import Base, UUIDPk, TimestampMixin
 
 class EventOutbox(Base, UUIDPk, TimestampMixin):
     __tablename__ = "event_outbox"
-    __table_args__ = {"schema": "ops"}
+    __table_args__ = (
+        # Chỉ chứa row đang chờ gửi → query claim của dispatcher O(batch) dù bảng lớn
+        Index("ix_event_outbox_pending", "created_at",
+            postgresql_where=text("NOT published AND dead_lettered_at IS NULL")),
+        {"schema": "ops"},
+    )
 
     aggregate: Mapped[str] = mapped_column(String, nullable=False)
     aggregate_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
     event_type: Mapped[str] = mapped_column(String, nullable=False)
     payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
-    published: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    published: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("false"), nullable=False)
+    published_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    # Retry: lần gửi tiếp theo không sớm hơn available_at (exponential backoff)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    available_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Dead-letter: quá max_attempts thì dừng retry, giữ row để xử lý tay
+    dead_lettered_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
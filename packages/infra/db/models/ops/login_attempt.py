@@ -1,22 +1,28 @@
 from datetime import datetime
-from sqlalchemy import Index, text
+from typing import Optional
+from sqlalchemy import Index, PrimaryKeyConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import CITEXT, INET, TIMESTAMP
 from ..base import Base, UUIDPk
 
 
 class LoginAttempt(Base, UUIDPk):
+    """Partition theo tháng trên attempted_at (xem packages/infra/db/partitions.py)."""
     __tablename__ = "login_attempts"
     __table_args__ = (
         Index("ix_login_attempts_email_time", "email_canon", "attempted_at"),
         Index("ix_login_attempts_ip_time", "ip", "attempted_at"),
-        {"schema": "ops"},
+        PrimaryKeyConstraint("id", "attempted_at", name="pk_login_attempts"),
+        {"schema": "ops", "postgresql_partition_by": "RANGE (attempted_at)"},
     )
 
     email_canon: Mapped[str] = mapped_column(CITEXT, nullable=False)
-    ip: Mapped[str] = mapped_column(INET, nullable=False)
+    # NULL khi request không có client IP
+    ip: Mapped[Optional[str]] = mapped_column(INET, nullable=True)
+    # Partition key phải nằm trong khoá chính → PK (id, attempted_at)
     attempted_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
+        primary_key=True,
         nullable=False,
         server_default=text("now()")
     )
@@ -0,0 +1,166 @@
+"""
+Quản lý partition theo thời gian (RANGE) cho các bảng append-only trong schema ops.
+
+- Partition đặt tên `<table>_pYYYYMM` (tháng) hoặc `<table>_pYYYYMMDD` (ngày).
+- `ensure_future`: tạo trước `premake` partition kể từ kỳ hiện tại, để insert không
+  bao giờ rơi ra ngoài range (không dùng DEFAULT partition: DEFAULT làm CREATE/DETACH phải quét nó).
+- `drop_expired`: partition có upper bound <= now - retention được
+  DETACH ... CONCURRENTLY rồi DROP. Retention thành thao tác metadata thay vì DELETE hàng loạt.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+Granularity = Literal["month", "day"]
+
+
+@dataclass(slots=True)
+class PartitionedTable:
+    schema: str
+    table: str
+    granularity: Granularity = "month"
+    premake: int = 3
+    retention: Optional[timedelta] = None   # None = không tự drop
+
+    @property
+    def qualified(self) -> str:
+        return f'"{self.schema}"."{self.table}"'
+
+
+def period_start(ts: datetime | date, granularity: Granularity) -> date:
+    d = ts.date() if isinstance(ts, datetime) else ts
+    return d.replace(day=1) if granularity == "month" else d
+
+
+def next_period(start: date, granularity: Granularity) -> date:
+    if granularity == "day":
+        return start + timedelta(days=1)
+    return date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+
+
+def partition_name(table: str, start: date, granularity: Granularity) -> str:
+    fmt = "%Y%m" if granularity == "month" else "%Y%m%d"
+    return f"{table}_p{start.strftime(fmt)}"
+
+
+def parse_partition_name(table: str, name: str, granularity: Granularity) -> Optional[date]:
+    digits = 6 if granularity == "month" else 8
+    m = re.fullmatch(rf"{re.escape(table)}_p(\d{{{digits}}})", name)
+    if not m:
+        return None
+    fmt = "%Y%m" if granularity == "month" else "%Y%m%d"
+    return datetime.strptime(m.group(1), fmt).date()
+
+
+def create_partition_sql(spec: PartitionedTable, start: date) -> str:
+    end = next_period(start, spec.granularity)
+    name = partition_name(spec.table, start, spec.granularity)
+    # Bound là timestamptz UTC; index/PK của parent tự được tạo trên partition mới
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{spec.schema}"."{name}" PARTITION OF {spec.qualified} '
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+_LIST_PARTITIONS = text(
+    """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    JOIN pg_namespace n ON n.oid = p.relnamespace
+    WHERE n.nspname = :schema AND p.relname = :table
+    ORDER BY c.relname
+    """
+)
+
+
+class PartitionManager:
+    def __init__(self, engine: AsyncEngine, tables: List[PartitionedTable]) -> None:
+        self.engine = engine
+        self.tables = tables
+        self.last_run: Dict[str, Dict[str, Any]] = {}
+
+    async def list_partitions(self, spec: PartitionedTable) -> List[Tuple[str, date]]:
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(_LIST_PARTITIONS, {"schema": spec.schema, "table": spec.table})).scalars().all()
+        out = []
+        for name in rows:
+            start = parse_partition_name(spec.table, name, spec.granularity)
+            if start is not None:
+                out.append((name, start))
+        return out
+
+    async def ensure_future(self, spec: PartitionedTable, *, now: Optional[datetime] = None) -> List[str]:
+        """Tạo partition cho kỳ hiện tại + `premake` kỳ tiếp theo (idempotent)."""
+        now = now or datetime.now(timezone.utc)
+        existing = {name for name, _ in await self.list_partitions(spec)}
+        created = []
+        start = period_start(now, spec.granularity)
+        for _ in range(spec.premake + 1):
+            name = partition_name(spec.table, start, spec.granularity)
+            if name not in existing:
+                # Mỗi partition một transaction ngắn (CREATE ... PARTITION OF lấy lock trên parent)
+                async with self.engine.begin() as conn:
+                    await conn.execute(text(create_partition_sql(spec, start)))
+                created.append(name)
+            start = next_period(start, spec.granularity)
+        return created
+
+    async def drop_expired(self, spec: PartitionedTable, *, now: Optional[datetime] = None) -> List[str]:
+        """DETACH CONCURRENTLY + DROP các partition nằm trọn trước `now - retention`."""
+        if spec.retention is None:
+            return []
+        cutoff = (now or datetime.now(timezone.utc)) - spec.retention
+        dropped = []
+        for name, start in await self.list_partitions(spec):
+            end = next_period(start, spec.granularity)
+            if datetime(end.year, end.month, end.day, tzinfo=timezone.utc) > cutoff:
+                continue
+            # DETACH CONCURRENTLY không chạy được trong transaction block → AUTOCOMMIT
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(f'ALTER TABLE {spec.qualified} DETACH PARTITION "{spec.schema}"."{name}" CONCURRENTLY'))
+                await conn.execute(text(f'DROP TABLE IF EXISTS "{spec.schema}"."{name}"'))
+            dropped.append(name)
+        return dropped
+
+    async def run_once(self, *, now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        for spec in self.tables:
+            report: Dict[str, Any] = {"created": [], "dropped": [], "error": None}
+            try:
+                report["created"] = await self.ensure_future(spec, now=now)
+                report["dropped"] = await self.drop_expired(spec, now=now)
+            except Exception as e:
+                report["error"] = f"{type(e).__name__}: {e}"
+                logger.warning("partition maintenance %s.%s failed: %s", spec.schema, spec.table, report["error"])
+            report["at"] = datetime.now(timezone.utc).isoformat()
+            self.last_run[f"{spec.schema}.{spec.table}"] = report
+        return self.last_run
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            f"{s.schema}.{s.table}": {
+                "granularity": s.granularity,
+                "premake": s.premake,
+                "retention_s": int(s.retention.total_seconds()) if s.retention else None,
+                "last_run": self.last_run.get(f"{s.schema}.{s.table}"),
+            }
+            for s in self.tables
+        }
+
+
+async def run_partition_maintenance(manager: PartitionManager, *, interval: float) -> None:
+    """Vòng lặp nền: chạy ngay một lượt lúc khởi động, sau đó mỗi `interval` giây."""
+    while True:
+        await manager.run_once()
+        await asyncio.sleep(interval)
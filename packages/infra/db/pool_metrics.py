@@ -0,0 +1,81 @@
+"""
+Metrics cho connection pool của async engine.
+
+InstrumentedAsyncQueuePool = AsyncAdaptedQueuePool + đo thời gian chờ mỗi lần checkout
+(kể cả pre-ping / mở connection mới) và đếm số lần checkout bị timeout.
+"""
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+@dataclass(slots=True)
+class PoolMetrics:
+    checkouts: int = 0
+    checkout_timeouts: int = 0
+    waiting: int = 0
+    wait_total_s: float = 0.0
+    wait_max_s: float = 0.0
+
+    def observe(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_total_s += waited
+        if waited > self.wait_max_s:
+            self.wait_max_s = waited
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = self.wait_total_s / self.checkouts if self.checkouts else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "waiting": self.waiting,
+            "wait_avg_ms": round(avg * 1000, 3),
+            "wait_max_ms": round(self.wait_max_s * 1000, 3),
+        }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool có gắn PoolMetrics (giữ nguyên metrics khi pool bị recreate)."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):  # type: ignore[override]
+        self.metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            self.metrics.checkout_timeouts += 1
+            raise
+        finally:
+            self.metrics.waiting -= 1
+        self.metrics.observe(time.perf_counter() - started)
+        return conn
+
+    def recreate(self) -> "InstrumentedAsyncQueuePool":
+        new = super().recreate()
+        new.metrics = self.metrics
+        return new  # type: ignore[return-value]
+
+
+def pool_snapshot(engine: Any) -> Dict[str, Any]:
+    """Trạng thái hiện tại của pool + metrics tích lũy (nếu pool có instrument)."""
+    pool = engine.sync_engine.pool
+    snap: Dict[str, Any] = {"status": pool.status()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        snap.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        snap.update(metrics.as_dict())
+    return snap
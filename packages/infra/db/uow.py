@@ -0,0 +1,22 @@
+from __future__ import annotations
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class UnitOfWork:
+    """Một transaction cho cả request.
+
+    Repo dùng chung `session` và chỉ stage thay đổi (commit=False);
+    handler gọi `commit()` đúng một lần khi xong việc. Nếu không commit,
+    mọi thay đổi bị rollback khi request kết thúc.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.committed = False
+
+    async def commit(self) -> None:
+        await self.session.commit()
+        self.committed = True
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
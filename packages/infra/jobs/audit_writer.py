@@ -0,0 +1,338 @@
+"""
+Ghi audit/security event bất đồng bộ, gom nhiều row thành một INSERT.
+
+Handler chỉ `enqueue` (đẩy vào asyncio.Queue có giới hạn); task nền gom tối đa
+`batch_size` row hoặc chờ tối đa `flush_interval` giây rồi ghi mỗi bảng bằng một
+executemany (SQLAlchemy insertmanyvalues → INSERT ... VALUES (...), (...), ...)
+trong một transaction ngắn.
+
+Khi queue đầy (`overflow`):
+- "block": handler chờ tới khi có chỗ (backpressure lên request).
+- "drop":  bỏ event, tăng counter `dropped`.
+- "spill": ghi event ra file JSON lines; lần `start()` sau sẽ nạp lại.
+
+Batch lỗi thì ghi lại từng row một: row tự nó lỗi (vd. ip="" cho cột INET) bị
+cách ly (`quarantined`, ghi ra `<spill_path>.quarantine` nếu có) thay vì bị spill
+rồi replay mãi; lỗi kết nối/DB sập thì phần chưa ghi được spill/drop như cũ.
+INSERT dùng ON CONFLICT DO NOTHING nên replay một row đã ghi không sinh lỗi.
+
+`stop()` đẩy sentinel vào queue và chờ task nền ghi hết những gì còn lại. Flush
+đang chạy được shield khỏi việc cancel task nền; nếu vẫn không xong trong
+`timeout` thì batch đó bị spill/drop và được đếm.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from sqlalchemy import Table
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from packages.infra.db.models.base import Base
+from packages.infra.db.models.ops.audit_event import AuditLog
+
+logger = logging.getLogger(__name__)
+
+Overflow = Literal["block", "drop", "spill"]
+_STOP = object()
+
+
+@dataclass(slots=True)
+class AuditWriterMetrics:
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    replayed: int = 0
+    flushes: int = 0
+    failed_batches: int = 0
+    quarantined: int = 0
+    last_flush_rows: int = 0
+    last_flush_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "flushes": self.flushes,
+            "failed_batches": self.failed_batches,
+            "quarantined": self.quarantined,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+
+def _revive(table: Table, row: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON → kiểu Python đúng với cột (uuid/datetime) trước khi bind cho asyncpg."""
+    out = {}
+    for key, value in row.items():
+        if isinstance(value, str) and key in table.c:
+            try:
+                py = table.c[key].type.python_type
+            except NotImplementedError:
+                py = str
+            if py is uuid.UUID:
+                value = uuid.UUID(value)
+            elif py is datetime:
+                value = datetime.fromisoformat(value)
+        out[key] = value
+    return out
+
+
+def _is_outage(exc: BaseException) -> bool:
+    """Lỗi do kết nối/DB (thử lại sau được) chứ không phải do nội dung row."""
+    if isinstance(exc, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return bool(getattr(exc, "connection_invalidated", False))
+
+
+Batch = List[Tuple[Table, Dict[str, Any]]]
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        overflow: Overflow = "drop",
+        spill_path: Optional[str] = None,
+    ) -> None:
+        if overflow == "spill" and not spill_path:
+            raise ValueError("overflow='spill' cần spill_path")
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.metrics = AuditWriterMetrics()
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    # ---------- phía request ----------
+
+    async def enqueue(self, table: Table, row: Dict[str, Any]) -> bool:
+        """Đưa một row vào hàng đợi. Trả về False nếu event bị drop."""
+        item = (table, row)
+        if self.overflow == "block":
+            await self.queue.put(item)
+        else:
+            try:
+                self.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                if self.overflow == "spill":
+                    self._spill([item])
+                else:
+                    self.metrics.dropped += 1
+                    return False
+        self.metrics.enqueued += 1
+        return True
+
+    async def audit(self, event: str, *, user_id: Optional[uuid.UUID] = None, meta: Optional[Dict[str, Any]] = None) -> bool:
+        """Ghi một dòng ops.audit_logs; id/created_at gán lúc enqueue để giữ đúng thời điểm sự kiện."""
+        now = datetime.now(timezone.utc)
+        return await self.enqueue(AuditLog.__table__, {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "event": event,
+            "meta": meta or {},
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    # ---------- task nền ----------
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        # Task chạy trước để replay không kẹt khi file spill lớn hơn queue
+        self._task = asyncio.create_task(self._run())
+        await self._replay_spill()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain: ghi hết queue rồi dừng (quá `timeout` thì spill/drop phần còn lại)."""
+        if self._task is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await self.queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("audit writer drain timed out, %d events left", self.queue.qsize())
+            self._spill_or_drop(self._drain_queue())
+            # wait_for đã cancel _run, nhưng flush đang chạy được shield: cho nó
+            # nốt phần thời gian còn lại (tối thiểu 1s) trước khi cancel hẳn.
+            inflight = self._inflight
+            if inflight is not None and not inflight.done():
+                try:
+                    await asyncio.wait_for(inflight, max(deadline - loop.time(), 1.0))
+                except asyncio.TimeoutError:
+                    logger.warning("audit writer in-flight flush cancelled on stop")
+        self._inflight = None
+        self._task = None
+
+    def _drain_queue(self) -> Batch:
+        rest = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                rest.append(item)
+        return rest
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self.queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            try:
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(self.queue.get(), remaining)
+                        except asyncio.TimeoutError:
+                            break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+            except asyncio.CancelledError:
+                # Bị cancel khi đang gom: batch đã lấy khỏi queue, không được mất im lặng
+                self._spill_or_drop(batch)
+                raise
+            await self._flush_shielded(batch)
+        # Sau sentinel: ghi nốt những gì còn trong queue
+        rest = self._drain_queue()
+        for i in range(0, len(rest), self.batch_size):
+            await self._flush_shielded(rest[i:i + self.batch_size])
+
+    async def _flush_shielded(self, batch: Batch) -> None:
+        """Cancel task nền (stop() quá hạn) không cắt ngang flush; stop() tự chờ/cancel `_inflight`."""
+        self._inflight = asyncio.ensure_future(self._flush(batch))
+        await asyncio.shield(self._inflight)
+
+    async def _flush(self, batch: Batch) -> None:
+        started = time.perf_counter()
+        try:
+            await self._insert(batch)
+        except asyncio.CancelledError:
+            # Chỉ xảy ra khi stop() cancel hẳn flush: commit có thể chưa xảy ra → spill (replay idempotent)
+            self._spill_or_drop(batch)
+            raise
+        except Exception as e:
+            self.metrics.failed_batches += 1
+            logger.warning("audit writer flush of %d rows failed: %s", len(batch), e)
+            if _is_outage(e):
+                self._spill_or_drop(batch)
+                return
+            await self._flush_rows(batch)
+            return
+        self.metrics.flushes += 1
+        self.metrics.written += len(batch)
+        self.metrics.last_flush_rows = len(batch)
+        self.metrics.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    async def _insert(self, batch: Batch) -> None:
+        by_table: Dict[Table, List[Dict[str, Any]]] = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        async with self.engine.begin() as conn:
+            for table, rows in by_table.items():
+                await conn.execute(insert(table).on_conflict_do_nothing(), rows)
+
+    async def _flush_rows(self, batch: Batch) -> None:
+        """Fallback sau khi batch lỗi: mỗi row một transaction, row lỗi tự thân bị cách ly."""
+        for i, item in enumerate(batch):
+            try:
+                await self._insert([item])
+            except asyncio.CancelledError:
+                self._spill_or_drop(batch[i:])
+                raise
+            except Exception as e:
+                if _is_outage(e):
+                    logger.warning("audit writer row fallback stopped, DB unavailable: %s", e)
+                    self._spill_or_drop(batch[i:])
+                    return
+                logger.error("audit writer quarantined row for %s: %s", item[0].fullname, e)
+                self._quarantine(item)
+                continue
+            self.metrics.written += 1
+
+    # ---------- spill file ----------
+
+    def _spill_or_drop(self, items: List[Tuple[Table, Dict[str, Any]]]) -> None:
+        if not items:
+            return
+        if self.spill_path:
+            self._spill(items)
+        else:
+            self.metrics.dropped += len(items)
+
+    def _spill(self, items: List[Tuple[Table, Dict[str, Any]]]) -> None:
+        # Append nhỏ, đồng bộ: chỉ xảy ra khi queue đầy hoặc DB lỗi
+        self._append(self.spill_path, items)
+        self.metrics.spilled += len(items)
+
+    def _quarantine(self, item: Tuple[Table, Dict[str, Any]]) -> None:
+        # File riêng, không bao giờ replay: cần người xem rồi sửa tay
+        if self.spill_path:
+            self._append(f"{self.spill_path}.quarantine", [item])
+        self.metrics.quarantined += 1
+
+    @staticmethod
+    def _append(path: str, items: List[Tuple[Table, Dict[str, Any]]]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            for table, row in items:
+                f.write(json.dumps({"table": table.fullname, "row": row}, default=str) + "\n")
+
+    async def _replay_spill(self) -> None:
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        # Đổi tên trước khi đọc để event spill trong lúc replay không bị mất
+        replay_path = f"{self.spill_path}.replay"
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                table = Base.metadata.tables.get(rec["table"])
+                if table is None:
+                    logger.warning("audit spill: unknown table %s", rec["table"])
+                    continue
+                await self.enqueue(table, _revive(table, rec["row"]))
+                self.metrics.replayed += 1
+        os.remove(replay_path)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "overflow": self.overflow,
+            "queue_depth": self.queue.qsize(),
+            "queue_max": self.queue.maxsize,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            **self.metrics.as_dict(),
+        }
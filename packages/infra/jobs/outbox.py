@@ -0,0 +1,218 @@
+"""
+Outbox dispatcher cho ops.event_outbox.
+
+Mỗi vòng là một transaction:
+
+    SELECT ... WHERE NOT published AND dead_lettered_at IS NULL AND available_at <= now()
+    ORDER BY created_at LIMIT n FOR UPDATE SKIP LOCKED      -- dùng ix_event_outbox_pending
+
+rồi gửi từng event qua `sink`, và trong cùng transaction:
+- một UPDATE ... WHERE id IN (...) đánh dấu published cho các event gửi được;
+- event lỗi: attempts + 1, available_at = now() + backoff; quá max_attempts → dead_lettered_at.
+
+Row bị khoá tới khi commit nên nhiều worker chạy song song không gửi trùng
+(SKIP LOCKED bỏ qua row worker khác đang giữ). Giao hàng là at-least-once: nếu
+process chết sau khi sink nhận nhưng trước commit, event sẽ được gửi lại.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from packages.infra.db.models.ops.event_outbox import EventOutbox
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class OutboxMessage:
+    id: uuid.UUID
+    aggregate: str
+    aggregate_id: uuid.UUID
+    event_type: str
+    payload: Dict[str, Any]
+    created_at: datetime
+    attempts: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": str(self.id),
+            "aggregate": self.aggregate,
+            "aggregate_id": str(self.aggregate_id),
+            "event_type": self.event_type,
+            "payload": self.payload,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class OutboxSink(Protocol):
+    async def publish(self, message: OutboxMessage) -> None:
+        """Gửi một event; raise nếu thất bại (event sẽ được retry)."""
+        ...
+
+
+class InMemorySink:
+    """Sink cho test/dev: giữ event trong list; `fail` trả True để giả lập lỗi."""
+
+    def __init__(self, fail: Optional[Callable[[OutboxMessage], bool]] = None) -> None:
+        self.messages: List[OutboxMessage] = []
+        self.fail = fail
+
+    async def publish(self, message: OutboxMessage) -> None:
+        if self.fail is not None and self.fail(message):
+            raise RuntimeError(f"sink rejected {message.id}")
+        self.messages.append(message)
+
+
+class FileSink:
+    """Append mỗi event thành một dòng JSON (dev / tích hợp đơn giản qua file)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    async def publish(self, message: OutboxMessage) -> None:
+        line = json.dumps(message.as_dict(), default=str) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+@dataclass(slots=True)
+class OutboxMetrics:
+    claimed: int = 0
+    published: int = 0
+    failed: int = 0
+    dead_lettered: int = 0
+    batches: int = 0
+    last_batch_ms: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "claimed": self.claimed,
+            "published": self.published,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+            "batches": self.batches,
+            "last_batch_ms": round(self.last_batch_ms, 3),
+            "last_error": self.last_error,
+        }
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        sink: OutboxSink,
+        *,
+        batch_size: int = 100,
+        max_attempts: int = 10,
+        backoff_base: float = 1.0,
+        backoff_max: float = 600.0,
+        idle_sleep: float = 1.0,
+    ) -> None:
+        self.engine = engine
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idle_sleep = idle_sleep
+        self.metrics = OutboxMetrics()
+
+    def backoff(self, attempts: int) -> float:
+        """Giây chờ trước lần thử kế tiếp sau `attempts` lần lỗi: base * 2^(attempts-1), chặn trên backoff_max."""
+        return min(self.backoff_base * (2 ** max(attempts - 1, 0)), self.backoff_max)
+
+    def claim_stmt(self):
+        t = EventOutbox.__table__
+        return (
+            select(t.c.id, t.c.aggregate, t.c.aggregate_id, t.c.event_type, t.c.payload, t.c.created_at, t.c.attempts)
+            .where(
+                ~t.c.published,  # khớp đúng predicate của partial index
+                t.c.dead_lettered_at.is_(None),
+                t.c.available_at <= func.now(),
+            )
+            .order_by(t.c.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+    async def run_once(self) -> int:
+        """Claim + gửi một batch. Trả về số event đã claim (0 = hàng đợi rỗng)."""
+        t = EventOutbox.__table__
+        started = time.perf_counter()
+        async with self.engine.begin() as conn:
+            rows = (await conn.execute(self.claim_stmt())).all()
+            if not rows:
+                return 0
+            done: List[uuid.UUID] = []
+            for r in rows:
+                msg = OutboxMessage(r.id, r.aggregate, r.aggregate_id, r.event_type, r.payload, r.created_at, r.attempts)
+                try:
+                    await self.sink.publish(msg)
+                except Exception as e:
+                    await self._record_failure(conn, msg, e)
+                else:
+                    done.append(msg.id)
+            if done:
+                await conn.execute(
+                    update(t)
+                    .where(t.c.id.in_(done))
+                    .values(published=True, published_at=func.now(), updated_at=func.now())
+                )
+        self.metrics.batches += 1
+        self.metrics.claimed += len(rows)
+        self.metrics.published += len(done)
+        self.metrics.last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+    async def _record_failure(self, conn, msg: OutboxMessage, error: Exception) -> None:
+        t = EventOutbox.__table__
+        attempts = msg.attempts + 1
+        dead = attempts >= self.max_attempts
+        values: Dict[str, Any] = {
+            "attempts": attempts,
+            "last_error": f"{type(error).__name__}: {error}"[:2000],
+            "updated_at": func.now(),
+        }
+        if dead:
+            values["dead_lettered_at"] = func.now()
+        else:
+            values["available_at"] = func.now() + timedelta(seconds=self.backoff(attempts))
+        await conn.execute(update(t).where(t.c.id == msg.id).values(**values))
+        self.metrics.failed += 1
+        self.metrics.dead_lettered += int(dead)
+        self.metrics.last_error = values["last_error"]
+        logger.warning("outbox event %s (%s) failed, attempt %d%s", msg.id, msg.event_type, attempts, " → dead-letter" if dead else "")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "sink": type(self.sink).__name__,
+            "batch_size": self.batch_size,
+            "max_attempts": self.max_attempts,
+            **self.metrics.as_dict(),
+        }
+
+
+async def run_outbox_dispatcher(dispatcher: OutboxDispatcher) -> None:
+    """Vòng lặp nền: batch đầy thì claim tiếp ngay, rỗng/thiếu thì nghỉ `idle_sleep`."""
+    while True:
+        try:
+            n = await dispatcher.run_once()
+        except Exception as e:
+            dispatcher.metrics.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("outbox dispatcher batch failed: %s", dispatcher.metrics.last_error)
+            n = 0
+        if n < dispatcher.batch_size:
+            await asyncio.sleep(dispatcher.idle_sleep)
@@ -0,0 +1,193 @@
+"""
+Refresher nền cho read model core.product_cards.
+
+Mỗi lượt (vài trăm ms tới vài giây):
+- refresh các id mà đường nóng (InventoryRepo) đã hoãn tới sau commit (`defer_card_refresh`):
+  nhiều checkout cùng sản phẩm trong một khoảng gộp thành một lần refresh, chạy trong
+  transaction riêng nên checkout không giữ khoá trên product_cards;
+- mỗi `sweep_interval` giây:
+    * sản phẩm có giá hẹn giờ vừa tới effective_at (không commit nào kích hoạt refresh);
+    * một lát card có in_stock lệch tồn kho thật (bù refresh hoãn bị mất khi process chết).
+- Lượt đầu: currency trong bảng khác PRODUCT_CARD_CURRENCY → dựng lại toàn bộ card.
+
+Mọi refresh đi qua `refresh_statements` (khoá advisory theo sản phẩm trước UPSERT).
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from packages.infra.db.models.core.product_card import ProductCard
+from packages.infra.repos.core.product_card_repo import (
+    CardRefreshQueue, due_price_products_select, refresh_statements, stock_drift_select, target_products,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ProductCardRefreshMetrics:
+    deferred_refreshed: int = 0
+    due_price_refreshed: int = 0
+    drift_refreshed: int = 0
+    rebuilds: int = 0
+    runs: int = 0
+    sweeps: int = 0
+    last_run_at: Optional[datetime] = None
+    last_run_ms: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "deferred_refreshed": self.deferred_refreshed,
+            "due_price_refreshed": self.due_price_refreshed,
+            "drift_refreshed": self.drift_refreshed,
+            "rebuilds": self.rebuilds,
+            "runs": self.runs,
+            "sweeps": self.sweeps,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_ms": round(self.last_run_ms, 3),
+            "last_error": self.last_error,
+        }
+
+
+def _chunks(ids: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+class ProductCardRefresher:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        queue: CardRefreshQueue,
+        *,
+        currency: str,
+        batch_size: int = 200,
+        sweep_interval: float = 60.0,
+        stock_sweep_slice: int = 5000,
+    ) -> None:
+        self.engine = engine
+        self.queue = queue
+        self.currency = currency
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self.stock_sweep_slice = stock_sweep_slice
+        self.metrics = ProductCardRefreshMetrics()
+        self._currency_checked = False
+        self._next_sweep = 0.0
+        self._price_since: Optional[datetime] = None  # now() của DB ở lượt quét giá trước
+        self._drift_after: Optional[Any] = None       # product_id cuối của lát quét in_stock trước
+
+    async def _refresh(self, *, product_ids: Iterable[Any] = (), variant_ids: Iterable[Any] = ()) -> None:
+        targets = target_products(set(product_ids), set(variant_ids), set())
+        if targets is None:
+            return
+        async with self.engine.begin() as conn:
+            for stmt in refresh_statements(targets, self.currency):
+                await conn.execute(stmt)
+
+    async def ensure_currency(self) -> bool:
+        """Card lưu currency khác setting (đổi PRODUCT_CARD_CURRENCY) → dựng lại cả bảng."""
+        c = ProductCard.__table__
+        async with self.engine.connect() as conn:
+            stale = (await conn.execute(select(c.c.product_id).where(c.c.currency != self.currency).limit(1))).first()
+        if stale is None:
+            return False
+        logger.warning("product_cards currency differs from %s, rebuilding all cards", self.currency)
+        async with self.engine.begin() as conn:
+            for stmt in refresh_statements(None, self.currency):
+                await conn.execute(stmt)
+        self.metrics.rebuilds += 1
+        return True
+
+    async def refresh_deferred(self) -> int:
+        products, variants = self.queue.drain()
+        try:
+            for chunk in _chunks(products, self.batch_size):
+                await self._refresh(product_ids=chunk)
+            for chunk in _chunks(variants, self.batch_size):
+                await self._refresh(variant_ids=chunk)
+        except Exception:
+            # Trả lại hàng đợi (refresh idempotent nên chunk đã xong có chạy lại cũng không sao)
+            self.queue.add(products, variants)
+            raise
+        n = len(products) + len(variants)
+        self.metrics.deferred_refreshed += n
+        return n
+
+    async def refresh_due_prices(self) -> int:
+        async with self.engine.connect() as conn:
+            started = (await conn.execute(select(func.now()))).scalar_one()
+        total = 0
+        while True:
+            async with self.engine.connect() as conn:
+                ids = (await conn.execute(
+                    due_price_products_select(self._price_since, self.batch_size, self.currency)
+                )).scalars().all()
+            if ids:
+                await self._refresh(product_ids=ids)
+                total += len(ids)
+            if len(ids) < self.batch_size:
+                break
+        self._price_since = started
+        self.metrics.due_price_refreshed += total
+        return total
+
+    async def sweep_stock_drift(self) -> int:
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(stock_drift_select(self._drift_after, self.stock_sweep_slice))).all()
+        # Lát cuối bảng → lượt sau quét lại từ đầu
+        self._drift_after = rows[-1].product_id if len(rows) == self.stock_sweep_slice else None
+        drifted = [r.product_id for r in rows if r.drifted]
+        for chunk in _chunks(drifted, self.batch_size):
+            await self._refresh(product_ids=chunk)
+        self.metrics.drift_refreshed += len(drifted)
+        return len(drifted)
+
+    async def run_once(self) -> int:
+        m = self.metrics
+        started = time.perf_counter()
+        done = 0
+        m.last_error = None
+        try:
+            if not self._currency_checked:
+                await self.ensure_currency()
+                self._currency_checked = True
+            done += await self.refresh_deferred()
+            if time.monotonic() >= self._next_sweep:
+                self._next_sweep = time.monotonic() + self.sweep_interval
+                done += await self.refresh_due_prices()
+                done += await self.sweep_stock_drift()
+                m.sweeps += 1
+        except Exception as e:
+            m.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("product card refresh failed: %s", m.last_error)
+        m.runs += 1
+        m.last_run_at = datetime.now(timezone.utc)
+        m.last_run_ms = (time.perf_counter() - started) * 1000
+        return done
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "currency": self.currency,
+            "pending": len(self.queue),
+            "dropped": self.queue.dropped,
+            "batch_size": self.batch_size,
+            "sweep_interval_s": self.sweep_interval,
+            **self.metrics.as_dict(),
+        }
+
+
+async def run_product_card_refresher(refresher: ProductCardRefresher, *, interval: float) -> None:
+    """Vòng lặp nền: mỗi `interval` giây refresh id đã hoãn, định kỳ quét giá hẹn giờ / lệch in_stock."""
+    while True:
+        await asyncio.sleep(interval)
+        await refresher.run_once()
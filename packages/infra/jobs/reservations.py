@@ -0,0 +1,113 @@
+"""
+Job trả hàng của hold hết hạn (core.inventory_reservations, status = 'active', expires_at <= now()).
+
+Mỗi batch là một transaction ngắn qua InventoryRepo.expire:
+
+    WITH done AS (UPDATE inventory_reservations SET status = 'expired'
+                  WHERE id IN (SELECT id ... ORDER BY expires_at LIMIT n FOR UPDATE SKIP LOCKED) ...)
+    UPDATE inventory_levels SET reserved = reserved - sum(qty) FROM done ...
+
+- SKIP LOCKED: không chờ hold đang được checkout commit / release cùng lúc.
+- Chạy qua session (không phải engine) để listener sau commit đẩy sản phẩm vào hàng đợi refresh
+  product_cards (in_stock) và xoá availability cache.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from packages.infra.repos.core.inventory_repo import InventoryRepo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ReservationExpiryMetrics:
+    expired_qty_total: int = 0
+    batches: int = 0
+    runs: int = 0
+    last_run_at: Optional[datetime] = None
+    last_run_qty: int = 0
+    last_run_ms: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "expired_qty_total": self.expired_qty_total,
+            "batches": self.batches,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_qty": self.last_run_qty,
+            "last_run_ms": round(self.last_run_ms, 3),
+            "last_error": self.last_error,
+        }
+
+
+class ReservationExpirer:
+    """Expire hold quá hạn theo batch; dừng khi một batch không còn gì hoặc chạm max_batches_per_run."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        batch_size: int = 500,
+        max_batches_per_run: int = 100,
+        lock_timeout_ms: int = 2000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_batches_per_run = max_batches_per_run
+        self.lock_timeout_ms = lock_timeout_ms
+        self.metrics = ReservationExpiryMetrics()
+
+    async def _expire_batch(self) -> int:
+        async with self.session_factory() as session:
+            # inventory_levels là row nóng (checkout): chờ lâu thì bỏ batch, lượt sau thử lại
+            await session.execute(text(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}"))
+            n = await InventoryRepo(session).expire(batch_size=self.batch_size)
+            await session.commit()
+            return n
+
+    async def run_once(self) -> int:
+        m = self.metrics
+        started = time.perf_counter()
+        expired = 0
+        m.last_error = None
+        try:
+            for _ in range(self.max_batches_per_run):
+                n = await self._expire_batch()
+                m.batches += 1
+                if not n:
+                    break
+                expired += n
+                m.expired_qty_total += n
+        except Exception as e:
+            m.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("reservation expiry failed: %s", m.last_error)
+        m.runs += 1
+        m.last_run_at = datetime.now(timezone.utc)
+        m.last_run_qty = expired
+        m.last_run_ms = (time.perf_counter() - started) * 1000
+        if expired:
+            logger.info("reservation expiry: released %d units in %.0f ms", expired, m.last_run_ms)
+        return expired
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "batch_size": self.batch_size,
+            "max_batches_per_run": self.max_batches_per_run,
+            **self.metrics.as_dict(),
+        }
+
+
+async def run_reservation_expiry(expirer: ReservationExpirer, *, interval: float) -> None:
+    """Vòng lặp nền: mỗi `interval` giây trả hàng của các hold đã hết hạn."""
+    while True:
+        await asyncio.sleep(interval)
+        await expirer.run_once()
@@ -0,0 +1,189 @@
+"""
+Retention worker cho các bảng ops chỉ-tăng (login_attempts, refresh_tokens, auth_sessions).
+
+Mỗi batch là một transaction ngắn:
+
+    DELETE FROM t WHERE (tableoid, ctid) IN (
+        SELECT tableoid, ctid FROM t WHERE <hết hạn> LIMIT n FOR UPDATE SKIP LOCKED
+    )
+
+- LIMIT giới hạn số row (và WAL, lock) mỗi transaction.
+- SKIP LOCKED: không bao giờ chờ row đang bị request khác giữ.
+- lock_timeout / statement_timeout đặt bằng SET LOCAL, chỉ áp dụng cho batch đó.
+- tableoid đi kèm ctid để vẫn đúng khi bảng là partitioned table (ctid chỉ duy nhất trong một partition).
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import ColumnElement, Table, and_, delete, exists, literal_column, or_, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from packages.infra.db.models.ops.auth_session import AuthSession
+from packages.infra.db.models.ops.login_attempt import LoginAttempt
+from packages.infra.db.models.ops.refresh_token import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RetentionPolicy:
+    """Một bảng + điều kiện "được phép xoá" (nhận cutoff, trả về WHERE trên alias của bảng)."""
+    name: str
+    table: Table
+    retention: timedelta
+    predicate: Callable[[Any, datetime], ColumnElement[bool]]
+    batch_size: int = 5000
+
+
+@dataclass(slots=True)
+class RetentionMetrics:
+    deleted_total: int = 0
+    batches: int = 0
+    runs: int = 0
+    last_run_at: Optional[datetime] = None
+    last_run_deleted: int = 0
+    last_run_ms: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "deleted_total": self.deleted_total,
+            "batches": self.batches,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_deleted": self.last_run_deleted,
+            "last_run_ms": round(self.last_run_ms, 3),
+            "last_error": self.last_error,
+        }
+
+
+def default_policies(
+    *,
+    login_attempts: Optional[timedelta],
+    refresh_tokens: timedelta,
+    auth_sessions: timedelta,
+    batch_size: int = 5000,
+) -> List[RetentionPolicy]:
+    """Policy mặc định. Thứ tự quan trọng: refresh_tokens trước auth_sessions (FK session_id).
+
+    login_attempts=None: bỏ qua bảng này (retention do PartitionManager drop partition).
+    """
+
+    def attempts_expired(t, cutoff):
+        return t.c.attempted_at < cutoff
+
+    def tokens_expired(t, cutoff):
+        # Token đã revoke vẫn cần giữ tới khi hết hạn để phát hiện reuse → chỉ xét expires_at
+        return t.c.expires_at < cutoff
+
+    def sessions_expired(t, cutoff):
+        rt = RefreshToken.__table__
+        # user_id trong EXISTS để dùng được ix_tokens_userid_expires
+        return and_(
+            or_(t.c.revoked_at < cutoff, t.c.last_seen_at < cutoff),
+            ~exists().where(rt.c.user_id == t.c.user_id, rt.c.session_id == t.c.id),
+        )
+
+    policies = []
+    if login_attempts is not None:
+        policies.append(RetentionPolicy("login_attempts", LoginAttempt.__table__, login_attempts, attempts_expired, batch_size))
+    policies.append(RetentionPolicy("refresh_tokens", RefreshToken.__table__, refresh_tokens, tokens_expired, batch_size))
+    policies.append(RetentionPolicy("auth_sessions", AuthSession.__table__, auth_sessions, sessions_expired, batch_size))
+    return policies
+
+
+class RetentionWorker:
+    """Xoá row hết hạn theo batch, có nghỉ giữa các batch và giới hạn số batch mỗi lượt chạy."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        policies: List[RetentionPolicy],
+        *,
+        pause: float = 0.1,
+        max_batches_per_run: int = 200,
+        lock_timeout_ms: int = 2000,
+        statement_timeout_ms: int = 30000,
+    ) -> None:
+        self.engine = engine
+        self.policies = policies
+        self.pause = pause
+        self.max_batches_per_run = max_batches_per_run
+        self.lock_timeout_ms = lock_timeout_ms
+        self.statement_timeout_ms = statement_timeout_ms
+        self.metrics: Dict[str, RetentionMetrics] = {p.name: RetentionMetrics() for p in policies}
+
+    def delete_batch_stmt(self, policy: RetentionPolicy, cutoff: datetime):
+        # Alias bảng trong subquery để không bị correlate với bảng của DELETE
+        victim = policy.table.alias("victim")
+        picked = (
+            select(literal_column("victim.tableoid"), literal_column("victim.ctid"))
+            .select_from(victim)
+            .where(policy.predicate(victim, cutoff))
+            .limit(policy.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        return delete(policy.table).where(
+            tuple_(literal_column("tableoid"), literal_column("ctid")).in_(picked)
+        )
+
+    async def _delete_batch(self, policy: RetentionPolicy, cutoff: datetime) -> int:
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}"))
+            await conn.execute(text(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}"))
+            result = await conn.execute(self.delete_batch_stmt(policy, cutoff))
+            return result.rowcount or 0
+
+    async def purge(self, policy: RetentionPolicy, *, now: Optional[datetime] = None) -> int:
+        """Chạy một lượt cho một bảng; dừng khi batch không đầy hoặc chạm max_batches_per_run."""
+        m = self.metrics[policy.name]
+        cutoff = (now or datetime.now(timezone.utc)) - policy.retention
+        started = time.perf_counter()
+        deleted = 0
+        m.last_error = None
+        try:
+            for _ in range(self.max_batches_per_run):
+                n = await self._delete_batch(policy, cutoff)
+                deleted += n
+                m.batches += 1
+                m.deleted_total += n
+                if n < policy.batch_size:
+                    break
+                if self.pause:
+                    await asyncio.sleep(self.pause)
+        except Exception as e:
+            # lock_timeout / statement_timeout: bỏ lượt này, lượt sau thử lại
+            m.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("retention %s failed: %s", policy.name, m.last_error)
+        m.runs += 1
+        m.last_run_at = datetime.now(timezone.utc)
+        m.last_run_deleted = deleted
+        m.last_run_ms = (time.perf_counter() - started) * 1000
+        if deleted:
+            logger.info("retention %s: deleted %d rows in %.0f ms", policy.name, deleted, m.last_run_ms)
+        return deleted
+
+    async def run_once(self) -> Dict[str, int]:
+        return {p.name: await self.purge(p) for p in self.policies}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            p.name: {
+                "retention_s": int(p.retention.total_seconds()),
+                "batch_size": p.batch_size,
+                **self.metrics[p.name].as_dict(),
+            }
+            for p in self.policies
+        }
+
+
+async def run_retention(worker: RetentionWorker, *, interval: float) -> None:
+    """Vòng lặp nền: mỗi `interval` giây chạy một lượt retention cho mọi bảng."""
+    while True:
+        await asyncio.sleep(interval)
+        await worker.run_once()
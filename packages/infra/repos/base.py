@@ -1,23 +1,34 @@
 from __future__ import annotations
-from typing import Any, Callable, Generic, Optional, Sequence, Type, TypeVar, List
-from sqlalchemy import Select, func, select
+from typing import Any, Callable, ClassVar, Dict, Generic, Iterable, Iterator, Mapping, Optional, Sequence, Type, TypeVar, List, Union
+from sqlalchemy import Select, func, literal, select, tuple_, update as sa_update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import ColumnElement
 
 from packages.infra.db.models.base import Base
-from packages.infra.repos.exceptions import NotFoundError, NotSoftDeletable
-from packages.infra.repos.types import Page, PageParams
+from packages.infra.repos.cursor import decode_cursor, encode_cursor
+from packages.infra.repos.exceptions import InvalidCursor, NotFoundError, NotSoftDeletable
+from packages.infra.repos.totals import ExactTotal, TotalStrategy, invalidate_totals
+from packages.infra.repos.types import CursorPage, Page, PageParams
 
 ModelT = TypeVar("ModelT", bound=Base)
 
+# asyncpg/PostgreSQL: tối đa 32767 bind params cho một câu lệnh
+PG_MAX_BIND_PARAMS = 32767
+
 
 class SQLAlchemyRepository(Generic[ModelT]):
     """Generic async repository for SQLAlchemy 2.0
     - Hỗ trợ soft delete (deleted_at)
     - Hỗ trợ phân trang
     - Dùng AsyncSession thay vì Session
+    - `total_strategy` (class-level) quyết định cách paginate tính total:
+      ExactTotal / EstimatedTotal / CachedTotal (xem repos/totals.py); các method ghi
+      xoá cache của CachedTotal
     """
 
+    total_strategy: ClassVar[TotalStrategy] = ExactTotal()
+
     def __init__(self, session: AsyncSession, model: Type[ModelT]):
         self.session = session
         self.model = model
@@ -31,6 +42,10 @@ class SQLAlchemyRepository(Generic[ModelT]):
         """Check xem model có cột `deleted_at` không (hỗ trợ soft delete)."""
         return hasattr(self.model, "deleted_at")
 
+    def _invalidate_totals(self) -> None:
+        """Sau mỗi lần ghi: xoá total đã cache nếu repo dùng CachedTotal."""
+        invalidate_totals(self.session, self.total_strategy)
+
     def _apply_live_filter(self, stmt: Select, with_deleted: bool) -> Select:
         """Nếu model hỗ trợ soft delete → lọc bỏ record đã xóa (deleted_at != NULL)."""
         if not with_deleted and self._has_soft_delete():
@@ -117,10 +132,12 @@ class SQLAlchemyRepository(Generic[ModelT]):
         order_by: Optional[Sequence[Any]] = None,
         with_deleted: bool = False,
     ) -> Page[ModelT]:
-        """Phân trang: trả về Page object (items, total, page, size)."""
-        count_stmt = select(func.count()).select_from(self.default_select(with_deleted).subquery())
-        count_stmt = self._apply_filters(count_stmt, filters)
-        total = (await self.session.execute(count_stmt)).scalar_one()
+        """Phân trang: trả về Page object (items, total, page, size).
+
+        Total tính theo `self.total_strategy`; nếu là ước lượng thì `Page.total_is_estimate=True`.
+        """
+        total_stmt = self._apply_filters(self.default_select(with_deleted), filters)
+        total, estimated = await self.total_strategy.total(self.session, total_stmt)
 
         size = min(max(params.size, 1), self._page_size_cap)
         page = max(params.page, 1)
@@ -133,12 +150,74 @@ class SQLAlchemyRepository(Generic[ModelT]):
             offset=offset,
             with_deleted=with_deleted,
         )
-        return Page(items=items, total=total, page=page, size=size)
+        return Page(items=items, total=total, page=page, size=size, total_is_estimate=estimated)
+
+    def _keyset_columns(self, order_by: Optional[Sequence[Any]]) -> List[Any]:
+        """Sort key cho keyset: các cột order_by + id làm tie-breaker (luôn ở cuối)."""
+        keys = list(order_by or [])
+        if not keys or keys[-1] is not self.model.id:
+            keys.append(self.model.id)
+        return keys
+
+    async def paginate_after(
+        self,
+        cursor: Optional[str] = None,
+        *,
+        size: int = 20,
+        order_by: Optional[Sequence[Any]] = None,
+        descending: bool = False,
+        filters: Optional[Sequence[ColumnElement[Any]]] = None,
+        with_deleted: bool = False,
+        total_strategy: Optional[TotalStrategy] = None,
+    ) -> CursorPage[ModelT]:
+        """Keyset (seek) pagination: WHERE (sort keys, id) > cursor ORDER BY ... LIMIT size+1.
+
+        - `order_by`: các cột (không phải biểu thức .desc()) dùng làm sort key, NOT NULL;
+          chiều sort chung cho mọi cột qua `descending`.
+        - `cursor`: chuỗi opaque lấy từ `next_cursor` của trang trước (None = trang đầu).
+          Cursor mang theo sort key + chiều sort; dùng với order_by/descending khác → InvalidCursor.
+        - Không dùng OFFSET nên độ trễ không tăng theo độ sâu trang, miễn có index
+          khớp với (sort keys..., id).
+        - `total_strategy`: mặc định None = bỏ qua COUNT(*) vì keyset không cần tổng;
+          truyền ExactTotal / EstimatedTotal / CachedTotal (vd. `self.total_strategy`) để có total.
+        """
+        keys = self._keyset_columns(order_by)
+        size = min(max(size, 1), self._page_size_cap)
+        # Phần tử đầu của cursor: cursor của sort khác không được dùng lại
+        tag = ",".join(k.key for k in keys) + (":desc" if descending else ":asc")
+
+        base = self._apply_filters(self.default_select(with_deleted), filters)
+        stmt = base
+        if cursor:
+            got, *values = decode_cursor(cursor, expected_len=len(keys) + 1)
+            if got != tag:
+                raise InvalidCursor("Pagination cursor does not match sort order")
+            row_key = tuple_(*keys)
+            after = tuple_(*[literal(v, k.type) for k, v in zip(keys, values)])
+            stmt = stmt.where(row_key < after if descending else row_key > after)
+        stmt = stmt.order_by(*[k.desc() if descending else k.asc() for k in keys])
+
+        result = await self.session.execute(stmt.limit(size + 1))
+        rows = list(result.scalars().all())
+        items = rows[:size]
+
+        next_cursor = None
+        if len(rows) > size:
+            last = items[-1]
+            next_cursor = encode_cursor([tag, *[getattr(last, k.key) for k in keys]])
+
+        total, estimated = None, False
+        if total_strategy is not None:
+            total, estimated = await total_strategy.total(self.session, base)
+        return CursorPage(
+            items=items, size=size, next_cursor=next_cursor, total=total, total_is_estimate=estimated
+        )
 
     async def add(self, obj: ModelT, *, commit: bool = False, refresh: bool = True) -> ModelT:
         """Thêm 1 object vào DB."""
         self.session.add(obj)
         await self.session.flush()
+        self._invalidate_totals()
         if commit:
             await self.session.commit()
         if refresh:
@@ -149,16 +228,146 @@ class SQLAlchemyRepository(Generic[ModelT]):
         """Thêm nhiều object 1 lần."""
         self.session.add_all(list(objs))
         await self.session.flush()
+        self._invalidate_totals()
         if commit:
             await self.session.commit()
         return list(objs)
 
+    # ----------------------
+    # Bulk (Core INSERT, không đi qua unit-of-work / identity map)
+    # ----------------------
+    def _bulk_chunks(self, rows: Iterable[Mapping[str, Any]], batch_size: int) -> Iterator[List[Mapping[str, Any]]]:
+        """Chia rows thành lô sao cho số bind params mỗi lô < giới hạn của PostgreSQL."""
+        n_cols = len(self.model.__table__.columns)
+        per_chunk = max(1, min(batch_size, PG_MAX_BIND_PARAMS // n_cols))
+        chunk: List[Mapping[str, Any]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= per_chunk:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _conflict_target(self, conflict: Union[str, Sequence[str]]) -> Dict[str, Any]:
+        """Chuyển `conflict` thành tham số cho on_conflict_*.
+
+        - Tên index (vd. "ux_variants_sku_live") → index_elements + index_where của partial index.
+        - Tên unique constraint → constraint=...
+        - List/tuple tên cột → index_elements (một cột cũng phải truyền dạng list).
+        Tên không khớp index/constraint/cột nào của bảng → ValueError.
+        """
+        table = self.model.__table__
+        if isinstance(conflict, str):
+            for idx in table.indexes:
+                if idx.name == conflict:
+                    return {
+                        "index_elements": [c.name for c in idx.columns],
+                        "index_where": idx.dialect_options["postgresql"]["where"],
+                    }
+            for cons in table.constraints:
+                if cons.name == conflict:
+                    return {"constraint": conflict}
+            raise ValueError(
+                f"{conflict!r} is not an index or constraint of {table.name}; "
+                "pass column names as a sequence"
+            )
+        columns = list(conflict)
+        unknown = [c for c in columns if c not in table.columns]
+        if not columns or unknown:
+            raise ValueError(f"invalid conflict columns for {table.name}: {unknown or columns}")
+        return {"index_elements": columns}
+
+    async def _execute_bulk(self, stmts: Iterable[Any], *, returning: bool) -> Union[List[Any], int]:
+        ids: List[Any] = []
+        affected = 0
+        for stmt in stmts:
+            if returning:
+                result = await self.session.execute(stmt.returning(self.model.id))
+                ids.extend(result.scalars().all())
+            else:
+                result = await self.session.execute(stmt)
+                affected += max(result.rowcount or 0, 0)
+        self._invalidate_totals()
+        return ids if returning else affected
+
+    async def bulk_insert(
+        self,
+        rows: Iterable[Mapping[str, Any]],
+        *,
+        returning: bool = False,
+        ignore_conflicts: bool = False,
+        conflict: Optional[Union[str, Sequence[str]]] = None,
+        batch_size: int = 1000,
+        commit: bool = False,
+    ) -> Union[List[Any], int]:
+        """Insert nhiều row bằng multi-row INSERT ... VALUES, chia lô theo giới hạn bind params.
+
+        - `rows`: list dict (mọi dict cùng bộ key), không tạo ORM object.
+        - `returning=True` → trả list id; ngược lại trả số row đã insert.
+        - `ignore_conflicts=True` → ON CONFLICT DO NOTHING (theo `conflict` nếu có).
+
+        Không đi qua flush nên listener after_flush không thấy các row này: ghi vào bảng
+        nguồn của product_cards / availability thì caller tự gọi `touch_products` /
+        `invalidate_availability` với id bị ảnh hưởng (dùng `returning=True` để lấy id).
+        """
+        def stmts():
+            for chunk in self._bulk_chunks(rows, batch_size):
+                stmt = pg_insert(self.model).values(chunk)
+                if ignore_conflicts:
+                    target = self._conflict_target(conflict) if conflict else {}
+                    stmt = stmt.on_conflict_do_nothing(**target)
+                yield stmt
+
+        out = await self._execute_bulk(stmts(), returning=returning)
+        if commit:
+            await self.session.commit()
+        return out
+
+    async def bulk_upsert(
+        self,
+        rows: Iterable[Mapping[str, Any]],
+        *,
+        conflict: Union[str, Sequence[str]],
+        update_columns: Optional[Sequence[str]] = None,
+        returning: bool = False,
+        batch_size: int = 1000,
+        commit: bool = False,
+    ) -> Union[List[Any], int]:
+        """INSERT ... ON CONFLICT DO UPDATE theo index/constraint `conflict`.
+
+        Ví dụ: `variants.bulk_upsert(rows, conflict="ux_variants_sku_live")` dùng đúng
+        partial unique index (sku) WHERE deleted_at IS NULL.
+        - `update_columns`: cột được ghi đè khi trùng; mặc định = mọi key của row
+          trừ cột conflict, id, created_at. updated_at luôn được set now().
+
+        Như `bulk_insert`: không qua flush nên không kích hoạt listener product_cards /
+        availability; caller tự gọi `touch_products` / `invalidate_availability`.
+        """
+        target = self._conflict_target(conflict)
+        skip = set(target.get("index_elements") or []) | {"id", "created_at"}
+
+        def stmts():
+            for chunk in self._bulk_chunks(rows, batch_size):
+                stmt = pg_insert(self.model).values(chunk)
+                cols = list(update_columns) if update_columns is not None else [k for k in chunk[0] if k not in skip]
+                set_ = {c: stmt.excluded[c] for c in cols}
+                if hasattr(self.model, "updated_at") and "updated_at" not in set_:
+                    set_["updated_at"] = func.now()
+                yield stmt.on_conflict_do_update(set_=set_, **target)
+
+        out = await self._execute_bulk(stmts(), returning=returning)
+        if commit:
+            await self.session.commit()
+        return out
+
     async def update(self, obj: ModelT, data: dict[str, Any], *, commit: bool = False, refresh: bool = True) -> ModelT:
         """Update object theo dict data."""
         for k, v in data.items():
             if hasattr(obj, k):
                 setattr(obj, k, v)
         await self.session.flush()
+        self._invalidate_totals()
         if commit:
             await self.session.commit()
         if refresh:
@@ -171,6 +380,7 @@ class SQLAlchemyRepository(Generic[ModelT]):
             raise NotSoftDeletable(f"{self.model.__name__} does not support soft delete (missing deleted_at)")
         setattr(obj, "deleted_at", func.now())
         await self.session.flush()
+        self._invalidate_totals()
         if commit:
             await self.session.commit()
 
@@ -180,13 +390,92 @@ class SQLAlchemyRepository(Generic[ModelT]):
             raise NotSoftDeletable(f"{self.model.__name__} does not support soft delete (missing deleted_at)")
         setattr(obj, "deleted_at", None)
         await self.session.flush()
+        self._invalidate_totals()
         if commit:
             await self.session.commit()
 
+    # ----------------------
+    # Set-based update (một câu UPDATE ... WHERE, không load từng object)
+    # ----------------------
+    async def update_where(
+        self,
+        filters: Sequence[ColumnElement[Any]],
+        values: Mapping[str, Any],
+        *,
+        returning: bool = False,
+        with_deleted: bool = False,
+        commit: bool = False,
+    ) -> Union[List[Any], int]:
+        """UPDATE model SET values WHERE filters (mặc định chỉ row chưa soft delete).
+
+        Dùng ORM-enabled UPDATE với synchronize_session="fetch": PostgreSQL trả id qua
+        RETURNING trong cùng round-trip, và các object đã có trong identity map được
+        cập nhật theo, không cần load từng row.
+        Trả list id nếu `returning=True`, ngược lại trả số row bị ảnh hưởng.
+        """
+        if not filters:
+            raise ValueError("update_where requires at least one filter")
+        stmt = sa_update(self.model)
+        stmt = self._apply_live_filter(stmt, with_deleted)
+        stmt = self._apply_filters(stmt, filters).values(dict(values))
+        stmt = stmt.execution_options(synchronize_session="fetch")
+
+        if returning:
+            result = await self.session.execute(stmt.returning(self.model.id))
+            out: Union[List[Any], int] = list(result.scalars().all())
+        else:
+            result = await self.session.execute(stmt)
+            out = max(result.rowcount or 0, 0)
+        self._invalidate_totals()
+        if commit:
+            await self.session.commit()
+        return out
+
+    async def soft_delete_where(
+        self,
+        filters: Sequence[ColumnElement[Any]],
+        *,
+        deleted_by: Optional[Any] = None,
+        reason: Optional[str] = None,
+        returning: bool = False,
+        commit: bool = False,
+    ) -> Union[List[Any], int]:
+        """Soft delete hàng loạt: set deleted_at = now(), deleted_by, delete_reason cho row còn live."""
+        if not self._has_soft_delete():
+            raise NotSoftDeletable(f"{self.model.__name__} does not support soft delete (missing deleted_at)")
+        values: Dict[str, Any] = {"deleted_at": func.now()}
+        if hasattr(self.model, "deleted_by"):
+            values["deleted_by"] = deleted_by
+        if hasattr(self.model, "delete_reason"):
+            values["delete_reason"] = reason
+        return await self.update_where(filters, values, returning=returning, commit=commit)
+
+    async def restore_where(
+        self,
+        filters: Sequence[ColumnElement[Any]],
+        *,
+        returning: bool = False,
+        commit: bool = False,
+    ) -> Union[List[Any], int]:
+        """Khôi phục hàng loạt các row đã soft delete match filters."""
+        # Kiểm tra trước khi thêm điều kiện deleted_at, nếu không guard của update_where không bao giờ bắt được.
+        if not filters:
+            raise ValueError("restore_where requires at least one filter")
+        if not self._has_soft_delete():
+            raise NotSoftDeletable(f"{self.model.__name__} does not support soft delete (missing deleted_at)")
+        values: Dict[str, Any] = {"deleted_at": None}
+        if hasattr(self.model, "deleted_by"):
+            values["deleted_by"] = None
+        if hasattr(self.model, "delete_reason"):
+            values["delete_reason"] = None
+        filters = [*filters, getattr(self.model, "deleted_at").is_not(None)]
+        return await self.update_where(filters, values, returning=returning, with_deleted=True, commit=commit)
+
     async def hard_delete(self, obj: ModelT, *, commit: bool = False) -> None:
         """Xóa hẳn object khỏi DB."""
         await self.session.delete(obj)
         await self.session.flush()
+        self._invalidate_totals()
         if commit:
             await self.session.commit()
 
@@ -199,7 +488,7 @@ class SQLAlchemyRepository(Generic[ModelT]):
 
     async def count(self, *, filters: Optional[Sequence[ColumnElement[Any]]] = None, with_deleted: bool = False) -> int:
         """Đếm số lượng object match filter."""
-        stmt = select(func.count()).select_from(self.default_select(with_deleted).subquery())
-        stmt = self._apply_filters(stmt, filters)
+        inner = self._apply_filters(self.default_select(with_deleted), filters)
+        stmt = select(func.count()).select_from(inner.subquery())
         result = await self.session.execute(stmt)
         return int(result.scalar_one())
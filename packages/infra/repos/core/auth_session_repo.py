@@ -1,8 +1,9 @@
+import uuid
 from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
 from sqlalchemy.dialects.postgresql import INET
-from sqlalchemy import bindparam
+from sqlalchemy import bindparam, func, update
 
 from packages.infra.db.models.ops.auth_session import AuthSession
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,14 +21,22 @@ class AuthSessionRepo:
         - user_id: ID của người dùng.
         - ip: Địa chỉ IP của người dùng (có thể None).
         - user_agent: Thông tin trình duyệt/thiết bị (có thể None).
-        Trả về đối tượng AuthSession vừa tạo (đã có id).
+        Trả về đối tượng AuthSession vừa tạo (đã có id, chưa flush).
         """
         sess = AuthSession(
+            id=uuid.uuid4(),  # Gán id phía client để không cần flush giữa request
             user_id=user_id,
             ip=bindparam("ip", ip, type_=INET()),
             user_agent=user_agent,
             last_seen_at=datetime.now(timezone.utc)  # Ghi nhận thời điểm tạo phiên
         )
-        self.s.add(sess)  # Thêm phiên vào session
-        await self.s.flush()  # Đẩy thay đổi lên DB để lấy id tự sinh
-        return sess  # Trả về phiên vừa tạo
\ No newline at end of file
+        self.s.add(sess)  # Thêm phiên vào session, ghi xuống DB khi commit
+        return sess  # Trả về phiên vừa tạo
+
+    async def revoke(self, session_id: UUID) -> None:
+        """Thu hồi phiên đăng nhập (vd. khi refresh token của phiên bị dùng lại)."""
+        await self.s.execute(
+            update(AuthSession)
+            .where(AuthSession.id == session_id, AuthSession.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
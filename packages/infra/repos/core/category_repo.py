@@ -0,0 +1,226 @@
+"""
+Cây category qua closure table core.category_closure.
+
+Mỗi cặp (ancestor, descendant) một row kèm depth, kể cả (id, id, 0), nên:
+- subtree   = WHERE ancestor_id = :id            (PK)
+- ancestors = WHERE descendant_id = :id          (ix_category_closure_descendant)
+và lọc sản phẩm theo cả cây con chỉ là một IN (subquery) trên product_categories.
+
+Đồng bộ qua session listener (giống read model product_cards):
+- `after_flush`: category mới → thêm row; đổi parent_id → detach subtree khỏi tổ tiên cũ
+  rồi gắn vào tổ tiên mới; chặn cycle bằng InvalidHierarchy.
+- `before_flush`: category bị xoá cứng → nhớ các con trực tiếp (DB set parent_id = NULL)
+  để detach chúng sau flush.
+- Ghi category bằng Core / SQL thô không đi qua flush → gọi `CategoryRepo.rebuild_closure`.
+"""
+from __future__ import annotations
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, delete, event, exists, inspect, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from packages.core.application.catalog.dto import CategoryCrumb, CategoryNode
+from packages.infra.db.models.core.category import Category, CategoryClosure, ProductCategory
+from packages.infra.repos.base import SQLAlchemyRepository
+from packages.infra.repos.exceptions import InvalidHierarchy, NotFoundError
+
+_ORPHANS_KEY = "category_closure.orphans"
+
+# Chặn vòng lặp vô hạn của recursive CTE nếu parent_id bị ghi thành cycle ngoài ORM
+MAX_CATEGORY_DEPTH = 64
+
+
+def subtree_ids_select(category_ids: Iterable[Any], *, include_self: bool = True) -> Select:
+    """SELECT id các category (còn sống) thuộc cây con của `category_ids`."""
+    cc = CategoryClosure.__table__
+    c = Category.__table__
+    stmt = (
+        select(cc.c.descendant_id)
+        .join(c, c.c.id == cc.c.descendant_id)
+        .where(cc.c.ancestor_id.in_(list(category_ids)), c.c.deleted_at.is_(None))
+    )
+    if not include_self:
+        stmt = stmt.where(cc.c.depth > 0)
+    return stmt
+
+
+def subtree_product_ids_select(category_ids: Iterable[Any]) -> Select:
+    """SELECT DISTINCT product_id gắn với bất kỳ category nào trong cây con."""
+    pc = ProductCategory.__table__
+    return (
+        select(pc.c.product_id)
+        .where(pc.c.category_id.in_(subtree_ids_select(category_ids)))
+        .distinct()
+    )
+
+
+def rebuild_closure_statements() -> List[Any]:
+    """DELETE toàn bộ closure rồi dựng lại từ parent_id bằng recursive CTE."""
+    cc = CategoryClosure.__table__
+    c = Category.__table__
+    tree = (
+        select(c.c.id.label("ancestor_id"), c.c.id.label("descendant_id"), literal(0).label("depth"))
+        .cte("tree", recursive=True)
+    )
+    child = c.alias("child")
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, child.c.id, tree.c.depth + 1)
+        .join(child, child.c.parent_id == tree.c.descendant_id)
+        .where(tree.c.depth < MAX_CATEGORY_DEPTH)
+    )
+    fill = pg_insert(cc).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth),
+    )
+    return [delete(cc), fill]
+
+
+def _relink(session: Session, category_id: uuid.UUID, parent_id: Optional[uuid.UUID], *, is_new: bool) -> None:
+    """Gắn (lại) cây con của `category_id` dưới `parent_id` (None = thành gốc)."""
+    cc = CategoryClosure.__table__
+    if is_new:
+        session.execute(
+            pg_insert(cc)
+            .values(ancestor_id=category_id, descendant_id=category_id, depth=0)
+            .on_conflict_do_nothing()
+        )
+    else:
+        sub = cc.alias("sub")
+        moved = select(sub.c.descendant_id).where(sub.c.ancestor_id == category_id)
+        session.execute(delete(cc).where(cc.c.descendant_id.in_(moved), cc.c.ancestor_id.not_in(moved)))
+    if parent_id is None:
+        return
+    if parent_id == category_id or session.execute(
+        select(exists().where(cc.c.ancestor_id == category_id, cc.c.descendant_id == parent_id))
+    ).scalar():
+        raise InvalidHierarchy(f"Category {category_id} cannot be moved under its own descendant {parent_id}")
+    sup = cc.alias("sup")
+    sub = cc.alias("sub")
+    session.execute(
+        pg_insert(cc).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(sup.c.ancestor_id, sub.c.descendant_id, sup.c.depth + sub.c.depth + 1)
+            .where(sup.c.descendant_id == parent_id, sub.c.ancestor_id == category_id),
+        )
+    )
+
+
+def _parents_first(changed: Dict[uuid.UUID, Tuple[Optional[uuid.UUID], bool]]):
+    """Sắp thứ tự để parent cũng thay đổi trong cùng flush được xử lý trước con."""
+    pending = dict(changed)
+    while pending:
+        ready = [cid for cid, (parent_id, _) in pending.items() if parent_id not in pending or parent_id == cid]
+        if not ready:
+            # Cycle ngay trong flush: xử lý tiếp để _relink báo InvalidHierarchy
+            ready = [next(iter(pending))]
+        for cid in ready:
+            parent_id, is_new = pending.pop(cid)
+            yield cid, parent_id, is_new
+
+
+def _parent_changed(obj: Category) -> bool:
+    state = inspect(obj)
+    return state.attrs.parent_id.history.has_changes() or state.attrs.parent.history.has_changes()
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_orphans(session: Session, flush_context: Any, instances: Any) -> None:
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, Category)}
+    if not deleted:
+        return
+    cc = CategoryClosure.__table__
+    children = session.execute(
+        select(cc.c.descendant_id).where(cc.c.ancestor_id.in_(deleted), cc.c.depth == 1)
+    ).scalars().all()
+    session.info.setdefault(_ORPHANS_KEY, set()).update(set(children) - deleted)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_closure(session: Session, flush_context: Any) -> None:
+    changed: Dict[uuid.UUID, Tuple[Optional[uuid.UUID], bool]] = {}
+    for obj in session.new:
+        if isinstance(obj, Category):
+            changed[obj.id] = (obj.parent_id, True)
+    for obj in session.dirty:
+        if isinstance(obj, Category) and obj.id not in changed and _parent_changed(obj):
+            changed[obj.id] = (obj.parent_id, False)
+    for orphan_id in session.info.pop(_ORPHANS_KEY, set()):
+        changed.setdefault(orphan_id, (None, False))
+    for category_id, parent_id, is_new in _parents_first(changed):
+        _relink(session, category_id, parent_id, is_new=is_new)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(_ORPHANS_KEY, None)
+
+
+class CategoryRepo(SQLAlchemyRepository[Category]):
+    """Category + truy vấn cây (subtree / ancestors / breadcrumb) trên closure table."""
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Category)
+
+    async def subtree_ids(self, category_id: uuid.UUID, *, include_self: bool = True) -> List[uuid.UUID]:
+        rows = await self.session.execute(subtree_ids_select([category_id], include_self=include_self))
+        return list(rows.scalars().all())
+
+    async def subtree(self, category_id: uuid.UUID, *, max_depth: Optional[int] = None) -> List[CategoryNode]:
+        """Toàn bộ cây con (kể cả chính nó), theo depth rồi name. Category không tồn tại → NotFoundError."""
+        cc = CategoryClosure.__table__
+        c = Category.__table__
+        stmt = (
+            select(c.c.id, c.c.parent_id, c.c.name, c.c.slug, cc.c.depth)
+            .join(cc, cc.c.descendant_id == c.c.id)
+            .where(cc.c.ancestor_id == category_id, c.c.deleted_at.is_(None))
+            .order_by(cc.c.depth, c.c.name)
+        )
+        if max_depth is not None:
+            stmt = stmt.where(cc.c.depth <= max_depth)
+        rows = (await self.session.execute(stmt)).mappings().all()
+        if not rows or rows[0]["depth"] != 0:
+            raise NotFoundError("Category not found")
+        return [CategoryNode(**r) for r in rows]
+
+    async def ancestors(self, category_id: uuid.UUID, *, include_self: bool = False) -> List[Category]:
+        """Các category tổ tiên, từ gốc xuống (không load products)."""
+        cc = CategoryClosure.__table__
+        stmt = (
+            select(Category)
+            .join(cc, cc.c.ancestor_id == Category.id)
+            .where(cc.c.descendant_id == category_id, Category.deleted_at.is_(None))
+            .order_by(cc.c.depth.desc())
+        )
+        if not include_self:
+            stmt = stmt.where(cc.c.depth > 0)
+        return list((await self.session.execute(stmt)).scalars().all())
+
+    async def breadcrumb(self, category_id: uuid.UUID) -> List[CategoryCrumb]:
+        """Đường dẫn gốc → category trong một query. Category không tồn tại → NotFoundError."""
+        cc = CategoryClosure.__table__
+        c = Category.__table__
+        stmt = (
+            select(c.c.id, c.c.name, c.c.slug, cc.c.depth)
+            .join(cc, cc.c.ancestor_id == c.c.id)
+            .where(cc.c.descendant_id == category_id, c.c.deleted_at.is_(None))
+            .order_by(cc.c.depth.desc())
+        )
+        rows = (await self.session.execute(stmt)).mappings().all()
+        if not rows or rows[-1]["depth"] != 0:
+            raise NotFoundError("Category not found")
+        return [CategoryCrumb(id=r["id"], name=r["name"], slug=r["slug"]) for r in rows]
+
+    async def product_ids(self, category_id: uuid.UUID) -> List[uuid.UUID]:
+        """Id sản phẩm thuộc category hoặc bất kỳ category con nào."""
+        rows = await self.session.execute(subtree_product_ids_select([category_id]))
+        return list(rows.scalars().all())
+
+    async def rebuild_closure(self, *, commit: bool = False) -> None:
+        """Dựng lại closure từ parent_id (sau khi ghi categories ngoài ORM)."""
+        for stmt in rebuild_closure_statements():
+            await self.session.execute(stmt)
+        if commit:
+            await self.session.commit()
@@ -2,6 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
+from packages.infra.cache.principal import invalidate_principal
 from packages.infra.db.models.core.address import Address
 from packages.infra.db.models.core.customer import Customer
 from packages.infra.repos.base import SQLAlchemyRepository
@@ -59,6 +60,7 @@ class CustomerRepo(SQLAlchemyRepository[Customer]):
         obj = Customer(user_id=user_id, tier=tier)
         self.session.add(obj)
         await self.session.flush()
+        invalidate_principal(self.session, user_id)  # principal giờ có customer_id
 
         if commit:
             await self.session.commit()
@@ -0,0 +1,242 @@
+"""
+Giữ hàng (reserve) / trả (release) / xuất kho (commit) trên core.inventory_levels.
+
+Mọi thao tác là một câu lệnh điều kiện, không SELECT rồi mới UPDATE:
+
+    reserve:  WITH locked AS MATERIALIZED (SELECT ... FROM inventory_levels JOIN (VALUES ...) AS wanted
+                                           ORDER BY variant_id, location_id FOR UPDATE)
+              UPDATE inventory_levels SET reserved = reserved + wanted.qty
+              FROM (VALUES ...) AS wanted(variant_id, location_id, qty), locked
+              WHERE ... AND on_hand - reserved >= wanted.qty
+              RETURNING variant_id, location_id
+
+    release / commit / expire:
+              WITH done AS (UPDATE inventory_reservations SET status = ... WHERE status = 'active' ... RETURNING ...),
+                   freed AS (SELECT variant_id, location_id, sum(qty) FROM done GROUP BY ...),
+                   locked AS MATERIALIZED (SELECT ... FROM inventory_levels JOIN freed
+                                           ORDER BY variant_id, location_id FOR UPDATE)
+              UPDATE inventory_levels SET reserved = reserved - freed.qty [, on_hand = on_hand - freed.qty]
+              FROM freed, locked ...
+
+- `locked` (cả reserve lẫn settle) khoá row inventory_levels theo thứ tự (variant_id, location_id)
+  nên checkout / release / commit chồng SKU không deadlock.
+- reserve chạy trong SAVEPOINT: thiếu hàng ở bất kỳ dòng nào → rollback savepoint (kể cả row lock)
+  và raise InsufficientStock; transaction ngoài vẫn dùng tiếp được.
+- status = 'active' trong điều kiện UPDATE làm release / commit / expire idempotent và loại trừ nhau.
+- Row lock giữ tới khi transaction commit: caller commit ngay sau reserve, không await
+  việc khác (payment, HTTP...) giữa chừng. Hold (inventory_reservations) mới là thứ giữ hàng lâu.
+- Không refresh product_cards trong transaction này (sẽ xếp hàng mọi checkout của sản phẩm sau
+  row lock của card): `defer_card_refresh` để ProductCardRefresher làm sau commit.
+"""
+from __future__ import annotations
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, column, func, insert, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from packages.core.application.errors import InsufficientStock
+from packages.core.application.inventory.dto import Hold, ReserveLine, Shortage
+from packages.infra.cache.availability import invalidate_availability
+from packages.infra.db.models.core.inventory_level import InventoryLevel
+from packages.infra.db.models.core.inventory_reservation import InventoryReservation
+from packages.infra.repos.core.product_card_repo import defer_card_refresh
+
+DEFAULT_HOLD_TTL = timedelta(minutes=15)
+
+
+def _merge_lines(lines: Iterable[ReserveLine]) -> List[ReserveLine]:
+    """Gộp dòng trùng (variant, location): UPDATE ... FROM chỉ cập nhật mỗi row một lần."""
+    qty: Dict[Tuple[uuid.UUID, uuid.UUID], int] = defaultdict(int)
+    for line in lines:
+        qty[(line.variant_id, line.location_id)] += line.qty
+    return [ReserveLine(variant_id=v, location_id=loc, qty=n) for (v, loc), n in sorted(qty.items())]
+
+
+def reserve_stmt(lines: List[ReserveLine]):
+    """UPDATE cộng reserved cho các dòng còn đủ hàng; RETURNING (variant_id, location_id) đã giữ."""
+    il = InventoryLevel.__table__
+    wanted = values(
+        column("variant_id", UUID(as_uuid=True)),
+        column("location_id", UUID(as_uuid=True)),
+        column("qty", Integer),
+        name="wanted",
+    ).data([(l.variant_id, l.location_id, l.qty) for l in lines])
+    locked = (
+        select(il.c.variant_id, il.c.location_id)
+        .join(wanted, and_(il.c.variant_id == wanted.c.variant_id, il.c.location_id == wanted.c.location_id))
+        .where(il.c.deleted_at.is_(None))
+        .order_by(il.c.variant_id, il.c.location_id)
+        .with_for_update(of=il)
+        .cte("locked")
+        .prefix_with("MATERIALIZED")
+    )
+    return (
+        update(il)
+        .where(
+            il.c.variant_id == wanted.c.variant_id,
+            il.c.location_id == wanted.c.location_id,
+            il.c.variant_id == locked.c.variant_id,
+            il.c.location_id == locked.c.location_id,
+            il.c.on_hand - il.c.reserved >= wanted.c.qty,
+        )
+        .values(reserved=il.c.reserved + wanted.c.qty, updated_at=func.now())
+        .returning(il.c.variant_id, il.c.location_id)
+    )
+
+
+def settle_stmt(where: List[Any], *, status: str, consume: bool, limit: Optional[int] = None):
+    """Đóng các dòng hold active khớp `where` và trả reserved (consume=True: trừ luôn on_hand).
+
+    RETURNING (variant_id, location_id, qty) đã trả về inventory_levels.
+    """
+    r = InventoryReservation.__table__
+    il = InventoryLevel.__table__
+    target = select(r.c.id).where(r.c.status == "active", *where)
+    if limit is not None:
+        # Job hết hạn: từng batch, bỏ qua dòng đang bị release/commit giữ khoá
+        target = target.order_by(r.c.expires_at).limit(limit).with_for_update(skip_locked=True)
+    done = (
+        update(r)
+        .where(r.c.id.in_(target.scalar_subquery()), r.c.status == "active")
+        .values(status=status, updated_at=func.now())
+        .returning(r.c.variant_id, r.c.location_id, r.c.qty)
+        .cte("done")
+    )
+    freed = (
+        select(done.c.variant_id, done.c.location_id, func.sum(done.c.qty).label("qty"))
+        .group_by(done.c.variant_id, done.c.location_id)
+        .cte("freed")
+    )
+    # Cùng thứ tự khoá với reserve_stmt
+    locked = (
+        select(il.c.variant_id, il.c.location_id)
+        .join(freed, and_(il.c.variant_id == freed.c.variant_id, il.c.location_id == freed.c.location_id))
+        .order_by(il.c.variant_id, il.c.location_id)
+        .with_for_update(of=il)
+        .cte("locked")
+        .prefix_with("MATERIALIZED")
+    )
+    new_values: Dict[str, Any] = {"reserved": il.c.reserved - freed.c.qty, "updated_at": func.now()}
+    if consume:
+        new_values["on_hand"] = il.c.on_hand - freed.c.qty
+    return (
+        update(il)
+        .where(
+            il.c.variant_id == freed.c.variant_id,
+            il.c.location_id == freed.c.location_id,
+            il.c.variant_id == locked.c.variant_id,
+            il.c.location_id == locked.c.location_id,
+        )
+        .values(**new_values)
+        .returning(il.c.variant_id, il.c.location_id, freed.c.qty)
+    )
+
+
+class InventoryRepo:
+    """Tồn kho khả dụng + vòng đời hold: reserve → commit (xuất kho) | release | expire."""
+
+    def __init__(self, session: AsyncSession, *, hold_ttl: timedelta = DEFAULT_HOLD_TTL) -> None:
+        self.s = session
+        self.hold_ttl = hold_ttl
+
+    async def available(self, variant_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, int]:
+        """on_hand - reserved cộng mọi location, theo variant (variant không có tồn → 0).
+
+        SELECT thuần nên có thể đọc replica: chỉ để hiển thị, reserve() mới là chỗ quyết định.
+        """
+        il = InventoryLevel.__table__
+        ids = list(variant_ids)
+        if not ids:
+            return {}
+        rows = await self.s.execute(
+            select(il.c.variant_id, func.sum(il.c.on_hand - il.c.reserved))
+            .where(il.c.variant_id.in_(ids), il.c.deleted_at.is_(None))
+            .group_by(il.c.variant_id)
+        )
+        out = {v: 0 for v in ids}
+        out.update({v: int(n) for v, n in rows.all()})
+        return out
+
+    async def reserve(
+        self,
+        lines: Iterable[ReserveLine],
+        *,
+        reference: Optional[str] = None,
+        ttl: Optional[timedelta] = None,
+    ) -> Hold:
+        """Giữ tất cả dòng hoặc không dòng nào (SAVEPOINT). Thiếu hàng → InsufficientStock."""
+        merged = _merge_lines(lines)
+        if not merged:
+            raise ValueError("reserve() needs at least one line")
+        hold_id = uuid.uuid4()
+        ttl = ttl or self.hold_ttl
+        r = InventoryReservation.__table__
+        async with self.s.begin_nested():
+            got = {tuple(row) for row in (await self.s.execute(reserve_stmt(merged))).all()}
+            missing = [l for l in merged if (l.variant_id, l.location_id) not in got]
+            if missing:
+                # raise trong block → rollback savepoint: các dòng đã cộng reserved được trả lại
+                raise InsufficientStock(await self._shortages(missing))
+            rows = (await self.s.execute(
+                insert(r)
+                .values([
+                    {
+                        "id": uuid.uuid4(), "hold_id": hold_id, "reference": reference,
+                        "variant_id": l.variant_id, "location_id": l.location_id, "qty": l.qty,
+                        "expires_at": func.now() + ttl,
+                    }
+                    for l in merged
+                ])
+                .returning(r.c.expires_at)
+            )).all()
+        self._touch([l.variant_id for l in merged])
+        return Hold(hold_id=hold_id, reference=reference, expires_at=rows[0].expires_at, lines=merged)
+
+    def _touch(self, variant_ids: List[uuid.UUID]) -> None:
+        # Ghi bằng Core không đi qua flush: tự báo cho product_cards (in_stock, sau commit) và availability cache
+        defer_card_refresh(self.s, variant_ids=variant_ids)
+        invalidate_availability(self.s, variant_ids)
+
+    async def _shortages(self, lines: List[ReserveLine]) -> List[Shortage]:
+        il = InventoryLevel.__table__
+        keys = [(l.variant_id, l.location_id) for l in lines]
+        rows = await self.s.execute(
+            select(il.c.variant_id, il.c.location_id, il.c.on_hand - il.c.reserved)
+            .where(tuple_(il.c.variant_id, il.c.location_id).in_(keys), il.c.deleted_at.is_(None))
+        )
+        left = {(v, loc): int(n) for v, loc, n in rows.all()}
+        return [
+            Shortage(variant_id=l.variant_id, location_id=l.location_id, requested=l.qty,
+                     available=left.get((l.variant_id, l.location_id)))
+            for l in lines
+        ]
+
+    async def _settle(self, hold_id: uuid.UUID, *, status: str, consume: bool) -> int:
+        r = InventoryReservation.__table__
+        rows = (await self.s.execute(settle_stmt([r.c.hold_id == hold_id], status=status, consume=consume))).all()
+        self._touch([row.variant_id for row in rows])
+        return sum(row.qty for row in rows)
+
+    async def release(self, hold_id: uuid.UUID) -> int:
+        """Trả hàng của hold về khả dụng (huỷ checkout). Idempotent; trả về tổng qty đã trả."""
+        return await self._settle(hold_id, status="released", consume=False)
+
+    async def commit(self, hold_id: uuid.UUID) -> int:
+        """Xuất kho hold đã thanh toán: on_hand -= qty, reserved -= qty. Idempotent; trả về tổng qty.
+
+        Hold đã hết hạn (expire job đã trả hàng) → 0: caller phải reserve lại.
+        """
+        return await self._settle(hold_id, status="committed", consume=True)
+
+    async def expire(self, *, batch_size: int = 500) -> int:
+        """Trả hàng của tối đa `batch_size` dòng hold quá hạn. Trả về tổng qty đã trả (0 = hết việc)."""
+        r = InventoryReservation.__table__
+        rows = (await self.s.execute(
+            settle_stmt([r.c.expires_at <= func.now()], status="expired", consume=False, limit=batch_size)
+        )).all()
+        self._touch([row.variant_id for row in rows])
+        return sum(row.qty for row in rows)
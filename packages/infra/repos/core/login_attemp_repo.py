@@ -61,16 +61,16 @@ class LoginAttemptRepo:
 
         return None  # Không bị khóa
 
-    async def add(self, *, email: str, ip: str, success: bool, commit: bool = True) -> None:
+    async def add(self, *, email: str, ip: str, success: bool, commit: bool = False) -> None:
         """
         Ghi lại một lần đăng nhập (thành công hoặc thất bại).
         - email: email đăng nhập.
         - ip: địa chỉ IP của người dùng.
         - success: True nếu đăng nhập thành công, False nếu thất bại.
         - commit: Nếu True thì commit thay đổi vào DB ngay.
+          Mặc định chỉ stage bản ghi; UnitOfWork của request sẽ commit.
         """
-        attempt = LoginAttempt(email_canon=email, ip=ip)
+        attempt = LoginAttempt(email_canon=email, ip=ip or None)
         self.s.add(attempt)  # Thêm bản ghi vào session
-        await self.s.flush()  # Đẩy thay đổi lên DB (chưa commit)
         if commit:
             await self.s.commit()  # Commit nếu được yêu cầu
\ No newline at end of file
@@ -0,0 +1,29 @@
+from __future__ import annotations
+import uuid
+from typing import Any, Dict
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from packages.infra.db.models.ops.event_outbox import EventOutbox
+
+class OutboxRepo:
+    """Ghi event vào ops.event_outbox trong cùng transaction với thay đổi nghiệp vụ."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.s = session
+
+    def add(self, *, aggregate: str, aggregate_id: UUID, event_type: str, payload: Dict[str, Any]) -> EventOutbox:
+        """
+        Stage một event; được commit cùng UnitOfWork của request (không flush, không commit).
+        OutboxDispatcher sẽ gửi event sau khi transaction commit.
+        """
+        event = EventOutbox(
+            id=uuid.uuid4(),
+            aggregate=aggregate,
+            aggregate_id=aggregate_id,
+            event_type=event_type,
+            payload=payload,
+        )
+        self.s.add(event)
+        return event
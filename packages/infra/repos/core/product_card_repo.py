@@ -0,0 +1,408 @@
+"""
+Read model core.product_cards: refresh tăng dần theo product_id + query listing trên một bảng.
+
+Đồng bộ:
+- `after_flush` gom id bị ảnh hưởng từ Product / ProductVariant / Price / InventoryLevel /
+  MediaAsset / ProductCategory / Brand vào session.info;
+- `before_commit` flush nốt rồi chạy refresh (UPSERT + DELETE) trong chính transaction đó,
+  nên card luôn commit cùng dữ liệu gốc.
+- Ghi bằng Core (bulk_insert/bulk_upsert/update_where...) không đi qua flush → gọi `touch_products`.
+- Đường nóng (checkout giữ hàng) gọi `defer_card_refresh`: id chỉ được đẩy vào `card_refresh_queue`
+  sau commit và ProductCardRefresher (packages/infra/jobs/product_cards.py) refresh trong transaction
+  riêng, gộp nhiều checkout của cùng sản phẩm thành một lần refresh.
+- Refresh khoá advisory theo bucket của product_id trước UPSERT: hai transaction cùng refresh một
+  sản phẩm chạy lần lượt, câu UPSERT sau (READ COMMITTED, snapshot mới) thấy dữ liệu của câu trước.
+- Giá hẹn giờ (effective_at trong tương lai) không có commit nào kích hoạt: refresher quét định kỳ.
+"""
+from __future__ import annotations
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    Select, String, cast, delete, event, exists, func, literal, literal_column, select, true, tuple_, union,
+)
+from sqlalchemy.dialects.postgresql import array, array_agg, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from apps.api.settings import settings
+from packages.core.application.catalog.dto import ProductListFilters, ProductListItem, ProductSort
+from packages.infra.db.models.core.brand import Brand
+from packages.infra.db.models.core.category import ProductCategory
+from packages.infra.db.models.core.inventory_level import InventoryLevel
+from packages.infra.db.models.core.media_asset import MediaAsset
+from packages.infra.db.models.core.price import Price
+from packages.infra.db.models.core.product import Product
+from packages.infra.db.models.core.product_card import ProductCard
+from packages.infra.db.models.core.product_variant import ProductVariant
+from packages.infra.repos.core.category_repo import subtree_ids_select
+from packages.infra.repos.core.product_repo import current_price_lateral
+from packages.infra.repos.cursor import decode_cursor, encode_cursor
+from packages.infra.repos.exceptions import InvalidCursor
+from packages.infra.repos.types import CursorPage
+
+# Card lưu giá theo một currency (listing currency khác → đọc trực tiếp, xem ProductCardRepo.supports)
+PRODUCT_CARD_CURRENCY = settings.product_card_currency
+
+_PRODUCTS_KEY = "product_cards.products"
+_VARIANTS_KEY = "product_cards.variants"
+_BRANDS_KEY = "product_cards.brands"
+_DEFERRED_PRODUCTS_KEY = "product_cards.deferred_products"
+_DEFERRED_VARIANTS_KEY = "product_cards.deferred_variants"
+
+# pg_advisory_xact_lock(REFRESH_LOCK_NS, key): key = bucket của product_id, hoặc -1 cho cả bảng
+REFRESH_LOCK_NS = 0x0C4D
+REFRESH_LOCK_BUCKETS = 4096
+# Refresh nhiều hơn ngần này id (hoặc theo brand / toàn bảng) khoá cả bảng thay vì từng bucket,
+# để không vượt max_locks_per_transaction
+REFRESH_LOCK_MAX_IDS = 256
+
+
+def touch_products(
+    session: Any,
+    *,
+    product_ids: Iterable[Any] = (),
+    variant_ids: Iterable[Any] = (),
+    brand_ids: Iterable[Any] = (),
+) -> None:
+    """Đánh dấu card cần refresh khi commit (session: AsyncSession hoặc Session)."""
+    info = session.info
+    info.setdefault(_PRODUCTS_KEY, set()).update(i for i in product_ids if i is not None)
+    info.setdefault(_VARIANTS_KEY, set()).update(i for i in variant_ids if i is not None)
+    info.setdefault(_BRANDS_KEY, set()).update(i for i in brand_ids if i is not None)
+
+
+def defer_card_refresh(session: Any, *, product_ids: Iterable[Any] = (), variant_ids: Iterable[Any] = ()) -> None:
+    """Như `touch_products` nhưng refresh sau commit, ngoài transaction của caller (đường nóng)."""
+    info = session.info
+    info.setdefault(_DEFERRED_PRODUCTS_KEY, set()).update(i for i in product_ids if i is not None)
+    info.setdefault(_DEFERRED_VARIANTS_KEY, set()).update(i for i in variant_ids if i is not None)
+
+
+class CardRefreshQueue:
+    """Id chờ refresh (per-process), đã commit. Đầy thì bỏ: quét lệch in_stock của refresher bù lại."""
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self.products: Set[Any] = set()
+        self.variants: Set[Any] = set()
+        self.dropped = 0
+
+    def add(self, product_ids: Iterable[Any], variant_ids: Iterable[Any]) -> None:
+        self.products.update(product_ids)
+        self.variants.update(variant_ids)
+        if len(self.products) + len(self.variants) > self.maxsize:
+            self.dropped += len(self.products) + len(self.variants)
+            self.products.clear()
+            self.variants.clear()
+
+    def drain(self) -> Tuple[Set[Any], Set[Any]]:
+        products, variants = self.products, self.variants
+        self.products, self.variants = set(), set()
+        return products, variants
+
+    def __len__(self) -> int:
+        return len(self.products) + len(self.variants)
+
+
+card_refresh_queue = CardRefreshQueue()
+
+
+def target_products(product_ids: Set[Any], variant_ids: Set[Any], brand_ids: Set[Any]):
+    """SELECT product_id bị ảnh hưởng (id trực tiếp ∪ qua variant ∪ qua brand)."""
+    p = Product.__table__
+    v = ProductVariant.__table__
+    parts: List[Select] = []
+    if product_ids:
+        parts.append(select(p.c.id).where(p.c.id.in_(product_ids)))
+    if variant_ids:
+        parts.append(select(v.c.product_id).where(v.c.id.in_(variant_ids)))
+    if brand_ids:
+        parts.append(select(p.c.id).where(p.c.brand_id.in_(brand_ids)))
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else union(*parts)
+
+
+def card_select(currency: str = PRODUCT_CARD_CURRENCY) -> Select:
+    """SELECT dựng card từ bảng gốc (một row / sản phẩm đang bán)."""
+    p = Product.__table__
+    b = Brand.__table__
+    v = ProductVariant.__table__
+    il = InventoryLevel.__table__
+    m = MediaAsset.__table__
+    pc = ProductCategory.__table__
+    pv = current_price_lateral(currency)
+
+    in_stock = exists().where(
+        il.c.variant_id == v.c.id,
+        v.c.product_id == p.c.id,
+        v.c.deleted_at.is_(None),
+        v.c.status == "active",
+        il.c.deleted_at.is_(None),
+        il.c.on_hand - il.c.reserved > 0,
+    )
+    image_url = (
+        select(m.c.url)
+        .where(m.c.owner_type == "product", m.c.owner_id == p.c.id, m.c.deleted_at.is_(None))
+        .order_by(m.c.sort_order)
+        .limit(1)
+        .scalar_subquery()
+    )
+    category_ids = (
+        select(func.coalesce(array_agg(pc.c.category_id), literal_column("'{}'::uuid[]")))
+        .where(pc.c.product_id == p.c.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            p.c.id.label("product_id"),
+            p.c.slug,
+            p.c.name,
+            p.c.brand_id,
+            b.c.name.label("brand_name"),
+            category_ids.label("category_ids"),
+            p.c.specs,
+            cast(literal(currency), String(3)).label("currency"),
+            pv.c.price_min,
+            pv.c.price_max,
+            pv.c.compare_at,
+            in_stock.label("in_stock"),
+            image_url.label("image_url"),
+            p.c.created_at,
+            func.now().label("refreshed_at"),
+        )
+        .select_from(p.outerjoin(b, b.c.id == p.c.brand_id).join(pv, true()))
+        .where(p.c.deleted_at.is_(None), p.c.is_published)
+    )
+
+
+def refresh_lock_statement(targets, *, whole_table: bool = False):
+    """Khoá advisory (tới hết transaction) cho các sản phẩm sắp refresh.
+
+    Refresh nhỏ: khoá shared của cả bảng + khoá exclusive từng bucket, lấy theo thứ tự bucket
+    (không deadlock giữa hai refresh). Refresh lớn / toàn bảng: khoá exclusive cả bảng.
+    """
+    if targets is None or whole_table:
+        return select(func.pg_advisory_xact_lock(REFRESH_LOCK_NS, -1))
+    p = Product.__table__
+    buckets = (
+        select(func.mod(func.abs(func.hashtext(cast(p.c.id, String))), REFRESH_LOCK_BUCKETS).label("bucket"))
+        .where(p.c.id.in_(targets))
+        .distinct()
+        .order_by("bucket")
+        .subquery("buckets")
+    )
+    return select(
+        func.pg_advisory_xact_lock_shared(REFRESH_LOCK_NS, -1),
+        func.pg_advisory_xact_lock(REFRESH_LOCK_NS, buckets.c.bucket),
+    ).select_from(buckets)
+
+
+def refresh_statements(targets, currency: str = PRODUCT_CARD_CURRENCY, *, whole_table: bool = False) -> List[Any]:
+    """Khoá, UPSERT card cho sản phẩm còn bán trong `targets`, DELETE card của sản phẩm không còn bán."""
+    c = ProductCard.__table__
+    p = Product.__table__
+    src = card_select(currency)
+    if targets is not None:
+        src = src.where(p.c.id.in_(targets))
+    cols = [col.name for col in src.selected_columns]
+    upsert = pg_insert(c).from_select(cols, src)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[c.c.product_id],
+        set_={name: upsert.excluded[name] for name in cols if name != "product_id"},
+    )
+    still_live = exists().where(p.c.id == c.c.product_id, p.c.deleted_at.is_(None), p.c.is_published)
+    prune = delete(c).where(~still_live)
+    if targets is not None:
+        prune = prune.where(c.c.product_id.in_(targets))
+    return [refresh_lock_statement(targets, whole_table=whole_table), upsert, prune]
+
+
+def due_price_products_select(since: Optional[Any], limit: int, currency: str = PRODUCT_CARD_CURRENCY) -> Select:
+    """Sản phẩm có giá đã tới effective_at sau lần refresh card gần nhất (giá hẹn giờ)."""
+    pr = Price.__table__
+    v = ProductVariant.__table__
+    c = ProductCard.__table__
+    stmt = (
+        select(v.c.product_id)
+        .select_from(pr.join(v, v.c.id == pr.c.variant_id).join(c, c.c.product_id == v.c.product_id))
+        .where(
+            pr.c.deleted_at.is_(None),
+            pr.c.currency == currency,
+            pr.c.effective_at <= func.now(),
+            pr.c.effective_at > c.c.refreshed_at,
+        )
+        .distinct()
+        .limit(limit)
+    )
+    if since is not None:
+        # ix_prices_effective_at: chỉ đọc giá tới hạn kể từ lượt quét trước
+        stmt = stmt.where(pr.c.effective_at > since)
+    return stmt
+
+
+def stock_drift_select(after_id: Optional[Any], limit: int) -> Select:
+    """Một lát card (theo product_id, keyset) có in_stock lệch với tồn kho thật.
+
+    Trả về (product_id, is_last_of_slice): quét vòng dần cả bảng, bù cho refresh hoãn bị mất
+    (process chết trước khi refresher chạy, hàng đợi đầy).
+    """
+    c = ProductCard.__table__
+    v = ProductVariant.__table__
+    il = InventoryLevel.__table__
+    slice_ = select(c.c.product_id, c.c.in_stock).order_by(c.c.product_id).limit(limit)
+    if after_id is not None:
+        slice_ = slice_.where(c.c.product_id > after_id)
+    slice_ = slice_.subquery("slice")
+    actual = exists().where(
+        v.c.product_id == slice_.c.product_id,
+        v.c.deleted_at.is_(None),
+        v.c.status == "active",
+        il.c.variant_id == v.c.id,
+        il.c.deleted_at.is_(None),
+        il.c.on_hand - il.c.reserved > 0,
+    )
+    return select(
+        slice_.c.product_id,
+        (slice_.c.in_stock != actual).label("drifted"),
+    ).order_by(slice_.c.product_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_touched(session: Session, flush_context: Any) -> None:
+    products: Set[Any] = set()
+    variants: Set[Any] = set()
+    brands: Set[Any] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Product):
+            products.add(obj.id)
+        elif isinstance(obj, ProductVariant):
+            products.add(obj.product_id)
+        elif isinstance(obj, (Price, InventoryLevel)):
+            variants.add(obj.variant_id)
+        elif isinstance(obj, ProductCategory):
+            products.add(obj.product_id)
+        elif isinstance(obj, MediaAsset):
+            if obj.owner_type == "product":
+                products.add(obj.owner_id)
+            elif obj.owner_type == "variant":
+                variants.add(obj.owner_id)
+        elif isinstance(obj, Brand):
+            brands.add(obj.id)
+    if products or variants or brands:
+        touch_products(session, product_ids=products, variant_ids=variants, brand_ids=brands)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_before_commit(session: Session) -> None:
+    if session.new or session.dirty or session.deleted:
+        # before_commit chạy trước flush cuối → flush ở đây để after_flush kịp gom id
+        session.flush()
+    products = session.info.pop(_PRODUCTS_KEY, set())
+    variants = session.info.pop(_VARIANTS_KEY, set())
+    brands = session.info.pop(_BRANDS_KEY, set())
+    targets = target_products(products, variants, brands)
+    if targets is None:
+        return
+    from packages.infra.db.session import PRIMARY_STICKY  # session.py import module này lúc nạp
+    session.info[PRIMARY_STICKY] = True  # SELECT khoá advisory phải chạy trên primary
+    whole_table = bool(brands) or len(products) + len(variants) > REFRESH_LOCK_MAX_IDS
+    for stmt in refresh_statements(targets, whole_table=whole_table):
+        session.execute(stmt)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_deferred(session: Session) -> None:
+    products = session.info.pop(_DEFERRED_PRODUCTS_KEY, None)
+    variants = session.info.pop(_DEFERRED_VARIANTS_KEY, None)
+    if products or variants:
+        card_refresh_queue.add(products or (), variants or ())
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction: Any) -> None:
+    if previous_transaction.nested:
+        # Rollback SAVEPOINT (vd. InventoryRepo.reserve thiếu hàng): id đã gom của transaction ngoài vẫn giữ
+        return
+    for key in (_PRODUCTS_KEY, _VARIANTS_KEY, _BRANDS_KEY, _DEFERRED_PRODUCTS_KEY, _DEFERRED_VARIANTS_KEY):
+        session.info.pop(key, None)
+
+
+class ProductCardRepo:
+    """Listing trên core.product_cards: một bảng hẹp, không join."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.s = session
+        self._page_size_cap = 200
+
+    @staticmethod
+    def supports(f: ProductListFilters) -> bool:
+        """Card không có attributes theo variant, chỉ chứa sản phẩm đang bán và một currency."""
+        return not f.attributes and f.published is True and f.currency == PRODUCT_CARD_CURRENCY
+
+    async def rebuild(self, *, commit: bool = False) -> None:
+        """Dựng lại toàn bộ card (backfill / sửa lệch); bình thường không cần."""
+        for stmt in refresh_statements(None):
+            await self.s.execute(stmt)
+        if commit:
+            await self.s.commit()
+
+    def _sort_keys(self, sort: ProductSort):
+        c = ProductCard.__table__
+        if sort == "name":
+            return [c.c.name, c.c.product_id], False
+        if sort == "price_asc":
+            return [c.c.price_min, c.c.product_id], False
+        if sort == "price_desc":
+            return [c.c.price_min, c.c.product_id], True
+        return [c.c.created_at, c.c.product_id], True
+
+    async def list_cards(
+        self,
+        f: ProductListFilters,
+        *,
+        sort: ProductSort = "newest",
+        cursor: Optional[str] = None,
+        size: int = 24,
+    ) -> CursorPage[ProductListItem]:
+        c = ProductCard.__table__
+        size = min(max(size, 1), self._page_size_cap)
+        stmt = select(
+            c.c.product_id.label("id"), c.c.slug, c.c.name, c.c.brand_id, c.c.brand_name,
+            c.c.price_min, c.c.price_max, c.c.compare_at, c.c.currency, c.c.image_url, c.c.created_at,
+        )
+        if f.brand_ids:
+            stmt = stmt.where(c.c.brand_id.in_(f.brand_ids))
+        if f.category_ids:
+            # category_ids && ARRAY(SELECT descendant_id ...) → GIN, mảng cây con tính một lần
+            wanted = (
+                func.array(subtree_ids_select(f.category_ids).scalar_subquery())
+                if f.include_descendants else array(f.category_ids)
+            )
+            stmt = stmt.where(c.c.category_ids.overlap(wanted))
+        if f.specs:
+            stmt = stmt.where(c.c.specs.contains(f.specs))
+        if f.price_min is not None:
+            stmt = stmt.where(c.c.price_min >= f.price_min)
+        if f.price_max is not None:
+            stmt = stmt.where(c.c.price_min <= f.price_max)
+
+        keys, descending = self._sort_keys(sort)
+        if sort in ("price_asc", "price_desc"):
+            stmt = stmt.where(c.c.price_min.is_not(None))
+        if cursor:
+            # Cùng định dạng cursor với ProductRepo.list_products: [sort, *sort keys]
+            tag, *values = decode_cursor(cursor, expected_len=len(keys) + 1)
+            if tag != sort:
+                raise InvalidCursor("Pagination cursor does not match sort order")
+            after = tuple_(*[literal(v, k.type) for k, v in zip(keys, values)])
+            stmt = stmt.where(tuple_(*keys) < after if descending else tuple_(*keys) > after)
+        stmt = stmt.order_by(*[k.desc() if descending else k.asc() for k in keys]).limit(size + 1)
+
+        rows = (await self.s.execute(stmt)).mappings().all()
+        items = [ProductListItem(**r) for r in rows[:size]]
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            next_cursor = encode_cursor([sort, *[last["id" if k.key == "product_id" else k.key] for k in keys]])
+        return CursorPage(items=items, size=size, next_cursor=next_cursor)
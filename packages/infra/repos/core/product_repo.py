@@ -0,0 +1,258 @@
+from __future__ import annotations
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, Select, cast, exists, func, literal, literal_column, or_, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from packages.core.application.catalog.dto import ProductListFilters, ProductListItem, ProductSearchItem, ProductSort
+from packages.infra.db.models.core.brand import Brand
+from packages.infra.db.models.core.category import ProductCategory
+from packages.infra.db.models.core.media_asset import MediaAsset
+from packages.infra.db.models.core.price import Price
+from packages.infra.db.models.core.product import Product
+from packages.infra.db.models.core.product_variant import ProductVariant
+from packages.infra.repos.base import SQLAlchemyRepository
+from packages.infra.repos.core.category_repo import subtree_ids_select
+from packages.infra.repos.cursor import decode_cursor, encode_cursor
+from packages.infra.repos.exceptions import InvalidCursor
+from packages.infra.repos.types import CursorPage
+
+# Khớp trigger trg_products_search_vector (migration b8d3f61e2a97): config 'simple' + core.f_unaccent
+SEARCH_TS_CONFIG = "simple"
+_SEARCH_WORD = re.compile(r"\w+", re.UNICODE)
+
+def prefix_tsquery_text(q: str) -> Optional[str]:
+    """'laptop del' → 'laptop:* & del:*' (gõ tới đâu khớp tới đó); không có từ nào → None.
+
+    Chỉ giữ ký tự chữ/số nên người dùng không chèn được toán tử tsquery.
+    """
+    words = _SEARCH_WORD.findall(q.lower())
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words[:8])
+
+def current_price_lateral(currency: str, attributes: Optional[Dict[str, Any]] = None):
+    """LATERAL gộp giá hiện hành theo sản phẩm (correlate với core.products).
+
+    Mỗi variant active lấy giá mới nhất đã có hiệu lực bằng
+    LATERAL (... ORDER BY effective_at DESC LIMIT 1) → ix_prices_variant_effective,
+    rồi gộp min/max giá và số variant (khớp `attributes` nếu có).
+    """
+    p = Product.__table__
+    v = ProductVariant.__table__
+    pr = Price.__table__
+    latest = (
+        select(pr.c.amount, pr.c.compare_at)
+        .where(
+            pr.c.variant_id == v.c.id,
+            pr.c.deleted_at.is_(None),
+            pr.c.currency == currency,
+            pr.c.effective_at <= func.now(),
+        )
+        .order_by(pr.c.effective_at.desc())
+        .limit(1)
+        .lateral("lp")
+    )
+    stmt = (
+        select(
+            func.min(latest.c.amount).label("price_min"),
+            func.max(latest.c.amount).label("price_max"),
+            func.max(latest.c.compare_at).label("compare_at"),
+            func.count(v.c.id).label("variant_count"),
+        )
+        .select_from(v.outerjoin(latest, true()))
+        .where(v.c.product_id == p.c.id, v.c.deleted_at.is_(None), v.c.status == "active")
+    )
+    if attributes:
+        stmt = stmt.where(v.c.attributes.contains(attributes))
+    return stmt.lateral("pv")
+
+class ProductRepo(SQLAlchemyRepository[Product]):
+    """Repository sản phẩm + query listing của catalog.
+
+    `list_products` dựng đúng một câu SELECT (Core, không load relationship):
+    - giá: `current_price_lateral` (giá mới nhất mỗi variant, gộp theo sản phẩm);
+    - specs/attributes: `@>` → GIN jsonb_path_ops;
+    - keyset theo sort key + id, không OFFSET.
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, Product)
+
+    def _sort_keys(self, sort: ProductSort, pv) -> Tuple[List[Any], bool]:
+        p = Product.__table__
+        if sort == "name":
+            return [p.c.name, p.c.id], False
+        if sort == "price_asc":
+            return [pv.c.price_min, p.c.id], False
+        if sort == "price_desc":
+            return [pv.c.price_min, p.c.id], True
+        return [p.c.created_at, p.c.id], True
+
+    @staticmethod
+    def _needs_price(f: ProductListFilters) -> bool:
+        return bool(f.attributes) or f.price_min is not None or f.price_max is not None
+
+    def _filter_clauses(self, f: ProductListFilters, pv=None) -> List[Any]:
+        """Điều kiện WHERE của filter (dùng chung listing và search); `pv` cần khi _needs_price(f)."""
+        p = Product.__table__
+        pc = ProductCategory.__table__
+        clauses: List[Any] = [p.c.deleted_at.is_(None)]
+        if f.published is not None:
+            # Viết `is_published` / `NOT is_published` để khớp predicate của partial index
+            clauses.append(p.c.is_published if f.published else ~p.c.is_published)
+        if f.brand_ids:
+            clauses.append(p.c.brand_id.in_(f.brand_ids))
+        if f.category_ids:
+            # Cả cây con: closure table trả id category, rồi ix_product_categories_category_id
+            wanted = subtree_ids_select(f.category_ids) if f.include_descendants else f.category_ids
+            clauses.append(exists().where(pc.c.product_id == p.c.id, pc.c.category_id.in_(wanted)))
+        if f.specs:
+            clauses.append(p.c.specs.contains(f.specs))
+        if f.attributes:
+            clauses.append(pv.c.variant_count > 0)
+        if f.price_min is not None:
+            clauses.append(pv.c.price_min >= f.price_min)
+        if f.price_max is not None:
+            clauses.append(pv.c.price_min <= f.price_max)
+        return clauses
+
+    def listing_select(self, f: ProductListFilters, *, sort: ProductSort = "newest") -> Tuple[Select, List[Any], bool]:
+        """Câu SELECT listing (chưa có cursor/limit) + sort keys + chiều sort."""
+        p = Product.__table__
+        b = Brand.__table__
+        m = MediaAsset.__table__
+        pv = current_price_lateral(f.currency, f.attributes)
+
+        image_url = (
+            select(m.c.url)
+            .where(m.c.owner_type == "product", m.c.owner_id == p.c.id, m.c.deleted_at.is_(None))
+            .order_by(m.c.sort_order)
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(
+                p.c.id, p.c.slug, p.c.name, p.c.brand_id,
+                b.c.name.label("brand_name"),
+                pv.c.price_min, pv.c.price_max, pv.c.compare_at,
+                image_url.label("image_url"),
+                p.c.created_at,
+            )
+            .select_from(p.outerjoin(b, b.c.id == p.c.brand_id).join(pv, true()))
+        )
+        stmt = stmt.where(*self._filter_clauses(f, pv))
+
+        keys, descending = self._sort_keys(sort, pv)
+        if sort in ("price_asc", "price_desc"):
+            # Keyset không so sánh được NULL → sort theo giá chỉ gồm sản phẩm có giá
+            stmt = stmt.where(pv.c.price_min.is_not(None))
+        return stmt, keys, descending
+
+    async def list_products(
+        self,
+        f: ProductListFilters,
+        *,
+        sort: ProductSort = "newest",
+        cursor: Optional[str] = None,
+        size: int = 24,
+    ) -> CursorPage[ProductListItem]:
+        size = min(max(size, 1), self._page_size_cap)
+        stmt, keys, descending = self.listing_select(f, sort=sort)
+        if cursor:
+            # Phần tử đầu là tên sort: cursor của sort khác không được dùng lại
+            tag, *values = decode_cursor(cursor, expected_len=len(keys) + 1)
+            if tag != sort:
+                raise InvalidCursor("Pagination cursor does not match sort order")
+            row_key = tuple_(*keys)
+            after = tuple_(*[literal(v, k.type) for k, v in zip(keys, values)])
+            stmt = stmt.where(row_key < after if descending else row_key > after)
+        stmt = stmt.order_by(*[k.desc() if descending else k.asc() for k in keys]).limit(size + 1)
+
+        rows = (await self.session.execute(stmt)).mappings().all()
+        items = [ProductListItem(currency=f.currency, **r) for r in rows[:size]]
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            next_cursor = encode_cursor([sort, *[last[k.key] for k in keys]])
+        return CursorPage(items=items, size=size, next_cursor=next_cursor)
+
+    def search_select(
+        self,
+        q: str,
+        f: ProductListFilters,
+        *,
+        cursor: Optional[str] = None,
+        size: int = 24,
+    ) -> Optional[Tuple[Select, str]]:
+        """Câu SELECT một trang kết quả tìm kiếm + tag của cursor; `q` không có từ nào → None.
+
+        Hai bước trong một câu:
+        1. "hits": chỉ id + score của sản phẩm khớp, keyset (score, id) rồi LIMIT.
+           Khớp khi một trong hai điều kiện đúng (BitmapOr trên hai GIN index):
+           - search_vector @@ to_tsquery('simple', f_unaccent('tu1:* & tu2:*'))  → ix_products_search_vector
+           - q <% model_number (word similarity)                                 → ix_products_model_number_trgm
+           score = ts_rank_cd + word_similarity.
+        2. Giá / ảnh / brand chỉ tính cho `size + 1` dòng của trang, không cho mọi dòng khớp.
+        """
+        p = Product.__table__
+        raw = q.strip()[:200]
+        ts_text = prefix_tsquery_text(raw)
+        if ts_text is None:
+            return None
+        # Cursor gắn với câu tìm: đổi q thì cursor cũ không dùng lại được
+        tag = "search:" + hashlib.sha1(raw.lower().encode()).hexdigest()[:12]
+
+        tsq = func.to_tsquery(literal_column(f"'{SEARCH_TS_CONFIG}'"), func.core.f_unaccent(ts_text))
+        text_match = p.c.search_vector.op("@@")(tsq)
+        model_match = literal(raw).op("<%")(p.c.model_number)
+        score = cast(
+            func.ts_rank_cd(p.c.search_vector, tsq)
+            + func.coalesce(func.word_similarity(raw, p.c.model_number), 0),
+            Float(53),
+        )
+        hits = select(p.c.id, score.label("score")).where(or_(text_match, model_match))
+        pv = None
+        if self._needs_price(f):
+            pv = current_price_lateral(f.currency, f.attributes)
+            hits = hits.select_from(p.join(pv, true()))
+        hits = hits.where(*self._filter_clauses(f, pv))
+        if cursor:
+            got, *values = decode_cursor(cursor, expected_len=3)
+            if got != tag:
+                raise InvalidCursor("Pagination cursor does not match search query")
+            after = tuple_(literal(values[0], Float(53)), literal(values[1], p.c.id.type))
+            hits = hits.where(tuple_(score, p.c.id) < after)
+        hits = hits.order_by(score.desc(), p.c.id.desc()).limit(size + 1).subquery("hits")
+
+        page, _, _ = self.listing_select(ProductListFilters(currency=f.currency, published=None))
+        page = (
+            page.add_columns(hits.c.score)
+            .join(hits, hits.c.id == p.c.id)
+            .order_by(hits.c.score.desc(), hits.c.id.desc())
+        )
+        return page, tag
+
+    async def search_products(
+        self,
+        q: str,
+        f: ProductListFilters,
+        *,
+        cursor: Optional[str] = None,
+        size: int = 24,
+    ) -> CursorPage[ProductSearchItem]:
+        """Tìm sản phẩm theo `q`, xếp theo độ liên quan (score, id giảm dần); cùng filter với listing."""
+        size = min(max(size, 1), self._page_size_cap)
+        built = self.search_select(q, f, cursor=cursor, size=size)
+        if built is None:
+            return CursorPage(items=[], size=size, next_cursor=None)
+        stmt, tag = built
+        rows = (await self.session.execute(stmt)).mappings().all()
+        items = [ProductSearchItem(currency=f.currency, **r) for r in rows[:size]]
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            next_cursor = encode_cursor([tag, last["score"], last["id"]])
+        return CursorPage(items=items, size=size, next_cursor=next_cursor)
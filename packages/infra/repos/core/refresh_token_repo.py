@@ -1,8 +1,8 @@
-import datetime
-from time import timezone
+from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
-from sqlalchemy import select, update
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import INET, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from packages.infra.db.models.ops.refresh_token import RefreshToken
@@ -38,14 +38,14 @@ class RefreshTokenRepo:
         """
         rt = RefreshToken(
             id=jti,  # jti làm PK
+            jti=jti,
             user_id=user_id,
             session_id=session_id,
             family_id=family_id,
             token_hash=token_hash,
             expires_at=expires_at,
         )
-        self.s.add(rt)  # Thêm đối tượng vào session
-        await self.s.flush()  # Đẩy thay đổi lên DB (chưa commit)
+        self.s.add(rt)  # Thêm đối tượng vào session, ghi xuống DB khi commit
         if commit:
             await self.s.commit()  # Commit nếu được yêu cầu
 
@@ -59,6 +59,78 @@ class RefreshTokenRepo:
         res = await self.s.execute(stmt)
         return res.scalars().first()  # Lấy bản ghi đầu tiên (nếu có)
 
+    async def find_for_rotation(self, jti: UUID, token_hash: str):
+        """
+        Tìm token đang được trình lên theo PK (jti) + token_hash trong một query.
+        Trả về row (user_id, session_id, family_id, expires_at, revoked_at) hoặc None
+        nếu không khớp (token giả / sai pepper).
+        """
+        stmt = select(
+            RefreshToken.user_id,
+            RefreshToken.session_id,
+            RefreshToken.family_id,
+            RefreshToken.expires_at,
+            RefreshToken.revoked_at,
+        ).where(RefreshToken.id == jti, RefreshToken.token_hash == token_hash)
+        res = await self.s.execute(stmt)
+        return res.first()
+
+    async def rotate(
+        self,
+        old_jti: UUID,
+        *,
+        new_jti: UUID,
+        token_hash: str,
+        expires_at: datetime,
+        ip: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> bool:
+        """
+        Thu hồi token cũ và phát hành token thay thế trong MỘT câu lệnh:
+
+            WITH revoked AS (UPDATE ... SET revoked_at = now(), replaced_by = :new
+                             WHERE id = :old AND revoked_at IS NULL AND expires_at > now()
+                             RETURNING user_id, session_id, family_id)
+            INSERT INTO ops.refresh_tokens (...) SELECT ... FROM revoked
+
+        Trả về False nếu token cũ đã bị dùng/thu hồi (request song song) → caller coi là reuse.
+        """
+        revoked = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == old_jti,
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > func.now(),
+            )
+            .values(revoked_at=func.now(), replaced_by=new_jti)
+            .returning(RefreshToken.user_id, RefreshToken.session_id, RefreshToken.family_id)
+            .cte("revoked")
+        )
+        source = select(
+            literal(new_jti, RefreshToken.id.type),
+            literal(new_jti, RefreshToken.jti.type),
+            revoked.c.user_id,
+            revoked.c.session_id,
+            revoked.c.family_id,
+            literal(token_hash),
+            func.now(),
+            literal(expires_at, RefreshToken.expires_at.type),
+            literal(ip, INET()),
+            literal(user_agent),
+        ).select_from(revoked)
+        stmt = (
+            insert(RefreshToken)
+            .from_select(
+                ["id", "jti", "user_id", "session_id", "family_id", "token_hash",
+                 "issued_at", "expires_at", "ip", "user_agent"],
+                source,
+            )
+            .add_cte(revoked)
+            .returning(RefreshToken.id)
+        )
+        res = await self.s.execute(stmt)
+        return res.first() is not None
+
     async def revoke(self, jti: UUID, commit: bool = True) -> None:
         """
         Đánh dấu một refresh token là đã bị thu hồi (revoked).
@@ -73,3 +145,18 @@ class RefreshTokenRepo:
         await self.s.execute(stmt)  # Thực thi câu lệnh update
         if commit:
             await self.s.commit()  # Commit nếu được yêu cầu
+
+    async def revoke_family(self, family_id: UUID, *, commit: bool = False) -> int:
+        """
+        Thu hồi toàn bộ token còn sống của một family bằng một UPDATE
+        (dùng khi phát hiện refresh token bị dùng lại). Trả về số token bị thu hồi.
+        """
+        stmt = (
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+        res = await self.s.execute(stmt)
+        if commit:
+            await self.s.commit()
+        return res.rowcount or 0
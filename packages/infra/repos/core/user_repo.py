@@ -1,11 +1,25 @@
-from sqlalchemy import or_, select
+import hashlib
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Float, Select, Text, case, cast, func, literal, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from packages.core.application.identity.dto import AdminUserSearchItem, PrincipalDTO, UserDTO
+from packages.infra.cache.principal import invalidate_principal
+from packages.infra.db.models.core.customer import Customer
 from packages.infra.db.models.core.role import Role
 from packages.infra.db.models.core.user import User
 from packages.infra.db.models.core.user_role import UserRole
 from packages.infra.repos.base import SQLAlchemyRepository
-from packages.infra.repos.exceptions import NotFoundError
+from packages.infra.repos.cursor import decode_cursor, encode_cursor
+from packages.infra.repos.exceptions import InvalidCursor, NotFoundError
+from packages.infra.repos.types import CursorPage
+
+
+def _like_escape(value: str) -> str:
+    """Escape ký tự đặc biệt của LIKE (escape mặc định của Postgres là backslash)."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class UserRepo(SQLAlchemyRepository[User]):
@@ -31,6 +45,37 @@ class UserRepo(SQLAlchemyRepository[User]):
             await self.session.refresh(obj)
         return obj
     
+    async def update(self, obj: User, data: dict[str, Any], *, commit: bool = False, refresh: bool = True) -> User:
+        invalidate_principal(self.session, obj.id)
+        return await super().update(obj, data, commit=commit, refresh=refresh)
+
+    async def load_principal(self, user_id: UUID) -> Optional[PrincipalDTO]:
+        """
+        Nạp user + role codes + customer_id trong MỘT query (không đi qua
+        relationship selectin của User.roles). Dùng bởi PrincipalCache khi miss.
+        """
+        roles = func.array_remove(func.array_agg(Role.code), None)
+        stmt = (
+            select(
+                User.id, User.email, User.full_name, User.phone, User.is_active, User.created_at,
+                Customer.id.label("customer_id"),
+                roles.label("roles"),
+            )
+            .outerjoin(UserRole, UserRole.user_id == User.id)
+            .outerjoin(Role, Role.id == UserRole.role_id)
+            .outerjoin(Customer, Customer.user_id == User.id)
+            .where(User.id == user_id)
+            .group_by(User.id, Customer.id)
+        )
+        row = (await self.session.execute(stmt)).first()
+        if row is None:
+            return None
+        user = UserDTO(
+            id=row.id, email=row.email, full_name=row.full_name, phone=row.phone,
+            is_active=row.is_active, roles=list(row.roles or []), created_at=row.created_at,
+        )
+        return PrincipalDTO(user=user, customer_id=row.customer_id)
+
     async def search_by_email(self, email: str, *, with_deleted: bool = False) -> User:
         # 1. Tạo câu query cơ bản
         #    Giả sử self.default_select(with_deleted) trả về một object `select(User)` 
@@ -49,32 +94,100 @@ class UserRepo(SQLAlchemyRepository[User]):
         # 5. Trả về User object
         return obj
     
-    async def search(self, q: str, limit: int = 20) -> list[User]:
-        # 1. Tạo câu query cơ bản
-        #    - default_select() trả về select(User).where(User.is_deleted == False) nếu có
-        #    - ilike: so khớp không phân biệt hoa/thường
-        stmt = (
-            self.default_select()
-            .where(
-                or_(
-                    User.email.ilike(f"%{q}%"),
-                    User.full_name.ilike(f"%{q}%"),
-                )
-            )
-            .limit(limit)
+    def _search_terms(self, q: str) -> Optional[Tuple[Any, Any, str]]:
+        """(điều kiện khớp, score, tag cursor) cho admin search; q rỗng → None.
+
+        - email bắt đầu bằng q: lower(email::text) LIKE 'q%'      → ix_users_email_prefix (text_pattern_ops)
+        - q >= 3 ký tự: email chứa q (ILIKE '%q%')                 → ix_users_email_trgm
+                        tên gần giống / chứa q (không dấu)          → ix_users_full_name_trgm
+          (dưới 3 ký tự trigram không dùng được index → chỉ tìm theo tiền tố email)
+        score = max(similarity(email), word_similarity(tên)) + 1 nếu khớp tiền tố email.
+        """
+        ql = q.strip().lower()[:200]
+        if not ql:
+            return None
+        pattern = _like_escape(ql)
+        email = cast(User.email, Text)
+        name = func.core.f_unaccent(User.full_name)
+        q_name = func.core.f_unaccent(ql)
+        prefix = func.lower(email).like(pattern + "%")
+        conds = [prefix]
+        if len(ql) >= 3:
+            conds.append(email.ilike("%" + pattern + "%"))
+            conds.append(q_name.op("<%")(name))
+            conds.append(name.ilike(func.concat("%", func.core.f_unaccent(pattern), "%")))
+        score = cast(
+            func.greatest(func.similarity(email, ql), func.coalesce(func.word_similarity(q_name, name), 0))
+            + case((prefix, 1.0), else_=0.0),
+            Float(53),
         )
-        # 2. Thực thi query (async)
+        tag = "users:" + hashlib.sha1(ql.encode()).hexdigest()[:12]
+        return or_(*conds), score, tag
+
+    async def search(self, q: str, limit: int = 20) -> list[User]:
+        """Tìm user theo email / tên, xếp theo độ liên quan (xem _search_terms)."""
+        terms = self._search_terms(q)
+        if terms is None:
+            return []
+        match, score, _ = terms
+        stmt = self.default_select().where(match).order_by(score.desc(), User.id.desc()).limit(limit)
         result = await self.session.execute(stmt)
-        # 3. Lấy ra toàn bộ User object từ kết quả
-        #    - scalars(): ánh xạ sang object User thay vì tuple
-        #    - all(): lấy toàn bộ record
-        users = result.scalars().all()
-        # 4. Trả về list user (ép sang list cho chắc)
-        return list(users)
-    
+        return list(result.scalars().all())
+
+    def search_admin_select(
+        self,
+        q: str,
+        *,
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        size: int = 50,
+    ) -> Optional[Tuple[Select, str]]:
+        """SELECT một trang admin search (chỉ cột cần hiển thị) + tag của cursor."""
+        terms = self._search_terms(q)
+        if terms is None:
+            return None
+        match, score, tag = terms
+        t = User.__table__
+        stmt = select(
+            t.c.id, t.c.email, t.c.full_name, t.c.phone, t.c.is_active, t.c.created_at, t.c.last_login_at,
+            score.label("score"),
+        ).where(match)
+        if is_active is not None:
+            stmt = stmt.where(t.c.is_active.is_(is_active))
+        if cursor:
+            got, *values = decode_cursor(cursor, expected_len=3)
+            if got != tag:
+                raise InvalidCursor("Pagination cursor does not match search query")
+            after = tuple_(literal(values[0], Float(53)), literal(values[1], t.c.id.type))
+            stmt = stmt.where(tuple_(score, t.c.id) < after)
+        return stmt.order_by(score.desc(), t.c.id.desc()).limit(size + 1), tag
+
+    async def search_admin(
+        self,
+        q: str,
+        *,
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        size: int = 50,
+    ) -> CursorPage[AdminUserSearchItem]:
+        """Admin search có keyset cursor theo (score, id)."""
+        size = min(max(size, 1), self._page_size_cap)
+        built = self.search_admin_select(q, is_active=is_active, cursor=cursor, size=size)
+        if built is None:
+            return CursorPage(items=[], size=size, next_cursor=None)
+        stmt, tag = built
+        rows = (await self.session.execute(stmt)).mappings().all()
+        items = [AdminUserSearchItem(**r) for r in rows[:size]]
+        next_cursor = None
+        if len(rows) > size:
+            last = rows[size - 1]
+            next_cursor = encode_cursor([tag, last["score"], last["id"]])
+        return CursorPage(items=items, size=size, next_cursor=next_cursor)
+
     async def activate(self, user: User, *, commit: bool = False) -> User:
         # 1. Cập nhật trạng thái user
         user.is_active = True
+        invalidate_principal(self.session, user.id)
         # 2. Flush để đẩy thay đổi xuống DB trong transaction hiện tại
         #    nhưng chưa commit (chưa kết thúc transaction).
         await self.session.flush()
@@ -89,6 +202,7 @@ class UserRepo(SQLAlchemyRepository[User]):
         Vô hiệu hóa User (set is_active=False).
         """
         user.is_active = False
+        invalidate_principal(self.session, user.id)
         await self.session.flush()
 
         if commit:
@@ -113,6 +227,7 @@ class UserRepo(SQLAlchemyRepository[User]):
         # 3. Nếu user chưa có role này thì thêm vào
         if role not in user.roles:
             user.roles.append(role)
+            invalidate_principal(self.session, user.id)
             await self.session.flush()
 
             if commit:
@@ -134,11 +249,24 @@ class UserRepo(SQLAlchemyRepository[User]):
         # Nếu user có role này thì remove
         if role in user.roles:
             user.roles.remove(role)
+            invalidate_principal(self.session, user.id)
             await self.session.flush()
 
             if commit:
                 await self.session.commit()
 
+    async def replace_password_hash(self, user_id, old_hash: str, new_hash: str, *, commit: bool = False) -> bool:
+        """
+        Compare-and-set password_hash: chỉ ghi khi hash hiện tại vẫn là `old_hash`
+        (tránh ghi đè mật khẩu vừa được đổi trong lúc rehash chạy nền).
+        """
+        updated = await self.update_where(
+            [User.id == user_id, User.password_hash == old_hash],
+            {"password_hash": new_hash},
+            commit=commit,
+        )
+        return updated > 0
+
     async def list_users_with_role(self, role_code: str, limit: int = 100) -> list[User]:
         """
         Lấy danh sách user có role cụ thể.
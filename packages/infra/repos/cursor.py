@@ -0,0 +1,69 @@
+"""
+Opaque keyset cursor cho SQLAlchemyRepository.paginate_after.
+
+Cursor = base64url(JSON) của list giá trị sort key của row cuối trang (id luôn ở cuối).
+Phần tử đầu list là tag của thứ tự sort (tên sort / sort key + chiều) để caller từ chối
+cursor sinh ra từ thứ tự khác.
+Mỗi giá trị được gắn tag kiểu để decode lại đúng (UUID, datetime, Decimal...).
+"""
+from __future__ import annotations
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Sequence
+
+from packages.infra.repos.exceptions import InvalidCursor
+
+
+def _pack(value: Any) -> list:
+    if value is None:
+        return ["n", None]
+    if isinstance(value, bool):
+        return ["b", value]
+    if isinstance(value, uuid.UUID):
+        return ["u", str(value)]
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    if isinstance(value, (int, float, str)):
+        return ["v", value]
+    raise TypeError(f"Unsupported cursor value type: {type(value).__name__}")
+
+
+def _unpack(item: Any) -> Any:
+    tag, raw = item
+    if tag in ("n", "b", "v"):
+        return raw
+    if tag == "u":
+        return uuid.UUID(raw)
+    if tag == "dt":
+        return datetime.fromisoformat(raw)
+    if tag == "d":
+        return date.fromisoformat(raw)
+    if tag == "dec":
+        return Decimal(raw)
+    raise ValueError(f"unknown tag {tag!r}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode list giá trị sort key thành chuỗi opaque (url-safe)."""
+    raw = json.dumps([_pack(v) for v in values], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, *, expected_len: int | None = None) -> List[Any]:
+    """Decode cursor. Cursor hỏng hoặc sai số lượng key → raise InvalidCursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        items = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_unpack(i) for i in items]
+    except Exception as e:
+        raise InvalidCursor("Malformed pagination cursor") from e
+    if expected_len is not None and len(values) != expected_len:
+        raise InvalidCursor("Pagination cursor does not match sort order")
+    return values
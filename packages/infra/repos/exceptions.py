@@ -7,3 +7,9 @@ class NotFoundError(RepositoryError):
 
 class NotSoftDeletable(RepositoryError):
     """Raised when soft_delete/restore is called for a model without deleted_at."""
+
+class InvalidCursor(RepositoryError):
+    """Raised when a keyset pagination cursor cannot be decoded."""
+
+class InvalidHierarchy(RepositoryError):
+    """Raised when a tree write would create a cycle (e.g. moving a category under its own descendant)."""
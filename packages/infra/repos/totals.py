@@ -0,0 +1,155 @@
+"""
+Chiến lược tính `total` cho SQLAlchemyRepository.paginate.
+
+- ExactTotal: SELECT count(*) FROM (query) — chính xác, tốn 1 lần scan.
+- EstimatedTotal: lấy ước lượng của planner (EXPLAIN row estimate hoặc pg_class.reltuples),
+  chỉ đếm chính xác khi ước lượng nhỏ hơn `exact_below`.
+- CachedTotal: bọc một strategy khác, cache kết quả theo fingerprint (SQL + params) với TTL.
+  Mọi đường ghi của SQLAlchemyRepository (add, bulk_*, update_where, soft_delete...) gọi
+  `invalidate_totals`: xoá cache ngay và xoá lần nữa sau commit (giống availability cache),
+  để total tính giữa lúc ghi và lúc commit không bị giữ lại tới hết TTL.
+
+Strategy được gắn ở mức class repo (thuộc tính `total_strategy`) nên cache được
+chia sẻ giữa các request, dù repo được tạo mới mỗi request.
+"""
+from __future__ import annotations
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Literal, Optional, Set, Tuple
+
+from sqlalchemy import Select, event, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "totals.invalidate"
+
+
+class TotalStrategy:
+    """Base strategy. `total()` trả về (total, is_estimate)."""
+
+    async def total(self, session: AsyncSession, stmt: Select) -> Tuple[int, bool]:
+        raise NotImplementedError
+
+
+class ExactTotal(TotalStrategy):
+    async def total(self, session: AsyncSession, stmt: Select) -> Tuple[int, bool]:
+        count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+        result = await session.execute(count_stmt)
+        return int(result.scalar_one()), False
+
+
+class EstimatedTotal(TotalStrategy):
+    """Ước lượng từ planner thay vì COUNT(*).
+
+    - source="explain": EXPLAIN (FORMAT JSON) của chính query đã filter → "Plan Rows".
+    - source="reltuples": pg_class.reltuples của bảng gốc (bỏ qua filter, kể cả deleted_at),
+      chỉ hợp cho danh sách không filter.
+    Nếu ước lượng < `exact_below` thì đếm chính xác (rẻ với tập nhỏ, và tránh sai lệch
+    lớn ở vài trang cuối).
+    """
+
+    def __init__(self, source: Literal["explain", "reltuples"] = "explain", *, exact_below: int = 1000):
+        self.source = source
+        self.exact_below = exact_below
+        self._exact = ExactTotal()
+
+    async def _explain_rows(self, session: AsyncSession, stmt: Select) -> Optional[int]:
+        conn = await session.connection()
+        try:
+            # Render bằng dialect của chính connection (asyncpg không nhân đôi '%')
+            sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        except (CompileError, NotImplementedError):
+            return None  # có bind không render literal được → để caller đếm chính xác
+        # Gửi nguyên văn cho driver: text() sẽ parse lại ':name' nằm trong literal thành bind param
+        result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def _reltuples(self, session: AsyncSession, stmt: Select) -> Optional[int]:
+        table = stmt.get_final_froms()[0]
+        name = f"{table.schema}.{table.name}" if getattr(table, "schema", None) else table.name
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": name},
+        )
+        value = result.scalar_one_or_none()
+        # reltuples = -1 khi bảng chưa từng được ANALYZE
+        return int(value) if value is not None and value >= 0 else None
+
+    async def total(self, session: AsyncSession, stmt: Select) -> Tuple[int, bool]:
+        if self.source == "reltuples":
+            estimate = await self._reltuples(session, stmt)
+        else:
+            estimate = await self._explain_rows(session, stmt)
+        if estimate is None or estimate < self.exact_below:
+            return await self._exact.total(session, stmt)
+        return estimate, True
+
+
+class CachedTotal(TotalStrategy):
+    """Cache total theo fingerprint của query đã filter, hết hạn sau `ttl` giây (LRU `maxsize`)."""
+
+    def __init__(
+        self,
+        inner: Optional[TotalStrategy] = None,
+        *,
+        ttl: float = 30.0,
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.inner = inner or ExactTotal()
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._cache: "OrderedDict[str, Tuple[float, int, bool]]" = OrderedDict()
+
+    @staticmethod
+    def fingerprint(stmt: Select) -> str:
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        params = sorted((k, repr(v)) for k, v in compiled.params.items())
+        return f"{compiled}|{params}"
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    async def total(self, session: AsyncSession, stmt: Select) -> Tuple[int, bool]:
+        key = self.fingerprint(stmt)
+        now = self.clock()
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] > now:
+            self._cache.move_to_end(key)
+            return hit[1], hit[2]
+
+        total, estimated = await self.inner.total(session, stmt)
+        self._cache[key] = (now + self.ttl, total, estimated)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return total, estimated
+
+
+def invalidate_totals(session: Any, strategy: TotalStrategy) -> None:
+    """Gọi từ repo sau mỗi lần ghi (session: AsyncSession hoặc Session). Strategy không cache → bỏ qua."""
+    if not isinstance(strategy, CachedTotal):
+        return
+    strategy.invalidate()
+    session.info.setdefault(_PENDING_KEY, set()).add(strategy)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    pending: Set[CachedTotal] = session.info.pop(_PENDING_KEY, set())
+    for strategy in pending:
+        strategy.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction: Any) -> None:
+    if previous_transaction.nested:
+        return
+    session.info.pop(_PENDING_KEY, None)
@@ -1,7 +1,7 @@
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Generic, TypeVar, List
+from typing import Generic, Optional, TypeVar, List
 
 T = TypeVar("T")
 
@@ -16,9 +16,23 @@ class Page(Generic[T]):
     total: int
     page: int
     size: int
+    total_is_estimate: bool = False
 
     @property
     def pages(self) -> int:
         if self.size <= 0:
             return 1 if self.total > 0 else 0
         return (self.total + self.size - 1) // self.size
+
+@dataclass(slots=True)
+class CursorPage(Generic[T]):
+    """Kết quả keyset pagination: không có số trang, chỉ có cursor tới trang sau."""
+    items: List[T]
+    size: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
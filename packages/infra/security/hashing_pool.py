@@ -0,0 +1,95 @@
+
+from __future__ import annotations
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Literal, Optional
+
+
+class HashingPoolSaturated(RuntimeError):
+    """Hàng đợi hash mật khẩu đã đầy; caller nên trả 503 + Retry-After."""
+
+
+@dataclass(slots=True)
+class HashingMetrics:
+    completed: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    latency_total_s: float = 0.0
+    latency_max_s: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = self.latency_total_s / self.completed if self.completed else 0.0
+        return {
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "latency_avg_ms": round(avg * 1000, 3),
+            "latency_max_ms": round(self.latency_max_s * 1000, 3),
+        }
+
+
+class HashingExecutor:
+    """Executor riêng cho bcrypt/argon2, tách khỏi default executor của asyncio.
+
+    - `workers`: số thread/process chạy hash song song (mặc định = số CPU).
+    - `max_pending`: tổng job đang chạy + đang chờ; vượt quá → HashingPoolSaturated
+      ngay lập tức thay vì xếp hàng vô hạn (admission control).
+    - `kind="process"`: dùng ProcessPoolExecutor; hàm truyền vào phải pickle được.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: Optional[int] = None,
+        max_pending: int = 64,
+        kind: Literal["thread", "process"] = "thread",
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pending = max_pending
+        self.kind = kind
+        self.metrics = HashingMetrics()
+        self._executor: Executor
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.metrics.in_flight >= self.max_pending:
+            self.metrics.rejected += 1
+            raise HashingPoolSaturated("Password hashing pool is saturated")
+
+        loop = asyncio.get_running_loop()
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            job = self._executor.submit(functools.partial(func, *args))
+        except BaseException:
+            self.metrics.in_flight -= 1
+            raise
+        # Đếm theo vòng đời của job trong pool, không theo coroutine đang await: request bị
+        # cancel (client ngắt, timeout) thì job đã chạy vẫn chiếm worker tới khi xong.
+        job.add_done_callback(functools.partial(self._job_done, loop, started))
+        return await asyncio.wrap_future(job)
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop, started: float, job: Future) -> None:
+        # Callback chạy trên thread của pool → chuyển cập nhật metrics về event loop
+        elapsed = time.perf_counter() - started
+        try:
+            loop.call_soon_threadsafe(self._record_done, elapsed)
+        except RuntimeError:
+            self._record_done(elapsed)  # loop đã đóng (shutdown)
+
+    def _record_done(self, elapsed: float) -> None:
+        self.metrics.in_flight -= 1
+        self.metrics.completed += 1
+        self.metrics.latency_total_s += elapsed
+        if elapsed > self.metrics.latency_max_s:
+            self.metrics.latency_max_s = elapsed
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
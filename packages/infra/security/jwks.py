@@ -0,0 +1,380 @@
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+    from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+except Exception:  # pragma: no cover
+    serialization = None  # type: ignore
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "EdDSA")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class SigningKey:
+    """Một cặp khoá JWT đã parse sẵn (private_key=None → chỉ dùng để verify)."""
+    kid: str
+    algorithm: str
+    public_key: Any
+    private_key: Any = None
+    created_at: datetime = datetime.min.replace(tzinfo=timezone.utc)
+    activate_at: Optional[datetime] = None  # trước mốc này key chỉ được công bố (JWKS), chưa dùng để ký
+    retire_at: Optional[datetime] = None  # sau mốc này key không còn trong JWKS
+
+    def to_jwk(self) -> Dict[str, Any]:
+        algo = OKPAlgorithm if self.algorithm == "EdDSA" else RSAAlgorithm
+        jwk = dict(algo.to_jwk(self.public_key, as_dict=True))
+        jwk.update(kid=self.kid, alg=self.algorithm, use="sig")
+        return jwk
+
+
+def generate_key(algorithm: str, *, kid: Optional[str] = None, now: Optional[datetime] = None) -> SigningKey:
+    if serialization is None:
+        raise RuntimeError("cryptography not installed. `pip install cryptography`")
+    if algorithm == "EdDSA":
+        private = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return SigningKey(
+        kid=kid or uuid.uuid4().hex[:16],
+        algorithm=algorithm,
+        public_key=private.public_key(),
+        private_key=private,
+        created_at=now or datetime.now(timezone.utc),
+    )
+
+
+class KeyRing:
+    """Tập khoá ký/verify JWT có `kid`, hỗ trợ xoay vòng (rotation).
+
+    - Key mới được công bố ngay (JWKS, verify) nhưng chỉ dùng để ký sau `publish_delay`
+      (≥ chu kỳ reload của worker khác + max-age của JWKS), để mọi nơi verify đã có key trước.
+    - Key active = key có private key mới nhất đã tới `activate_at`; dùng để ký token mới.
+    - Key cũ (bị key active mới hơn thay) vẫn verify được thêm `grace` (≥ TTL dài nhất của
+      token đã ký), rồi bị loại khỏi ring và JWKS.
+    - Nếu có `keys_dir`: mỗi key là file `<kid>.pem` (PKCS8 private key) kèm `<kid>.json`
+      (created_at / activate_at / retire_at), sidecar được ghi trước PEM nên worker khác thấy PEM
+      là thấy đủ mốc thời gian; PEM cũ không có sidecar thì lấy mtime làm created_at.
+      Worker rotate ghi luôn retire_at = activate_at của key mới + `grace` cho các key cũ.
+      Chỉ một worker rotate mỗi lượt: file `.rotate.lock` tạo bằng O_EXCL làm khoá; các worker
+      khác thấy key mới ở lần `reload()` kế tiếp (hoặc ngay khi gặp `kid` lạ, xem `resolve`).
+    - Bản async (`areload`, `amaybe_rotate`) đẩy sinh key RSA và IO file PEM sang thread;
+      ring chỉ bị sửa trên event loop.
+    """
+
+    LOCK_NAME = ".rotate.lock"
+
+    def __init__(
+        self,
+        algorithm: str,
+        *,
+        grace: timedelta,
+        keys_dir: Optional[str] = None,
+        publish_delay: timedelta = timedelta(0),
+        lock_stale: timedelta = timedelta(minutes=5),
+        unknown_kid_reload_interval: float = 5.0,
+    ) -> None:
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"KeyRing requires an asymmetric algorithm, got {algorithm}")
+        self.algorithm = algorithm
+        self.grace = grace
+        self.keys_dir = Path(keys_dir) if keys_dir else None
+        self.publish_delay = publish_delay
+        self.lock_stale = lock_stale
+        self.unknown_kid_reload_interval = unknown_kid_reload_interval
+        self._keys: Dict[str, SigningKey] = {}
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._last_kid_reload = float("-inf")
+
+    # ---------- lookup ----------
+    def signing_key(self, now: Optional[datetime] = None) -> SigningKey:
+        now = now or datetime.now(timezone.utc)
+        signing = [
+            k for k in self._keys.values()
+            if k.private_key is not None and (k.retire_at is None or k.retire_at > now)
+        ]
+        if not signing:
+            raise RuntimeError("KeyRing has no active signing key")
+        ready = [k for k in signing if k.activate_at is None or k.activate_at <= now]
+        # Chưa key nào tới hạn (vd. ring vừa khởi tạo từ key của worker khác): dùng key mới nhất
+        return max(ready or signing, key=lambda k: k.created_at)
+
+    @property
+    def active(self) -> SigningKey:
+        return self.signing_key()
+
+    def newest(self) -> Optional[SigningKey]:
+        """Key mới nhất kể cả key đang chờ activate (dùng để quyết định có cần rotate không)."""
+        signing = [k for k in self._keys.values() if k.private_key is not None]
+        return max(signing, key=lambda k: k.created_at) if signing else None
+
+    def get(self, kid: str) -> Optional[SigningKey]:
+        return self._keys.get(kid)
+
+    async def resolve(self, kid: str) -> Optional[SigningKey]:
+        """Như `get`, nhưng `kid` lạ thì reload keys_dir một lần (giới hạn tần suất) rồi tra lại:
+        token có thể được ký bằng key worker khác vừa sinh."""
+        key = self._keys.get(kid)
+        if key is not None or self.keys_dir is None:
+            return key
+        if time.monotonic() - self._last_kid_reload < self.unknown_kid_reload_interval:
+            return None
+        self._last_kid_reload = time.monotonic()
+        await self.areload()
+        return self._keys.get(kid)
+
+    def jwks(self) -> Dict[str, Any]:
+        if self._jwks is None:
+            self._jwks = {"keys": [k.to_jwk() for k in sorted(self._keys.values(), key=lambda k: k.created_at)]}
+        return self._jwks
+
+    # ---------- mutation (event loop) ----------
+    def add(self, key: SigningKey) -> None:
+        self._keys[key.kid] = key
+        self._jwks = None
+
+    def _retire_at(self, replacement: SigningKey) -> datetime:
+        """Key bị `replacement` thay vẫn verify được `grace` kể từ lúc replacement bắt đầu ký."""
+        return (replacement.activate_at or replacement.created_at) + self.grace
+
+    def _retire_older(self, now: datetime) -> None:
+        current = self.signing_key(now)
+        for k in self._keys.values():
+            # Key đang chờ activate (mới hơn current) không bị retire
+            if k is not current and k.retire_at is None and k.created_at < current.created_at:
+                k.retire_at = self._retire_at(current)
+
+    def _forget_expired(self, now: datetime) -> List[str]:
+        expired = [kid for kid, k in self._keys.items() if k.retire_at is not None and k.retire_at <= now]
+        for kid in expired:
+            del self._keys[kid]
+        if expired:
+            self._jwks = None
+        return expired
+
+    def _apply(self, keys: List[SigningKey], now: datetime) -> List[str]:
+        """Thêm key mới, retire key bị thay; trả về kid đã hết grace (caller xoá file)."""
+        for key in keys:
+            self.add(key)
+        if not self._keys:
+            return []
+        self._retire_older(now)
+        return self._forget_expired(now)
+
+    def prune(self, now: Optional[datetime] = None) -> None:
+        self._unlink(self._forget_expired(now or datetime.now(timezone.utc)))
+
+    # ---------- persistence (chạy được trong thread) ----------
+    def _unlink(self, kids: List[str]) -> None:
+        if self.keys_dir is None:
+            return
+        for kid in kids:
+            (self.keys_dir / f"{kid}.pem").unlink(missing_ok=True)
+            (self.keys_dir / f"{kid}.json").unlink(missing_ok=True)
+
+    def _write_meta(self, kid: str, meta: Dict[str, Optional[datetime]]) -> None:
+        assert self.keys_dir is not None
+        body = {name: value.isoformat() if value else None for name, value in meta.items()}
+        # Ghi file tạm rồi rename: người đọc không bao giờ thấy sidecar ghi dở
+        tmp = self.keys_dir / f".{kid}.json.tmp"
+        tmp.write_text(json.dumps(body))
+        os.replace(tmp, self.keys_dir / f"{kid}.json")
+
+    def _read_meta(self, kid: str) -> Dict[str, Optional[datetime]]:
+        """Mốc thời gian của key trên đĩa; PEM chưa có sidecar (bản cũ) → created_at = mtime."""
+        assert self.keys_dir is not None
+        try:
+            body = json.loads((self.keys_dir / f"{kid}.json").read_text())
+        except FileNotFoundError:
+            mtime = (self.keys_dir / f"{kid}.pem").stat().st_mtime
+            created = datetime.fromtimestamp(mtime, tz=timezone.utc)
+            return {"created_at": created, "activate_at": created + self.publish_delay, "retire_at": None}
+        return {
+            name: datetime.fromisoformat(body[name]) if body.get(name) else None
+            for name in ("created_at", "activate_at", "retire_at")
+        }
+
+    def _write_pem(self, key: SigningKey) -> None:
+        assert self.keys_dir is not None
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        self._write_meta(key.kid, {"created_at": key.created_at, "activate_at": key.activate_at, "retire_at": None})
+        pem = key.private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        # O_EXCL: không ghi đè key của worker khác
+        fd = os.open(self.keys_dir / f"{key.kid}.pem", os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+
+    def _read_new(self, known: frozenset) -> List[SigningKey]:
+        """Parse các file PEM chưa có trong ring."""
+        if self.keys_dir is None or not self.keys_dir.is_dir():
+            return []
+        keys = []
+        for path in self.keys_dir.glob("*.pem"):
+            kid = path.stem
+            if kid in known:
+                continue
+            try:
+                private = serialization.load_pem_private_key(path.read_bytes(), password=None)
+                meta = self._read_meta(kid)
+            except (FileNotFoundError, ValueError):
+                continue  # file vừa bị prune, hoặc worker khác đang ghi dở
+            keys.append(SigningKey(kid=kid, algorithm=self.algorithm, public_key=private.public_key(),
+                                   private_key=private, **meta))
+        return keys
+
+    def _acquire_lock(self, now: datetime) -> bool:
+        assert self.keys_dir is not None
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        lock = self.keys_dir / self.LOCK_NAME
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+                return True
+            except FileExistsError:
+                try:
+                    age = now.timestamp() - lock.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if age < self.lock_stale.total_seconds():
+                    return False
+                # Worker giữ khoá đã chết giữa chừng
+                lock.unlink(missing_ok=True)
+        return False
+
+    def _mint(self, now: datetime, max_age: Optional[timedelta], *, first: bool) -> Optional[SigningKey]:
+        """Sinh key mới nếu vẫn cần sau khi giành được khoá rotate; None = worker khác đã / đang làm.
+
+        max_age=None: chỉ sinh khi keys_dir chưa có key nào (khởi tạo).
+        """
+        if self.keys_dir is None:
+            return self._generate(now, first=first)
+        if not self._acquire_lock(now):
+            return None
+        try:
+            on_disk = {}
+            for path in self.keys_dir.glob("*.pem"):
+                try:
+                    on_disk[path.stem] = self._read_meta(path.stem)
+                except (FileNotFoundError, ValueError):
+                    continue
+            newest = max((m["created_at"] for m in on_disk.values()), default=None)
+            if newest is not None and (max_age is None or newest + max_age > now):
+                return None
+            key = self._generate(now, first=first)
+            self._write_pem(key)
+            for kid, meta in on_disk.items():
+                if meta["retire_at"] is None:
+                    self._write_meta(kid, {**meta, "retire_at": self._retire_at(key)})
+            return key
+        finally:
+            (self.keys_dir / self.LOCK_NAME).unlink(missing_ok=True)
+
+    def _generate(self, now: datetime, *, first: bool) -> SigningKey:
+        key = generate_key(self.algorithm, now=now)
+        if not first:
+            key.activate_at = now + self.publish_delay
+        return key
+
+    def _needs_rotation(self, max_age: timedelta, now: datetime) -> bool:
+        newest = self.newest()
+        return newest is None or newest.created_at + max_age <= now
+
+    # ---------- sync API (khởi động, script) ----------
+    def reload(self, now: Optional[datetime] = None) -> None:
+        """Đọc lại keys_dir: thêm key mới, giữ nguyên key đã parse, rồi retire/prune."""
+        now = now or datetime.now(timezone.utc)
+        self._unlink(self._apply(self._read_new(frozenset(self._keys)), now))
+
+    def rotate(self, now: Optional[datetime] = None) -> Optional[SigningKey]:
+        """Ép sinh key mới (vẫn qua khoá rotate và publish_delay)."""
+        now = now or datetime.now(timezone.utc)
+        key = self._mint(now, timedelta(0), first=not self._keys)
+        if key is not None:
+            self._unlink(self._apply([key], now))
+        return key
+
+    def maybe_rotate(self, max_age: timedelta, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.now(timezone.utc)
+        if not self._needs_rotation(max_age, now):
+            return False
+        key = self._mint(now, max_age, first=not self._keys)
+        if key is None:
+            return False
+        self._unlink(self._apply([key], now))
+        return True
+
+    # ---------- async API (vòng lặp nền, request) ----------
+    async def areload(self) -> None:
+        keys = await asyncio.to_thread(self._read_new, frozenset(self._keys))
+        expired = self._apply(keys, datetime.now(timezone.utc))
+        if expired:
+            await asyncio.to_thread(self._unlink, expired)
+
+    async def amaybe_rotate(self, max_age: timedelta) -> bool:
+        now = datetime.now(timezone.utc)
+        if not self._needs_rotation(max_age, now):
+            return False
+        key = await asyncio.to_thread(self._mint, now, max_age, first=not self._keys)
+        if key is None:
+            return False
+        expired = self._apply([key], now)
+        if expired:
+            await asyncio.to_thread(self._unlink, expired)
+        logger.info("jwt key rotated: kid=%s, signing from %s", key.kid, key.activate_at or now)
+        return True
+
+    @classmethod
+    def load(
+        cls,
+        algorithm: str,
+        *,
+        grace: timedelta,
+        keys_dir: Optional[str] = None,
+        publish_delay: timedelta = timedelta(0),
+        wait: float = 5.0,
+    ) -> "KeyRing":
+        """Nạp ring từ keys_dir; chưa có key nào thì một worker sinh key đầu tiên, các worker khác
+        chờ tối đa `wait` giây để đọc key đó (không có keys_dir: key chỉ sống trong process)."""
+        ring = cls(algorithm, grace=grace, keys_dir=keys_dir, publish_delay=publish_delay)
+        ring.reload()
+        deadline = time.monotonic() + wait
+        while not ring._keys:
+            now = datetime.now(timezone.utc)
+            key = ring._mint(now, None, first=True)
+            if key is not None:
+                ring._apply([key], now)
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"No JWT signing key appeared in {keys_dir}")
+            time.sleep(0.1)
+            ring.reload()
+        return ring
+
+    def kids(self) -> List[str]:
+        return list(self._keys)
+
+
+async def run_key_rotation(ring: KeyRing, *, interval: float, max_age: timedelta) -> None:
+    """Vòng lặp nền: định kỳ reload keys_dir và rotate khi key mới nhất quá `max_age`."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await ring.areload()
+            await ring.amaybe_rotate(max_age)
+        except Exception as e:
+            logger.warning("jwt key rotation failed: %s: %s", type(e).__name__, e)
@@ -0,0 +1,197 @@
+
+from __future__ import annotations
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Optional, Protocol
+
+from packages.infra.cache.local_redis import LocalRedis
+from packages.infra.db.models.ops.login_attempt import LoginAttempt
+
+# Optional redis client (redis-py >= 4.2 có redis.asyncio)
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover
+    aioredis = None  # type: ignore
+
+
+def _key(email: str, ip: str) -> str:
+    return f"{email.lower()}|{ip}"
+
+
+def _to_dt(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+class LockoutBackend(Protocol):
+    async def is_locked(self, email: str, ip: str) -> Optional[datetime]: ...
+    async def record(self, email: str, ip: str, success: bool) -> None: ...
+
+
+class InMemoryLockoutBackend:
+    """Sliding window trong process, key = (email, ip).
+
+    Mỗi key chỉ giữ tối đa `max_attempts` mốc thất bại gần nhất (deque maxlen),
+    số key bị chặn bởi `max_keys` với LRU eviction → bộ nhớ bị chặn trên.
+    Lần thất bại thứ `max_attempts` trong `window` khoá key trong `lockout`;
+    đăng nhập thành công xoá key.
+    Trạng thái là per-process: chạy nhiều worker thì dùng RedisLockoutBackend.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_attempts: int = 5,
+        window: timedelta = timedelta(minutes=15),
+        lockout: timedelta = timedelta(minutes=15),
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.clock = clock
+        self.max_attempts = max_attempts
+        self.window = window.total_seconds()
+        self.lockout = lockout.total_seconds()
+        self.max_keys = max_keys
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._locked_until: dict[str, float] = {}
+
+    async def is_locked(self, email: str, ip: str) -> Optional[datetime]:
+        key = _key(email, ip)
+        until = self._locked_until.get(key)
+        if until is None:
+            return None
+        if until <= self.clock():
+            self._locked_until.pop(key, None)
+            return None
+        return _to_dt(until)
+
+    async def record(self, email: str, ip: str, success: bool) -> None:
+        key = _key(email, ip)
+        if success:
+            self._failures.pop(key, None)
+            self._locked_until.pop(key, None)
+            return
+
+        now = self.clock()
+        hits = self._failures.get(key)
+        if hits is None:
+            hits = self._failures[key] = deque(maxlen=self.max_attempts)
+        else:
+            self._failures.move_to_end(key)
+        hits.append(now)
+        if len(hits) >= self.max_attempts and hits[0] >= now - self.window:
+            self._locked_until[key] = now + self.lockout
+
+        while len(self._failures) > self.max_keys:
+            old, _ = self._failures.popitem(last=False)
+            self._locked_until.pop(old, None)
+
+
+class RedisLockoutBackend:
+    """Sliding window trên Redis (sorted set theo timestamp), dùng chung giữa các worker.
+
+    `client` là bất kỳ client tương thích redis.asyncio (zadd/zremrangebyscore/zcard/
+    expire/set/get/delete + pipeline); `REDIS_URL=memory://` dùng LocalRedis trong
+    process (dev/test, không chia sẻ giữa worker).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        max_attempts: int = 5,
+        window: timedelta = timedelta(minutes=15),
+        lockout: timedelta = timedelta(minutes=15),
+        prefix: str = "lockout:",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.client = client
+        self.clock = clock
+        self.max_attempts = max_attempts
+        self.window = window.total_seconds()
+        self.lockout = lockout.total_seconds()
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisLockoutBackend":
+        if url.startswith("memory://"):
+            return cls(LocalRedis.from_url(url, clock=kwargs.get("clock", time.time)), **kwargs)
+        if aioredis is None:
+            raise RuntimeError("redis not installed. `pip install redis`")
+        return cls(aioredis.from_url(url), **kwargs)
+
+    async def is_locked(self, email: str, ip: str) -> Optional[datetime]:
+        raw = await self.client.get(f"{self.prefix}lock:{_key(email, ip)}")
+        if raw is None:
+            return None
+        until = float(raw)
+        return _to_dt(until) if until > self.clock() else None
+
+    async def record(self, email: str, ip: str, success: bool) -> None:
+        key = _key(email, ip)
+        hits_key = f"{self.prefix}hits:{key}"
+        if success:
+            await self.client.delete(hits_key, f"{self.prefix}lock:{key}")
+            return
+
+        now = self.clock()
+        pipe = self.client.pipeline()
+        pipe.zadd(hits_key, {f"{now}:{uuid.uuid4().hex[:8]}": now})
+        pipe.zremrangebyscore(hits_key, 0, now - self.window)
+        pipe.zcard(hits_key)
+        pipe.expire(hits_key, int(self.window) + 1)
+        _, _, count, _ = await pipe.execute()
+        if int(count) >= self.max_attempts:
+            await self.client.set(f"{self.prefix}lock:{key}", str(now + self.lockout), ex=int(self.lockout) + 1)
+
+
+class SqlLockoutBackend:
+    """Hành vi cũ: đếm ops.login_attempts bằng COUNT(*) (LoginAttemptRepo.is_locked)."""
+
+    def __init__(self, attempts: Any) -> None:
+        self.attempts = attempts
+
+    async def is_locked(self, email: str, ip: str) -> Optional[datetime]:
+        return await self.attempts.is_locked(email, ip)
+
+    async def record(self, email: str, ip: str, success: bool) -> None:
+        return None  # dòng audit do LoginLockout ghi
+
+
+class LoginLockout:
+    """Giữ interface is_locked/add cho /auth/login.
+
+    Quyết định khoá lấy từ `backend`; bảng ops.login_attempts (qua `audit`) chỉ còn
+    là audit log, không còn nằm trên đường đọc của mỗi lần login.
+    """
+
+    def __init__(self, backend: LockoutBackend, audit: Any = None) -> None:
+        self.backend = backend
+        self.audit = audit
+
+    async def is_locked(self, email: str, ip: str) -> Optional[datetime]:
+        return await self.backend.is_locked(email, ip)
+
+    async def add(self, *, email: str, ip: str, success: bool) -> None:
+        await self.backend.record(email, ip, success)
+        if self.audit is not None:
+            await self.audit.add(email=email, ip=ip, success=success, commit=False)
+
+
+class QueuedAttemptAudit:
+    """Audit ops.login_attempts qua AuditWriter thay vì stage row trong session của request.
+
+    id/attempted_at gán lúc enqueue nên thời điểm vẫn đúng dù row được ghi trễ vài trăm ms.
+    """
+
+    def __init__(self, writer: Any) -> None:
+        self.writer = writer
+
+    async def add(self, *, email: str, ip: str, success: bool, commit: bool = False) -> None:
+        await self.writer.enqueue(LoginAttempt.__table__, {
+            "id": uuid.uuid4(),
+            "email_canon": email,
+            "ip": ip or None,  # "" không phải INET hợp lệ
+            "attempted_at": datetime.now(timezone.utc),
+        })
@@ -4,6 +4,8 @@ import asyncio
 import functools
 from typing import Optional
 
+from packages.infra.security.hashing_pool import HashingExecutor, HashingPoolSaturated
+
 # Prefer bcrypt (widely available); optionally support argon2 if installed.
 try:
     import bcrypt
@@ -18,28 +20,56 @@ except Exception:  # pragma: no cover
     VerifyMismatchError = Exception  # type: ignore
 
 
-async def _to_thread(func, *args, **kwargs):
-    """Run a sync function in a thread, return its result."""
+async def _to_thread(func, *args, executor: Optional[HashingExecutor] = None, **kwargs):
+    """Run a sync function on the hashing executor (or the default one), return its result."""
+    if executor is not None:
+        return await executor.run(functools.partial(func, *args, **kwargs))
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
 
 
+def _argon2_hash(plain: str, time_cost: int, memory_cost: int, parallelism: int, hash_len: int, salt_len: int) -> str:
+    # Module-level (không phải closure/bound method) để pickle được khi executor là process pool
+    return Argon2Hasher(
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        hash_len=hash_len,
+        salt_len=salt_len,
+    ).hash(plain)
+
+
+def _argon2_verify(plain: str, hashed: str) -> bool:
+    # Tham số (m, t, p) đọc từ chính chuỗi hash
+    try:
+        return bool(Argon2Hasher().verify(hashed, plain))
+    except VerifyMismatchError:
+        return False
+    except Exception:
+        return False
+
+
 class BcryptPasswordHasher:
     """Async adapter over `bcrypt` with thread offloading."""
-    def __init__(self, rounds: int = 12):
+    def __init__(self, rounds: int = 12, executor: Optional[HashingExecutor] = None):
         if bcrypt is None:
             raise RuntimeError("bcrypt not installed. `pip install bcrypt`")
         self.rounds = rounds
+        self.executor = executor
 
     async def hash(self, plain: str) -> str:
-        salt = await _to_thread(bcrypt.gensalt, self.rounds)
-        digest: bytes = await _to_thread(bcrypt.hashpw, plain.encode("utf-8"), salt)
+        salt = bcrypt.gensalt(self.rounds)  # chỉ đọc urandom, không cần offload
+        digest: bytes = await _to_thread(bcrypt.hashpw, plain.encode("utf-8"), salt, executor=self.executor)
         return digest.decode("utf-8")
 
     async def verify(self, plain: str, hashed: str) -> bool:
         try:
-            ok: bool = await _to_thread(bcrypt.checkpw, plain.encode("utf-8"), hashed.encode("utf-8"))
+            ok: bool = await _to_thread(
+                bcrypt.checkpw, plain.encode("utf-8"), hashed.encode("utf-8"), executor=self.executor
+            )
             return bool(ok)
+        except HashingPoolSaturated:
+            raise
         except Exception:
             return False
 
@@ -53,29 +83,18 @@ class Argon2PasswordHasher:
         parallelism: int = 8,
         hash_len: int = 32,
         salt_len: int = 16,
+        executor: Optional[HashingExecutor] = None,
     ):
         if Argon2Hasher is None:
             raise RuntimeError("argon2-cffi not installed. `pip install argon2-cffi`")
-        self._ph = Argon2Hasher(
-            time_cost=time_cost,
-            memory_cost=memory_cost,
-            parallelism=parallelism,
-            hash_len=hash_len,
-            salt_len=salt_len,
-        )
+        self.params = (time_cost, memory_cost, parallelism, hash_len, salt_len)
+        self.executor = executor
 
     async def hash(self, plain: str) -> str:
-        return await _to_thread(self._ph.hash, plain)
+        return await _to_thread(_argon2_hash, plain, *self.params, executor=self.executor)
 
     async def verify(self, plain: str, hashed: str) -> bool:
-        def _verify() -> bool:
-            try:
-                return bool(self._ph.verify(hashed, plain))
-            except VerifyMismatchError:
-                return False
-            except Exception:
-                return False
-        return await _to_thread(_verify)
+        return await _to_thread(_argon2_verify, plain, hashed, executor=self.executor)
 
 
 def default_password_hasher() -> BcryptPasswordHasher:
@@ -1,21 +1,137 @@
 
 from __future__ import annotations
 import asyncio
+from typing import Literal, Optional
+
 import bcrypt
 
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except Exception:  # pragma: no cover
+    Argon2Hasher = None  # type: ignore
+    InvalidHashError = VerificationError = Exception  # type: ignore
+
+from packages.infra.security.hashing_pool import HashingExecutor
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+ARGON2_PREFIX = "$argon2"
+
+
+def _bcrypt_hash(plain: bytes, rounds: int) -> bytes:
+    # gensalt + hashpw trong một lần offload (module-level để pickle được với process pool)
+    return bcrypt.hashpw(plain, bcrypt.gensalt(rounds))
+
+
+def _bcrypt_check(plain: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(plain, hashed)
+
+
+def _bcrypt_cost(hashed: str) -> Optional[int]:
+    # $2b$12$<salt+digest>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _argon2_hash(plain: str, time_cost: int, memory_cost: int, parallelism: int) -> str:
+    return Argon2Hasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism).hash(plain)
+
+
+def _argon2_check(plain: str, hashed: str) -> bool:
+    # Tham số (m, t, p) nằm sẵn trong chuỗi hash nên verify không cần cấu hình
+    try:
+        return bool(Argon2Hasher().verify(hashed, plain))
+    except (VerificationError, InvalidHashError):
+        return False
+
+
 class AsyncBcryptHasher:
-    """Async bcrypt using asyncio.to_thread to avoid blocking the event loop."""
-    def __init__(self, rounds: int = 12) -> None:
+    """Async bcrypt; chạy trên HashingExecutor riêng nếu có, ngược lại asyncio.to_thread."""
+    def __init__(self, rounds: int = 12, executor: Optional[HashingExecutor] = None) -> None:
         self.rounds = rounds
+        self.executor = executor
+
+    async def _run(self, func, *args):
+        if self.executor is not None:
+            return await self.executor.run(func, *args)
+        return await asyncio.to_thread(func, *args)
 
     async def hash(self, plain: str) -> str:
-        salt = await asyncio.to_thread(bcrypt.gensalt, self.rounds)
-        hashed = await asyncio.to_thread(bcrypt.hashpw, plain.encode("utf-8"), salt)
+        hashed = await self._run(_bcrypt_hash, plain.encode("utf-8"), self.rounds)
         return hashed.decode("utf-8")
 
     async def verify(self, plain: str, hashed: str) -> bool:
         try:
-            ok = await asyncio.to_thread(bcrypt.checkpw, plain.encode("utf-8"), hashed.encode("utf-8"))
+            ok = await self._run(_bcrypt_check, plain.encode("utf-8"), hashed.encode("utf-8"))
             return bool(ok)
-        except Exception:
-            return False
+        except ValueError:
+            return False  # hash hỏng / không phải bcrypt
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return not hashed.startswith(BCRYPT_PREFIXES) or _bcrypt_cost(hashed) != self.rounds
+
+
+class MultiSchemeHasher:
+    """Hash bằng scheme hiện hành, verify theo scheme đọc từ chính chuỗi hash.
+
+    - bcrypt: "$2b$<cost>$..."; argon2: "$argon2id$v=19$m=..,t=..,p=..$...".
+    - `needs_rehash()` = True khi hash cũ khác scheme hoặc khác tham số hiện hành,
+      để flow login nâng cấp hash sau khi verify thành công (không bắt reset mật khẩu).
+    """
+    def __init__(
+        self,
+        scheme: Literal["bcrypt", "argon2"] = "bcrypt",
+        *,
+        bcrypt_rounds: int = 12,
+        argon2_time_cost: int = 2,
+        argon2_memory_cost: int = 102400,  # KiB
+        argon2_parallelism: int = 8,
+        executor: Optional[HashingExecutor] = None,
+    ) -> None:
+        if scheme == "argon2" and Argon2Hasher is None:
+            raise RuntimeError("argon2-cffi not installed. `pip install argon2-cffi`")
+        self.scheme = scheme
+        self.bcrypt_rounds = bcrypt_rounds
+        self.argon2_params = (argon2_time_cost, argon2_memory_cost, argon2_parallelism)
+        self.executor = executor
+
+    async def _run(self, func, *args):
+        if self.executor is not None:
+            return await self.executor.run(func, *args)
+        return await asyncio.to_thread(func, *args)
+
+    @staticmethod
+    def identify(hashed: str) -> Optional[str]:
+        if hashed.startswith(BCRYPT_PREFIXES):
+            return "bcrypt"
+        if hashed.startswith(ARGON2_PREFIX):
+            return "argon2"
+        return None
+
+    async def hash(self, plain: str) -> str:
+        if self.scheme == "argon2":
+            return await self._run(_argon2_hash, plain, *self.argon2_params)
+        hashed = await self._run(_bcrypt_hash, plain.encode("utf-8"), self.bcrypt_rounds)
+        return hashed.decode("utf-8")
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        scheme = self.identify(hashed)
+        if scheme == "bcrypt":
+            try:
+                return bool(await self._run(_bcrypt_check, plain.encode("utf-8"), hashed.encode("utf-8")))
+            except ValueError:
+                return False
+        if scheme == "argon2" and Argon2Hasher is not None:
+            return await self._run(_argon2_check, plain, hashed)
+        return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        scheme = self.identify(hashed)
+        if scheme != self.scheme:
+            return True
+        if scheme == "bcrypt":
+            return _bcrypt_cost(hashed) != self.bcrypt_rounds
+        t, m, p = self.argon2_params
+        return Argon2Hasher(time_cost=t, memory_cost=m, parallelism=p).check_needs_rehash(hashed)
@@ -3,14 +3,25 @@ from __future__ import annotations
 import asyncio
 from datetime import datetime, timedelta, timezone
 import os
+import time
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
 import jwt
 
 from apps.api import settings
+from packages.infra.cache.ttl_lru import TTLCache
+from packages.infra.security.jwks import KeyRing
 load_dotenv()
 class AsyncJWTService:
-    """Async JWT encode/decode (PyJWT) offloaded to threads."""
+    """Async JWT encode/decode (PyJWT).
+
+    HMAC (HS*) chỉ tốn vài micro-giây nên chạy thẳng trên event loop; chỉ thuật toán
+    bất đối xứng (RS*/ES*/EdDSA) mới offload sang thread. Token đã verify được cache
+    (LRU, tới đúng `exp`) để request lặp lại cùng bearer token bỏ qua bước verify.
+
+    Với `keyring` (RS256/EdDSA): ký bằng key active và gắn header `kid`; verify bằng
+    public key tra theo `kid` (đã parse sẵn), nên service khác chỉ cần JWKS để verify.
+    """
     def __init__(
         self,
         secret: str,
@@ -18,12 +29,38 @@ class AsyncJWTService:
         issuer: Optional[str] = None,
         audience: Optional[str] = None,
         default_ttl: timedelta = timedelta(hours=12),
+        verified_cache_size: int = 10_000,
+        keyring: Optional[KeyRing] = None,
     ) -> None:
         self.secret = secret
         self.algorithm = algorithm
         self.issuer = issuer
         self.audience = audience
         self.default_ttl = default_ttl
+        self.keyring = keyring
+        self._offload = keyring is not None or not algorithm.upper().startswith("HS")
+        self.verified_cache: TTLCache[str, Dict[str, Any]] = TTLCache(maxsize=verified_cache_size)
+
+    async def _run(self, func, *args, **kwargs):
+        if self._offload:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def _encode(self, payload: Dict[str, Any]) -> str:
+        if self.keyring is None:
+            return await self._run(jwt.encode, payload, self.secret, algorithm=self.algorithm)
+        key = self.keyring.active
+        return await self._run(jwt.encode, payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    async def _verification_key(self, token: str) -> tuple[Any, str]:
+        if self.keyring is None:
+            return self.secret, self.algorithm
+        kid = jwt.get_unverified_header(token).get("kid")
+        # kid lạ: có thể là key worker khác vừa sinh → keyring reload một lần trước khi từ chối
+        key = await self.keyring.resolve(kid) if kid else None
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown signing key: {kid}")
+        return key.public_key, key.algorithm
 
     async def create_access_token(
         self, subject: str, *, expires_delta: Optional[timedelta] = None, extra: Optional[Dict[str, Any]] = None
@@ -37,7 +74,7 @@ class AsyncJWTService:
             payload["aud"] = self.audience
         if extra:
             payload.update(extra)
-        token = await asyncio.to_thread(jwt.encode, payload, self.secret, algorithm=self.algorithm)
+        token = await self._encode(payload)
         return token
     
     async def create_refresh_token(
@@ -65,22 +102,37 @@ class AsyncJWTService:
             "iat": datetime.now(timezone.utc),  # issued at
             "type": "refresh"           # distinguish refresh token
         }
+        # decode() kiểm tra iss/aud nên refresh token cũng phải mang chúng
+        if self.issuer:
+            payload["iss"] = self.issuer
+        if self.audience:
+            payload["aud"] = self.audience
 
         if extra:
             payload.update(extra)
 
-        encoded_jwt = await asyncio.to_thread(jwt.encode, payload, self.secret, algorithm=self.algorithm)
+        encoded_jwt = await self._encode(payload)
         return encoded_jwt
 
     async def decode(self, token: str) -> dict:
+        cached = self.verified_cache.get(token)
+        if cached is not None:
+            return dict(cached)
+
         options = {"verify_aud": bool(self.audience)}
-        payload = await asyncio.to_thread(
+        key, algorithm = await self._verification_key(token)
+        payload = await self._run(
             jwt.decode,
             token,
-            self.secret,
-            algorithms=[self.algorithm],
+            key,
+            algorithms=[algorithm],
             options=options,
             audience=self.audience,
             issuer=self.issuer,
         )
-        return payload
+        # Chỉ cache token đã có hiệu lực; entry hết hạn đúng lúc token hết hạn
+        exp = payload.get("exp")
+        nbf = payload.get("nbf")
+        if isinstance(exp, (int, float)) and (nbf is None or nbf <= time.time()):
+            self.verified_cache.set(token, payload, expires_at=float(exp))
+        return dict(payload)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+
+def with_client_ip(app, ip: str):
+    """TestClient báo client host "testclient" — không phải INET hợp lệ cho ops.*.ip."""
+    async def asgi(scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            scope = dict(scope, client=(ip, 50000))
+        await app(scope, receive, send)
+
+    return asgi
+
+
+@pytest.fixture
+def client(pg):
+    from apps.api.main import app
+    from packages.infra.db.session import get_session
+
+    engine = pg.engine()  # NullPool → dùng được từ event loop của TestClient
+    Session = pg.sessionmaker(engine)
+
+    async def session_override():
+        async with Session() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    try:
+        yield TestClient(with_client_ip(app, "10.0.0.1"))
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+
+
+def login(client: TestClient) -> dict:
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    assert client.post("/auth/register", json={"email": email, "password": "s3cret-pass"}).status_code == 201
+    resp = client.post("/auth/login", json={"email": email, "password": "s3cret-pass"})
+    assert resp.status_code == 200
+    return {"email": email, "refresh": resp.cookies["refresh_token"]}
+
+
+def refresh(client: TestClient, token: str):
+    client.cookies.clear()
+    return client.post("/auth/refresh", cookies={"refresh_token": token})
+
+
+def query(pg, sql: str, **params):
+    async def run(engine):
+        async with engine.begin() as conn:
+            return (await conn.execute(text(sql), params)).all()
+
+    return pg.run(run)
+
+
+def test_refresh_rotates_token(client, pg):
+    first = login(client)["refresh"]
+
+    resp = refresh(client, first)
+
+    assert resp.status_code == 200
+    assert resp.json()["access_token"]
+    second = resp.cookies["refresh_token"]
+    assert second != first
+    assert refresh(client, second).status_code == 200
+    rows = query(pg, "SELECT revoked_at IS NULL FROM ops.refresh_tokens ORDER BY issued_at")
+    assert [live for (live,) in rows] == [False, False, True]
+
+
+def test_replaying_rotated_token_revokes_family_and_session(client, pg):
+    first = login(client)["refresh"]
+    second = refresh(client, first).cookies["refresh_token"]
+
+    replay = refresh(client, first)
+
+    assert replay.status_code == 401
+    assert replay.json()["detail"] == "Refresh token reuse detected"
+    assert query(pg, "SELECT count(*) FROM ops.refresh_tokens WHERE revoked_at IS NULL") == [(0,)]
+    assert query(pg, "SELECT count(*) FROM ops.auth_sessions WHERE revoked_at IS NULL") == [(0,)]
+    # Token hợp lệ cuối cùng của family cũng đã chết
+    assert refresh(client, second).status_code == 401
+
+
+def test_expired_token_is_rejected(client, pg):
+    token = login(client)["refresh"]
+    query_sql = "UPDATE ops.refresh_tokens SET expires_at = now() - interval '1 second' RETURNING id"
+    assert len(query(pg, query_sql)) == 1
+
+    resp = refresh(client, token)
+
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "Invalid refresh token"
+    assert query(pg, "SELECT count(*) FROM ops.refresh_tokens") == [(1,)]
+
+
+def test_revoked_token_is_rejected(client, pg):
+    token = login(client)["refresh"]
+    query(pg, "UPDATE ops.refresh_tokens SET revoked_at = now() RETURNING id")
+
+    resp = refresh(client, token)
+
+    assert resp.status_code == 401
+    assert query(pg, "SELECT count(*) FROM ops.auth_sessions WHERE revoked_at IS NULL") == [(0,)]
+
+
+def test_forged_or_missing_token_is_rejected(client):
+    login(client)
+    client.cookies.clear()
+    assert client.post("/auth/refresh").status_code == 401
+    assert refresh(client, "not-a-jwt").status_code == 401
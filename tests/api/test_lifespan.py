@@ -0,0 +1,44 @@
+from __future__ import annotations
+import asyncio
+
+from apps.api import main
+
+
+def test_shutdown_waits_for_cancelled_jobs_before_stopping_writer(monkeypatch):
+    events: list = []
+
+    async def job(*args, **kwargs):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.05)  # cleanup của batch đang chạy
+            events.append("job cancelled")
+            raise
+
+    async def stop_writer(*args, **kwargs):
+        events.append("audit writer stopped")
+
+    class Engine:
+        async def dispose(self) -> None:
+            events.append("engine disposed")
+
+    monkeypatch.setattr(main.settings, "audit_writer_enabled", False)
+    monkeypatch.setattr(main.settings, "retention_enabled", True)
+    monkeypatch.setattr(main.settings, "partition_maintenance_enabled", False)
+    monkeypatch.setattr(main.settings, "outbox_dispatcher_enabled", False)
+    monkeypatch.setattr(main.settings, "product_card_refresher_enabled", False)
+    monkeypatch.setattr(main.settings, "reservation_expiry_enabled", False)
+    monkeypatch.setattr(main, "keyring", None)
+    monkeypatch.setattr(main, "run_retention", job)
+    monkeypatch.setattr(main.audit_writer, "stop", stop_writer)
+    monkeypatch.setattr(main, "engine", Engine())
+    monkeypatch.setattr(main, "replica_engine", None)
+    monkeypatch.setattr(main.hashing_executor, "shutdown", lambda: None)
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert events == ["job cancelled", "audit writer stopped", "engine disposed"]
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+
+class FakeClock:
+    """Đồng hồ tay cho test: thay cho time.time, chỉ chạy khi gọi advance()."""
+
+    def __init__(self, now: float = 1_700_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
@@ -0,0 +1,89 @@
+"""
+Fixture dùng chung.
+
+Test có fixture `pg` chạy trên PostgreSQL thật: đặt TEST_DATABASE_URL
+(postgresql+asyncpg://...) tới một database riêng cho test; schema được dựng bằng
+`alembic upgrade head` một lần mỗi phiên pytest, dữ liệu bị TRUNCATE trước mỗi test.
+Không có TEST_DATABASE_URL thì các test đó bị skip.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Settings của app đọc env lúc import (khi collect test): trỏ về DB test nếu có, không thì một
+# URL không bao giờ được kết nối (test không có fixture `pg` không chạm DB).
+_URL = TEST_DATABASE_URL or "postgresql+asyncpg://test@localhost/test"
+os.environ.setdefault("DATABASE_URL_ASYNC", _URL)
+os.environ.setdefault("DATABASE_URL_SYNC", _URL.replace("+asyncpg", ""))
+os.environ.setdefault("REFRESH_TOKEN_PEPPER", "test-pepper")
+
+
+class PgHarness:
+    """Mỗi `run()` là một event loop riêng (asyncio.run) với engine NullPool riêng."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+    def engine(self) -> AsyncEngine:
+        # NullPool: connection asyncpg gắn với event loop, không được giữ lại giữa các loop
+        return create_async_engine(self.url, poolclass=NullPool)
+
+    def sessionmaker(self, engine: AsyncEngine) -> sessionmaker:
+        # Session thường (không RoutingSession: get_bind của nó luôn trỏ engine toàn cục của app).
+        # Import session để đăng ký các listener (product_cards, availability, principal, closure).
+        import packages.infra.db.session  # noqa: F401
+
+        return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+    def run(self, fn: Callable[[AsyncEngine], Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            engine = self.engine()
+            try:
+                return await fn(engine)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    def truncate(self) -> None:
+        from packages.infra.db.models.base import Base
+
+        names = ", ".join(
+            f"{t.schema}.{t.name}" if t.schema else t.name for t in Base.metadata.sorted_tables
+        )
+
+        async def wipe(engine: AsyncEngine) -> None:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"TRUNCATE {names} CASCADE"))
+
+        self.run(wipe)
+
+
+@pytest.fixture(scope="session")
+def pg_schema() -> str:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from alembic import command
+    from alembic.config import Config
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # alembic env.py đọc DATABASE_URL_SYNC
+    os.environ["DATABASE_URL_SYNC"] = TEST_DATABASE_URL.replace("+asyncpg", "")
+    command.upgrade(Config(os.path.join(root, "alembic.ini")), "head")
+    return TEST_DATABASE_URL
+
+
+@pytest.fixture
+def pg(pg_schema: str) -> PgHarness:
+    harness = PgHarness(pg_schema)
+    harness.truncate()
+    return harness
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import asyncio
+import uuid
+
+from packages.core.application.identity.dto import RegisterInput
+from packages.core.application.identity.use_cases import RegisterUser
+
+
+class NotFound(Exception):
+    pass
+
+
+class Users:
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    async def search_by_email(self, email):
+        raise NotFound(email)
+
+    async def add(self, user, *, commit, refresh):
+        self.log.append(("users.add", commit))
+        user.id = uuid.uuid4()
+        user.roles = []
+        user.created_at = user.updated_at = None
+        user.last_login_at = None
+        return user
+
+    async def add_role(self, user, code, *, commit):
+        self.log.append(("users.add_role", commit))
+
+
+class Roles:
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    async def ensure(self, code, *, name, commit):
+        self.log.append(("roles.ensure", commit))
+
+
+class Customers:
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    async def ensure_for_user(self, user_id, *, tier, commit):
+        self.log.append(("customers.ensure_for_user", commit))
+
+
+class Hasher:
+    async def hash(self, plain: str) -> str:
+        return "hashed:" + plain
+
+
+class Uow:
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    async def commit(self) -> None:
+        self.log.append(("uow.commit", True))
+
+
+def test_register_stages_everything_then_commits_once():
+    log: list = []
+    uc = RegisterUser(Users(log), Roles(log), Customers(log), Hasher(), Uow(log))
+
+    asyncio.run(uc.execute(RegisterInput(email="a@example.com", password="s3cret-pass", full_name="A")))
+
+    assert log[-1] == ("uow.commit", True)
+    assert [name for name, commit in log[:-1] if commit] == []  # không repo nào tự commit
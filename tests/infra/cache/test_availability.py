@@ -0,0 +1,102 @@
+from __future__ import annotations
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from packages.core.application.inventory.dto import ReserveLine
+from packages.infra.cache.availability import AvailabilityCache
+from packages.infra.repos.core.inventory_repo import InventoryRepo
+
+
+class Inventory:
+    def __init__(self, stock: dict) -> None:
+        self.stock = stock
+        self.calls: list = []
+
+    async def available(self, variant_ids):
+        self.calls.append(list(variant_ids))
+        return {v: self.stock[v] for v in variant_ids if v in self.stock}
+
+
+@pytest.mark.parametrize(
+    "available, band",
+    [(-2, "out_of_stock"), (0, "out_of_stock"), (1, "low"), (5, "low"), (6, "in_stock")],
+)
+def test_stock_bands(available, band):
+    cache = AvailabilityCache(low_stock=5)
+    variant_id = uuid.uuid4()
+
+    found = asyncio.run(cache.get_many(Inventory({variant_id: available}), [variant_id]))
+
+    assert found[variant_id].band == band
+    assert found[variant_id].available == max(available, 0)
+
+
+def test_misses_are_filled_with_one_query_per_call():
+    a, b, c, unknown = (uuid.uuid4() for _ in range(4))
+    inventory = Inventory({a: 1, b: 10, c: 0})
+    cache = AvailabilityCache()
+
+    async def scenario():
+        first = await cache.get_many(inventory, [a, b, a])
+        second = await cache.get_many(inventory, [b, c, a, unknown])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert list(first) == [a, b]
+    assert list(second) == [b, c, a, unknown]
+    assert second[unknown].band == "out_of_stock"
+    assert inventory.calls == [[a, b], [c, unknown]]
+    assert (cache.fills, cache.filled) == (2, 4)
+
+
+_SEED = """
+WITH l AS (
+    INSERT INTO core.inventory_locations (id, code, name) VALUES (gen_random_uuid(), :code, 'WH') RETURNING id
+), p AS (
+    INSERT INTO core.products (id, name, slug, specs, is_published)
+    VALUES (gen_random_uuid(), 'P', :code, '{}'::jsonb, true) RETURNING id
+), v AS (
+    INSERT INTO core.product_variants (id, product_id, sku, attributes, status)
+    SELECT gen_random_uuid(), p.id, :code, '{}'::jsonb, 'active' FROM p RETURNING id
+)
+INSERT INTO core.inventory_levels (variant_id, location_id, on_hand, reserved)
+SELECT v.id, l.id, 10, 0 FROM v, l
+RETURNING variant_id, location_id
+"""
+
+
+async def seed(engine):
+    async with engine.begin() as conn:
+        return tuple((await conn.execute(text(_SEED), {"code": uuid.uuid4().hex})).one())
+
+
+@pytest.mark.parametrize("outcome", ["commit", "rollback"])
+def test_reserve_invalidates_after_commit_and_keeps_fresh_value_after_rollback(pg, outcome):
+    async def scenario(engine):
+        variant_id, location_id = await seed(engine)
+        cache = AvailabilityCache()
+        Session = pg.sessionmaker(engine)
+        async with Session() as writer, Session() as reader:
+            assert (await cache.get_many(InventoryRepo(reader), [variant_id]))[variant_id].available == 10
+
+            await InventoryRepo(writer).reserve([ReserveLine(variant_id=variant_id, location_id=location_id, qty=3)])
+            # xoá ngay khi ghi; request khác nạp lại trước commit vẫn thấy 10
+            assert cache.cache.get(variant_id) is None
+            assert (await cache.get_many(InventoryRepo(reader), [variant_id]))[variant_id].available == 10
+
+            await (writer.commit() if outcome == "commit" else writer.rollback())
+            await reader.rollback()  # kết thúc transaction đọc của reader
+            found = await cache.get_many(InventoryRepo(reader), [variant_id])
+        return found[variant_id].available, cache.fills
+
+    available, fills = pg.run(scenario)
+    if outcome == "commit":
+        # commit xoá lần nữa giá trị cũ nạp trong lúc chờ → nạp lại thấy 7
+        assert (available, fills) == (7, 3)
+    else:
+        # rollback: dữ liệu không đổi, giá trị đã nạp lại (10) vẫn đúng và được giữ
+        assert (available, fills) == (10, 2)
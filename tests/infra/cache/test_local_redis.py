@@ -0,0 +1,66 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from packages.infra.cache.local_redis import LocalRedis, WrongTypeError
+from tests.clock import FakeClock
+
+
+def test_strings_are_bytes_and_expire_with_clock():
+    clock = FakeClock()
+    r = LocalRedis(clock=clock)
+
+    async def scenario():
+        assert await r.set("k", 1.5, ex=10) is True
+        assert await r.get("k") == b"1.5"
+        assert await r.ttl("k") == 10
+        assert await r.set("k", "x", nx=True) is None
+        clock.advance(10)
+        assert await r.get("k") is None
+        assert await r.ttl("k") == -2
+        assert await r.delete("k", "missing") == 0
+
+    asyncio.run(scenario())
+
+
+def test_sorted_set_range_removal_and_empty_key_cleanup():
+    r = LocalRedis(clock=FakeClock())
+
+    async def scenario():
+        assert await r.zadd("z", {"a": 1, "b": 2, "c": 3}) == 3
+        assert await r.zadd("z", {"a": 5}) == 0  # cập nhật score, không thêm
+        assert await r.zrange("z", 0, -1) == [b"b", b"c", b"a"]
+        assert await r.zremrangebyscore("z", "(2", 3) == 1
+        assert await r.zrange("z", 0, -1, withscores=True) == [(b"b", 2.0), (b"a", 5.0)]
+        assert await r.zremrangebyscore("z", "-inf", "+inf") == 2
+        assert await r.expire("z", 5) is False  # set rỗng → key đã bị xoá
+
+    asyncio.run(scenario())
+
+
+def test_pipeline_runs_queued_commands_in_order():
+    r = LocalRedis(clock=FakeClock())
+
+    async def scenario():
+        pipe = r.pipeline()
+        pipe.zadd("z", {"m": 1}).zcard("z")
+        pipe.expire("z", 30)
+        assert await pipe.execute() == [1, 1, True]
+        assert await pipe.execute() == []
+        assert await r.ttl("z") == 30
+
+    asyncio.run(scenario())
+
+
+def test_wrong_type_and_url():
+    r = LocalRedis.from_url("memory://")
+
+    async def scenario():
+        await r.set("s", "v")
+        with pytest.raises(WrongTypeError):
+            await r.zcard("s")
+
+    asyncio.run(scenario())
+    with pytest.raises(ValueError):
+        LocalRedis.from_url("redis://localhost:6379/0")
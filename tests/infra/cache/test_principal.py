@@ -0,0 +1,62 @@
+from __future__ import annotations
+import asyncio
+import uuid
+
+from packages.infra.cache.principal import PrincipalCache
+
+
+class Users:
+    """load_principal trả version hiện tại; `gate` (nếu có) giữ query lại giữa chừng."""
+
+    def __init__(self) -> None:
+        self.version = 1
+        self.loads = 0
+        self.gate: asyncio.Event | None = None
+
+    async def load_principal(self, user_id):
+        self.loads += 1
+        version = self.version  # đọc trước, như SELECT trả snapshot cũ
+        if self.gate is not None:
+            await self.gate.wait()
+        return (user_id, version)
+
+
+def test_hit_skips_query():
+    cache, users, user_id = PrincipalCache(), Users(), uuid.uuid4()
+
+    async def scenario():
+        assert await cache.resolve(users, user_id) == (user_id, 1)
+        assert await cache.resolve(users, user_id) == (user_id, 1)
+
+    asyncio.run(scenario())
+    assert users.loads == 1
+
+
+def test_load_racing_invalidate_is_not_cached():
+    cache, users, user_id = PrincipalCache(), Users(), uuid.uuid4()
+
+    async def scenario():
+        users.gate = asyncio.Event()
+        loading = asyncio.create_task(cache.resolve(users, user_id))
+        await asyncio.sleep(0)
+        # transaction khác ghi + invalidate trong lúc query đang chạy
+        users.version = 2
+        cache.invalidate(user_id)
+        users.gate.set()
+        assert await loading == (user_id, 1)
+
+        users.gate = None
+        assert await cache.resolve(users, user_id) == (user_id, 2)
+        assert await cache.resolve(users, user_id) == (user_id, 2)
+
+    asyncio.run(scenario())
+    assert (users.loads, cache.stale_loads) == (2, 1)
+
+
+def test_generations_are_bounded():
+    cache = PrincipalCache(maxsize=2)
+    ids = [uuid.uuid4() for _ in range(3)]
+    for user_id in ids:
+        cache.invalidate(user_id)
+
+    assert [cache.generation(i) for i in ids] == [0, 1, 1]
@@ -0,0 +1,151 @@
+from __future__ import annotations
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from packages.infra.db.partitions import (
+    PartitionedTable, PartitionManager, next_period, parse_partition_name, partition_name, period_start,
+)
+
+
+@pytest.mark.parametrize(
+    "start, granularity, expected",
+    [
+        (date(2026, 1, 1), "month", date(2026, 2, 1)),
+        (date(2026, 12, 1), "month", date(2027, 1, 1)),
+        (date(2026, 12, 31), "day", date(2027, 1, 1)),
+        (date(2028, 2, 28), "day", date(2028, 2, 29)),
+        (date(2026, 2, 28), "day", date(2026, 3, 1)),
+    ],
+)
+def test_next_period(start, granularity, expected):
+    assert next_period(start, granularity) == expected
+
+
+@pytest.mark.parametrize(
+    "start, granularity, name",
+    [
+        (date(2026, 12, 1), "month", "login_attempts_p202612"),
+        (date(2027, 1, 1), "month", "login_attempts_p202701"),
+        (date(2026, 3, 7), "day", "login_attempts_p20260307"),
+    ],
+)
+def test_partition_name_round_trips(start, granularity, name):
+    assert partition_name("login_attempts", start, granularity) == name
+    assert parse_partition_name("login_attempts", name, granularity) == start
+
+
+@pytest.mark.parametrize(
+    "name, granularity",
+    [
+        ("login_attempts_p20260307", "month"),   # tên theo ngày, bảng theo tháng
+        ("login_attempts_p202603", "day"),
+        ("audit_logs_p202603", "month"),          # bảng khác
+        ("login_attempts_p202603_old", "month"),
+        ("login_attempts_default", "month"),
+    ],
+)
+def test_parse_partition_name_ignores_foreign_names(name, granularity):
+    assert parse_partition_name("login_attempts", name, granularity) is None
+
+
+def test_period_start():
+    ts = datetime(2026, 12, 31, 23, 59, tzinfo=timezone.utc)
+    assert period_start(ts, "month") == date(2026, 12, 1)
+    assert period_start(ts, "day") == date(2026, 12, 31)
+
+
+class FakeConn:
+    def __init__(self, sent: list) -> None:
+        self.sent = sent
+
+    async def execution_options(self, **kwargs):
+        return self
+
+    async def execute(self, stmt, params=None):
+        self.sent.append(str(stmt))
+
+
+class FakeEngine:
+    def __init__(self) -> None:
+        self.sent: list = []
+
+    @asynccontextmanager
+    async def connect(self):
+        yield FakeConn(self.sent)
+
+
+class Manager(PartitionManager):
+    def __init__(self, partitions: list) -> None:
+        super().__init__(FakeEngine(), [])
+        self.partitions = partitions
+
+    async def list_partitions(self, spec):
+        return [(n, parse_partition_name(spec.table, n, spec.granularity)) for n in self.partitions]
+
+
+@pytest.mark.parametrize(
+    "granularity, partitions, now, retention, dropped",
+    [
+        # cutoff = 2026-03-01: tháng 2 kết thúc đúng 03-01 → drop; tháng 3 còn dữ liệu sau cutoff
+        ("month", ["t_p202601", "t_p202602", "t_p202603"], datetime(2026, 3, 31, tzinfo=timezone.utc),
+         timedelta(days=30), ["t_p202601", "t_p202602"]),
+        # cutoff 1 giây trước 03-01: tháng 2 còn một row có thể trong retention
+        ("month", ["t_p202601", "t_p202602"], datetime(2026, 3, 30, 23, 59, 59, tzinfo=timezone.utc),
+         timedelta(days=30), ["t_p202601"]),
+        # ngày: qua mốc năm mới
+        ("day", ["t_p20261230", "t_p20261231", "t_p20270101"], datetime(2027, 1, 2, 12, tzinfo=timezone.utc),
+         timedelta(days=1), ["t_p20261230", "t_p20261231"]),
+    ],
+)
+def test_drop_expired_cutoff(granularity, partitions, now, retention, dropped):
+    manager = Manager(partitions)
+    spec = PartitionedTable("ops", "t", granularity, retention=retention)
+
+    assert asyncio.run(manager.drop_expired(spec, now=now)) == dropped
+    assert [s for s in manager.engine.sent if s.startswith("DROP")] == [
+        f'DROP TABLE IF EXISTS "ops"."{name}"' for name in dropped
+    ]
+
+
+def test_drop_expired_without_retention_keeps_everything():
+    manager = Manager(["t_p200001"])
+
+    assert asyncio.run(manager.drop_expired(PartitionedTable("ops", "t"), now=datetime.now(timezone.utc))) == []
+    assert manager.engine.sent == []
+
+
+def test_maintenance_on_postgres(pg):
+    spec = PartitionedTable("ops", "partition_test", "month", premake=2, retention=timedelta(days=31))
+    now = datetime(2026, 12, 15, tzinfo=timezone.utc)
+
+    async def scenario(engine):
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS ops.partition_test"))
+            await conn.execute(text(
+                "CREATE TABLE ops.partition_test (id int, at timestamptz NOT NULL) PARTITION BY RANGE (at)"
+            ))
+        manager = PartitionManager(engine, [spec])
+        try:
+            created = await manager.ensure_future(spec, now=now)
+            assert await manager.ensure_future(spec, now=now) == []
+            async with engine.begin() as conn:
+                await conn.execute(text(
+                    "INSERT INTO ops.partition_test VALUES (1, '2026-12-31 23:59:59+00'), (2, '2027-01-01 00:00:00+00')"
+                ))
+            # hai tháng sau: tháng 12 kết thúc 01-01 <= cutoff 2027-01-14
+            dropped = await manager.drop_expired(spec, now=now + timedelta(days=61))
+            async with engine.connect() as conn:
+                left = (await conn.execute(text("SELECT id FROM ops.partition_test"))).scalars().all()
+            return created, dropped, left
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP TABLE IF EXISTS ops.partition_test"))
+
+    created, dropped, left = pg.run(scenario)
+    assert created == ["partition_test_p202612", "partition_test_p202701", "partition_test_p202702"]
+    assert dropped == ["partition_test_p202612"]
+    assert left == [2]
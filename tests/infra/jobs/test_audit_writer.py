@@ -0,0 +1,134 @@
+from __future__ import annotations
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import DataError, OperationalError
+
+from packages.infra.db.models.ops.audit_event import AuditLog
+from packages.infra.db.models.ops.login_attempt import LoginAttempt
+from packages.infra.jobs.audit_writer import AuditWriter
+
+ATTEMPTS = LoginAttempt.__table__
+
+
+class FakeConn:
+    def __init__(self, engine: "FakeEngine") -> None:
+        self.engine = engine
+        self.staged: list = []
+
+    async def execute(self, stmt, rows):
+        self.engine.calls += 1
+        if self.engine.delay:
+            await asyncio.sleep(self.engine.delay)
+        if self.engine.down:
+            raise OperationalError("INSERT", {}, ConnectionRefusedError("db down"))
+        for row in rows:
+            if row.get("ip") == "":
+                raise DataError("INSERT", row, ValueError('invalid input for type inet: ""'))
+        self.staged.extend(rows)
+
+
+class FakeEngine:
+    """Đủ cho AuditWriter: begin() → conn.execute(stmt, rows); rollback khi lỗi."""
+
+    def __init__(self, *, down: bool = False, delay: float = 0.0) -> None:
+        self.down = down
+        self.delay = delay
+        self.calls = 0
+        self.committed: list = []
+
+    @asynccontextmanager
+    async def begin(self):
+        conn = FakeConn(self)
+        yield conn
+        self.committed.extend(conn.staged)
+
+
+def attempt(ip: str = "10.0.0.1") -> dict:
+    return {"id": uuid.uuid4(), "email_canon": "a@example.com", "ip": ip, "attempted_at": datetime.now(timezone.utc)}
+
+
+def read_lines(path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def test_poison_row_is_quarantined_and_rest_of_batch_written(tmp_path):
+    spill = tmp_path / "audit.jsonl"
+    engine = FakeEngine()
+    writer = AuditWriter(engine, overflow="spill", spill_path=str(spill))
+    rows = [attempt(), attempt(ip=""), attempt()]
+
+    asyncio.run(writer._flush([(ATTEMPTS, r) for r in rows]))
+
+    assert [r["id"] for r in engine.committed] == [rows[0]["id"], rows[2]["id"]]
+    assert writer.metrics.failed_batches == 1
+    assert writer.metrics.written == 2
+    assert writer.metrics.quarantined == 1
+    assert writer.metrics.spilled == 0
+    assert not spill.exists()
+    (poison,) = read_lines(tmp_path / "audit.jsonl.quarantine")
+    assert poison["row"]["id"] == str(rows[1]["id"])
+
+
+def test_outage_spills_batch_without_quarantine(tmp_path):
+    spill = tmp_path / "audit.jsonl"
+    engine = FakeEngine(down=True)
+    writer = AuditWriter(engine, overflow="spill", spill_path=str(spill))
+
+    asyncio.run(writer._flush([(ATTEMPTS, attempt()), (ATTEMPTS, attempt())]))
+
+    assert engine.calls == 1  # không thử từng row khi DB sập
+    assert writer.metrics.spilled == 2
+    assert writer.metrics.quarantined == 0
+    assert len(read_lines(spill)) == 2
+
+
+def test_stop_timeout_lets_inflight_flush_finish():
+    engine = FakeEngine(delay=0.3)
+    writer = AuditWriter(engine, flush_interval=0.01)
+
+    async def scenario():
+        await writer.start()
+        await writer.enqueue(ATTEMPTS, attempt())
+        await asyncio.sleep(0.05)  # flush đã bắt đầu
+        await writer.stop(timeout=0.05)
+
+    asyncio.run(scenario())
+
+    assert len(engine.committed) == 1
+    assert writer.metrics.written == 1
+    assert writer.metrics.dropped == 0
+
+
+def test_stop_spills_flush_that_never_finishes(tmp_path):
+    spill = tmp_path / "audit.jsonl"
+    engine = FakeEngine(delay=30)
+    writer = AuditWriter(engine, flush_interval=0.01, overflow="spill", spill_path=str(spill))
+
+    async def scenario():
+        await writer.start()
+        await writer.enqueue(ATTEMPTS, attempt())
+        await asyncio.sleep(0.05)
+        await writer.stop(timeout=0.05)
+
+    asyncio.run(scenario())
+
+    assert engine.committed == []
+    assert writer.metrics.spilled == 1
+    assert len(read_lines(spill)) == 1
+
+
+def test_audit_enqueues_audit_log_row():
+    writer = AuditWriter(FakeEngine())
+    user_id = uuid.uuid4()
+
+    assert asyncio.run(writer.audit("auth.login", user_id=user_id, meta={"ip": "10.0.0.1"}))
+
+    table, row = writer.queue.get_nowait()
+    assert table is AuditLog.__table__
+    assert row["event"] == "auth.login"
+    assert row["user_id"] == user_id
+    assert row["meta"] == {"ip": "10.0.0.1"}
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event, text
+
+from packages.infra.jobs.outbox import InMemorySink, OutboxDispatcher
+
+
+def test_backoff_doubles_and_is_capped():
+    dispatcher = OutboxDispatcher(None, InMemorySink(), backoff_base=1.0, backoff_max=10.0)
+
+    assert [dispatcher.backoff(n) for n in range(0, 7)] == [1.0, 1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+async def add_events(engine, n: int) -> list:
+    ids = []
+    async with engine.begin() as conn:
+        for i in range(n):
+            ids.append((await conn.execute(text(
+                "INSERT INTO ops.event_outbox (id, aggregate, aggregate_id, event_type, payload, created_at) "
+                "VALUES (gen_random_uuid(), 'order', gen_random_uuid(), 'order.created', '{}'::jsonb, "
+                "now() + make_interval(secs => :i)) RETURNING id"
+            ), {"i": i})).scalar_one())
+    return ids
+
+
+async def rows(engine) -> dict:
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT id, published, published_at IS NOT NULL AS stamped, attempts, dead_lettered_at IS NOT NULL AS dead, "
+            "extract(epoch FROM available_at - now()) AS wait_s, last_error FROM ops.event_outbox"
+        ))
+        return {r.id: r for r in result}
+
+
+async def make_available(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE ops.event_outbox SET available_at = now() - interval '1 second'"))
+
+
+def test_published_rows_are_marked_with_one_update(pg):
+    updates: list = []
+
+    async def scenario(engine):
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, params, context, executemany):
+            if statement.lstrip().upper().startswith("UPDATE"):
+                updates.append(statement)
+
+        ids = await add_events(engine, 3)
+        sink = InMemorySink()
+        dispatcher = OutboxDispatcher(engine, sink, batch_size=10)
+        assert await dispatcher.run_once() == 3
+        assert await dispatcher.run_once() == 0
+        return ids, sink, dispatcher, await rows(engine)
+
+    ids, sink, dispatcher, state = pg.run(scenario)
+    assert [m.id for m in sink.messages] == ids  # theo created_at
+    assert all(state[i].published and state[i].stamped for i in ids)
+    assert len(updates) == 1
+    assert (dispatcher.metrics.published, dispatcher.metrics.batches) == (3, 1)
+
+
+def test_failed_event_backs_off_and_others_are_published(pg):
+    async def scenario(engine):
+        bad, *good = await add_events(engine, 3)
+        sink = InMemorySink(fail=lambda m: m.id == bad)
+        dispatcher = OutboxDispatcher(engine, sink, backoff_base=60, backoff_max=3600)
+
+        assert await dispatcher.run_once() == 3
+        first = await rows(engine)
+        # chưa tới available_at → không claim lại
+        assert await dispatcher.run_once() == 0
+
+        await make_available(engine)
+        assert await dispatcher.run_once() == 1
+        second = await rows(engine)
+        return bad, good, first, second
+
+    bad, good, first, second = pg.run(scenario)
+    assert all(first[i].published for i in good)
+    assert (first[bad].published, first[bad].attempts, first[bad].dead) == (False, 1, False)
+    assert first[bad].wait_s == pytest.approx(60, abs=5)
+    assert first[bad].last_error.startswith("RuntimeError: sink rejected")
+    assert (second[bad].attempts, second[bad].dead) == (2, False)
+    assert second[bad].wait_s == pytest.approx(120, abs=5)
+
+
+def test_event_is_dead_lettered_after_max_attempts(pg):
+    async def scenario(engine):
+        (event_id,) = await add_events(engine, 1)
+        dispatcher = OutboxDispatcher(engine, InMemorySink(fail=lambda m: True), max_attempts=3)
+        for _ in range(3):
+            await make_available(engine)
+            assert await dispatcher.run_once() == 1
+        await make_available(engine)
+        assert await dispatcher.run_once() == 0  # dead-letter không còn được claim
+        return event_id, dispatcher, await rows(engine)
+
+    event_id, dispatcher, state = pg.run(scenario)
+    assert (state[event_id].attempts, state[event_id].dead, state[event_id].published) == (3, True, False)
+    assert (dispatcher.metrics.failed, dispatcher.metrics.dead_lettered) == (3, 1)
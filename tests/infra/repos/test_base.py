@@ -0,0 +1,41 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+
+from packages.infra.db.models.core.product import Product
+from packages.infra.db.models.core.product_variant import ProductVariant
+from packages.infra.repos.base import SQLAlchemyRepository
+
+
+class NoSession:
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("không được chạy UPDATE khi thiếu filter")
+
+
+@pytest.mark.parametrize("method", ["update_where", "soft_delete_where", "restore_where"])
+def test_bulk_writes_require_filters(method):
+    repo = SQLAlchemyRepository(NoSession(), Product)
+    call = getattr(repo, method)
+    args = ([], {"name": "x"}) if method == "update_where" else ([],)
+
+    with pytest.raises(ValueError, match="requires at least one filter"):
+        asyncio.run(call(*args))
+
+
+def test_conflict_target_resolves_index_constraint_and_columns():
+    repo = SQLAlchemyRepository(NoSession(), ProductVariant)
+
+    by_index = repo._conflict_target("ux_variants_sku_live")
+    assert by_index["index_elements"] == ["sku"]
+    assert by_index["index_where"] is not None
+    assert repo._conflict_target("pk_product_variants") == {"constraint": "pk_product_variants"}
+    assert repo._conflict_target(["sku"]) == {"index_elements": ["sku"]}
+
+
+@pytest.mark.parametrize("conflict", ["sku", "ux_typo", [], ["sku", "nope"]])
+def test_conflict_target_rejects_unknown_names(conflict):
+    repo = SQLAlchemyRepository(NoSession(), ProductVariant)
+
+    with pytest.raises(ValueError):
+        repo._conflict_target(conflict)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+
+from packages.core.application.errors import InsufficientStock
+from packages.core.application.inventory.dto import ReserveLine
+from packages.infra.repos.core.inventory_repo import InventoryRepo
+
+_SEED = """
+WITH p AS (
+    INSERT INTO core.products (id, name, slug, specs, is_published)
+    VALUES (gen_random_uuid(), 'P', :slug, '{}'::jsonb, true)
+    RETURNING id
+), v AS (
+    INSERT INTO core.product_variants (id, product_id, sku, attributes, status)
+    SELECT gen_random_uuid(), p.id, :slug, '{}'::jsonb, 'active' FROM p
+    RETURNING id
+)
+INSERT INTO core.inventory_levels (variant_id, location_id, on_hand, reserved)
+SELECT v.id, :location_id, :stock, 0 FROM v
+RETURNING variant_id
+"""
+
+
+async def seed(engine, *stocks: int):
+    """Một location, mỗi phần tử `stocks` là một variant với on_hand tương ứng."""
+    location_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO core.inventory_locations (id, code, name) VALUES (:id, :code, 'WH')"),
+            {"id": location_id, "code": location_id.hex[:8]},
+        )
+        variants = [
+            (await conn.execute(text(_SEED), {"slug": uuid.uuid4().hex, "location_id": location_id, "stock": n})).scalar_one()
+            for n in stocks
+        ]
+    return location_id, variants
+
+
+async def level(engine, variant_id) -> tuple:
+    async with engine.connect() as conn:
+        row = (await conn.execute(
+            text("SELECT on_hand, reserved FROM core.inventory_levels WHERE variant_id = :v"), {"v": variant_id}
+        )).one()
+    return tuple(row)
+
+
+async def holds(engine) -> list:
+    async with engine.connect() as conn:
+        rows = await conn.execute(text(
+            "SELECT hold_id, variant_id, qty, status FROM core.inventory_reservations ORDER BY created_at, qty"
+        ))
+        return [tuple(r) for r in rows]
+
+
+def test_reserve_is_all_or_nothing_when_one_line_is_short(pg):
+    async def scenario(engine):
+        loc, (a, b) = await seed(engine, 5, 1)
+        async with pg.sessionmaker(engine)() as s:
+            repo = InventoryRepo(s)
+            with pytest.raises(InsufficientStock) as exc:
+                await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=2),
+                                    ReserveLine(variant_id=b, location_id=loc, qty=2)])
+            (short,) = exc.value.shortages
+            assert (short.variant_id, short.requested, short.available) == (b, 2, 1)
+            # Savepoint đã rollback; transaction ngoài vẫn dùng được
+            await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=2)])
+            await s.commit()
+        assert await level(engine, a) == (5, 2)
+        assert await level(engine, b) == (1, 0)
+        assert [(v, q) for _, v, q, _ in await holds(engine)] == [(a, 2)]
+
+    pg.run(scenario)
+
+
+def test_reserve_merges_duplicate_lines(pg):
+    async def scenario(engine):
+        loc, (a,) = await seed(engine, 4)
+        async with pg.sessionmaker(engine)() as s:
+            repo = InventoryRepo(s)
+            # 2 + 3 > 4: không gộp thì UPDATE ... FROM chỉ áp một dòng và giữ "thành công"
+            with pytest.raises(InsufficientStock) as exc:
+                await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=2),
+                                    ReserveLine(variant_id=a, location_id=loc, qty=3)])
+            assert exc.value.shortages[0].requested == 5
+            hold = await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=1),
+                                       ReserveLine(variant_id=a, location_id=loc, qty=3)])
+            await s.commit()
+        assert [(l.variant_id, l.qty) for l in hold.lines] == [(a, 4)]
+        assert await level(engine, a) == (4, 4)
+        assert [(v, q, st) for _, v, q, st in await holds(engine)] == [(a, 4, "active")]
+
+    pg.run(scenario)
+
+
+def test_release_and_commit_are_idempotent_and_exclusive(pg):
+    async def scenario(engine):
+        loc, (a,) = await seed(engine, 10)
+        line = ReserveLine(variant_id=a, location_id=loc, qty=3)
+        async with pg.sessionmaker(engine)() as s:
+            repo = InventoryRepo(s)
+            released = await repo.reserve([line])
+            committed = await repo.reserve([line])
+            await s.commit()
+            assert await level(engine, a) == (10, 6)
+
+            assert await repo.release(released.hold_id) == 3
+            assert await repo.release(released.hold_id) == 0
+            assert await repo.commit(released.hold_id) == 0
+            await s.commit()
+            assert await level(engine, a) == (10, 3)
+
+            assert await repo.commit(committed.hold_id) == 3
+            assert await repo.commit(committed.hold_id) == 0
+            assert await repo.release(committed.hold_id) == 0
+            await s.commit()
+        assert await level(engine, a) == (7, 0)
+        status = {h: st for h, _, _, st in await holds(engine)}
+        assert status == {released.hold_id: "released", committed.hold_id: "committed"}
+
+    pg.run(scenario)
+
+
+def test_committed_hold_cannot_expire(pg):
+    async def scenario(engine):
+        loc, (a,) = await seed(engine, 10)
+        async with pg.sessionmaker(engine)() as s:
+            repo = InventoryRepo(s)
+            paid = await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=2)], ttl=timedelta(seconds=-1))
+            stale = await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=3)], ttl=timedelta(seconds=-1))
+            await s.commit()
+            assert await repo.commit(paid.hold_id) == 2
+            await s.commit()
+
+            assert await repo.expire() == 3
+            assert await repo.expire() == 0
+            await s.commit()
+            # Hold đã hết hạn thì không commit được nữa
+            assert await repo.commit(stale.hold_id) == 0
+        assert await level(engine, a) == (8, 0)
+        status = {h: st for h, _, _, st in await holds(engine)}
+        assert status == {paid.hold_id: "committed", stale.hold_id: "expired"}
+
+    pg.run(scenario)
+
+
+def test_expire_works_in_batches_and_skips_locked_holds(pg):
+    async def scenario(engine):
+        loc, (a, b) = await seed(engine, 10, 10)
+        Session = pg.sessionmaker(engine)
+        async with Session() as s:
+            repo = InventoryRepo(s)
+            busy = await repo.reserve([ReserveLine(variant_id=b, location_id=loc, qty=1)], ttl=timedelta(seconds=-1))
+            for qty in (1, 2, 3):
+                await repo.reserve([ReserveLine(variant_id=a, location_id=loc, qty=qty)], ttl=timedelta(seconds=-1))
+            await s.commit()
+
+        async with Session() as holder, Session() as worker:
+            # Giả lập release đang chạy: dòng hold của `busy` đang bị khoá
+            await holder.execute(
+                text("SELECT 1 FROM core.inventory_reservations WHERE hold_id = :h FOR UPDATE"), {"h": busy.hold_id}
+            )
+            repo = InventoryRepo(worker)
+            first = await asyncio.wait_for(repo.expire(batch_size=2), timeout=5)  # không chờ khoá
+            await worker.commit()
+            second = await asyncio.wait_for(repo.expire(batch_size=2), timeout=5)
+            await worker.commit()
+            assert await repo.expire(batch_size=2) == 0
+            await holder.commit()
+        # Batch theo expires_at: 2 dòng rồi 1 dòng, hold đang bị khoá bị bỏ qua
+        assert first + second == 6
+        assert await level(engine, a) == (10, 0)
+        assert await level(engine, b) == (10, 1)
+
+        async with Session() as s:
+            assert await InventoryRepo(s).expire(batch_size=2) == 1
+            await s.commit()
+        assert await level(engine, b) == (10, 0)
+
+    pg.run(scenario)
+
+
+def test_concurrent_reserves_never_oversell(pg):
+    async def scenario(engine):
+        loc, (a,) = await seed(engine, 3)
+        Session = pg.sessionmaker(engine)
+
+        async def checkout() -> bool:
+            async with Session() as s:
+                try:
+                    await InventoryRepo(s).reserve([ReserveLine(variant_id=a, location_id=loc, qty=1)])
+                except InsufficientStock:
+                    return False
+                await s.commit()
+                return True
+
+        results = await asyncio.gather(*(checkout() for _ in range(6)))
+        assert sorted(results) == [False] * 3 + [True] * 3
+        assert await level(engine, a) == (3, 3)
+
+    pg.run(scenario)
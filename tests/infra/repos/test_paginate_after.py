@@ -0,0 +1,95 @@
+from __future__ import annotations
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from packages.infra.db.models.core.brand import Brand
+from packages.infra.repos.base import SQLAlchemyRepository
+from packages.infra.repos.cursor import encode_cursor
+from packages.infra.repos.exceptions import InvalidCursor
+from packages.infra.repos.totals import ExactTotal
+
+NAMES = ["a", "b", "b", "b", "b", "c"]
+
+
+async def seed(engine) -> list:
+    """Brand có tên trùng (tie trên sort key) + một brand đã soft delete. Trả (name, id) của row live."""
+    rows = [(name, uuid.uuid4()) for name in NAMES]
+    async with engine.begin() as conn:
+        for name, id_ in rows:
+            await conn.execute(
+                text("INSERT INTO core.brands (id, name, slug) VALUES (:id, :name, :slug)"),
+                {"id": id_, "name": name, "slug": id_.hex},
+            )
+        await conn.execute(
+            text("INSERT INTO core.brands (id, name, slug, deleted_at) VALUES (:id, 'b', :slug, now())"),
+            {"id": uuid.uuid4(), "slug": uuid.uuid4().hex},
+        )
+    return rows
+
+
+async def walk(repo, *, size: int, descending: bool) -> list:
+    pages, cursor = [], None
+    while True:
+        page = await repo.paginate_after(cursor, size=size, order_by=[Brand.name], descending=descending)
+        pages.append([(b.name, b.id) for b in page.items])
+        if not page.has_more:
+            return pages
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("size", [1, 2, 3, 4])
+def test_walks_every_row_once_across_ties(pg, size, descending):
+    async def scenario(engine):
+        rows = await seed(engine)
+        async with pg.sessionmaker(engine)() as s:
+            pages = await walk(SQLAlchemyRepository(s, Brand), size=size, descending=descending)
+        # id phá tie giữa các brand cùng tên, không row nào bị lặp hay bỏ sót ở biên trang
+        assert [r for page in pages for r in page] == sorted(rows, reverse=descending)
+        assert all(len(page) == size for page in pages[:-1])
+        # trang cuối: không có cursor; số row chia hết cho size thì không có trang rỗng phía sau
+        assert 1 <= len(pages[-1]) <= size
+        assert len(pages) == -(-len(rows) // size)
+
+    pg.run(scenario)
+
+
+def test_total_strategy_counts_live_rows(pg):
+    async def scenario(engine):
+        rows = await seed(engine)
+        async with pg.sessionmaker(engine)() as s:
+            repo = SQLAlchemyRepository(s, Brand)
+            page = await repo.paginate_after(size=2, order_by=[Brand.name], total_strategy=ExactTotal())
+            assert (page.total, page.total_is_estimate) == (len(rows), False)
+            assert (await repo.paginate_after(size=2, order_by=[Brand.name])).total is None
+
+    pg.run(scenario)
+
+
+class NoSession:
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("cursor sai phải bị từ chối trước khi query")
+
+
+def first_cursor(order: str) -> str:
+    return encode_cursor([order, "b", uuid.uuid4()])
+
+
+@pytest.mark.parametrize(
+    "cursor, kwargs",
+    [
+        (first_cursor("name,id:asc"), {"order_by": [Brand.name], "descending": True}),
+        (first_cursor("name,id:asc"), {"order_by": [Brand.slug]}),
+        (first_cursor("slug,id:asc"), {"order_by": [Brand.name]}),
+        (encode_cursor(["b", uuid.uuid4()]), {"order_by": [Brand.name]}),
+        ("not-a-cursor", {"order_by": [Brand.name]}),
+    ],
+)
+def test_rejects_cursor_from_another_sort_order(cursor, kwargs):
+    repo = SQLAlchemyRepository(NoSession(), Brand)
+
+    with pytest.raises(InvalidCursor):
+        asyncio.run(repo.paginate_after(cursor, **kwargs))
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+
+from packages.infra.db.models.ops.refresh_token import RefreshToken
+from packages.infra.repos.core.refresh_token_repo import RefreshTokenRepo
+
+
+async def seed(session, *, expires_in: timedelta = timedelta(days=1)) -> dict:
+    """Một user + auth_session + refresh token còn sống; trả về các id."""
+    ids = {"user": uuid.uuid4(), "session": uuid.uuid4(), "jti": uuid.uuid4(), "family": uuid.uuid4()}
+    await session.execute(
+        text("INSERT INTO core.users (id, email, password_hash, is_active, failed_login_count, mfa_enabled) "
+             "VALUES (:id, :email, 'x', true, 0, false)"),
+        {"id": ids["user"], "email": f"{ids['user']}@example.com"},
+    )
+    await session.execute(
+        text("INSERT INTO ops.auth_sessions (id, user_id, last_seen_at) VALUES (:id, :user, now())"),
+        {"id": ids["session"], "user": ids["user"]},
+    )
+    await RefreshTokenRepo(session).add(
+        user_id=ids["user"], session_id=ids["session"], jti=ids["jti"], family_id=ids["family"],
+        token_hash="hash-0", expires_at=datetime.now(timezone.utc) + expires_in,
+    )
+    await session.commit()
+    return ids
+
+
+async def tokens_of(session, family_id) -> list:
+    res = await session.execute(
+        select(RefreshToken).where(RefreshToken.family_id == family_id).order_by(RefreshToken.issued_at)
+    )
+    return list(res.scalars())
+
+
+def test_rotate_revokes_old_and_issues_successor_in_same_family(pg):
+    async def scenario(engine):
+        Session = pg.sessionmaker(engine)
+        async with Session() as s:
+            ids = await seed(s)
+            row = await RefreshTokenRepo(s).find_for_rotation(ids["jti"], "hash-0")
+            assert (row.user_id, row.session_id, row.family_id, row.revoked_at) == (
+                ids["user"], ids["session"], ids["family"], None,
+            )
+            assert await RefreshTokenRepo(s).find_for_rotation(ids["jti"], "wrong-hash") is None
+
+            new_jti = uuid.uuid4()
+            assert await RefreshTokenRepo(s).rotate(
+                ids["jti"], new_jti=new_jti, token_hash="hash-1",
+                expires_at=datetime.now(timezone.utc) + timedelta(days=1), ip="10.0.0.1", user_agent="ua",
+            )
+            await s.commit()
+
+        async with Session() as s:
+            old, new = sorted(await tokens_of(s, ids["family"]), key=lambda t: t.id != ids["jti"])
+            assert old.revoked_at is not None and old.replaced_by == new_jti
+            assert (new.id, new.jti, new.session_id, new.user_id) == (new_jti, new_jti, ids["session"], ids["user"])
+            assert new.revoked_at is None and new.token_hash == "hash-1" and str(new.ip) == "10.0.0.1"
+
+    pg.run(scenario)
+
+
+def test_rotate_refuses_revoked_or_expired_token(pg):
+    async def scenario(engine):
+        Session = pg.sessionmaker(engine)
+        async with Session() as s:
+            live = await seed(s)
+            expired = await seed(s, expires_in=timedelta(seconds=-1))
+            await RefreshTokenRepo(s).revoke(live["jti"], commit=True)
+
+            for ids in (live, expired):
+                assert not await RefreshTokenRepo(s).rotate(
+                    ids["jti"], new_jti=uuid.uuid4(), token_hash="h",
+                    expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+                )
+            await s.commit()
+            assert len(await tokens_of(s, live["family"])) == 1
+            assert len(await tokens_of(s, expired["family"])) == 1
+
+    pg.run(scenario)
+
+
+def test_concurrent_rotations_have_exactly_one_winner(pg):
+    async def scenario(engine):
+        Session = pg.sessionmaker(engine)
+        async with Session() as s:
+            ids = await seed(s)
+
+        async def rotate(delay: float) -> bool:
+            async with Session() as s:
+                ok = await RefreshTokenRepo(s).rotate(
+                    ids["jti"], new_jti=uuid.uuid4(), token_hash="h",
+                    expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+                )
+                await asyncio.sleep(delay)  # giữ row lock để request kia phải chờ
+                await s.commit()
+                return ok
+
+        results = await asyncio.gather(rotate(0.2), rotate(0.0), rotate(0.0))
+        assert sorted(results) == [False, False, True]
+
+        async with Session() as s:
+            family = await tokens_of(s, ids["family"])
+            assert len(family) == 2
+            assert sum(t.revoked_at is None for t in family) == 1
+
+    pg.run(scenario)
+
+
+def test_revoke_family_revokes_only_live_tokens_of_that_family(pg):
+    async def scenario(engine):
+        Session = pg.sessionmaker(engine)
+        async with Session() as s:
+            ids = await seed(s)
+            other = await seed(s)
+            await RefreshTokenRepo(s).rotate(
+                ids["jti"], new_jti=uuid.uuid4(), token_hash="h",
+                expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+            )
+            assert await RefreshTokenRepo(s).revoke_family(ids["family"]) == 1
+            await s.commit()
+            assert all(t.revoked_at is not None for t in await tokens_of(s, ids["family"]))
+            assert (await tokens_of(s, other["family"]))[0].revoked_at is None
+
+    pg.run(scenario)
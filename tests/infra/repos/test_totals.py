@@ -0,0 +1,130 @@
+from __future__ import annotations
+import asyncio
+import uuid
+from typing import ClassVar
+
+from sqlalchemy import column, select, table
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+
+from packages.infra.db.models.core.brand import Brand
+from packages.infra.repos.base import SQLAlchemyRepository
+from packages.infra.repos.totals import CachedTotal, EstimatedTotal, TotalStrategy
+from packages.infra.repos.types import PageParams
+from tests.clock import FakeClock
+
+USERS = table("users", column("id"), column("email"), schema="core")
+
+
+class FakeResult:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def scalar_one(self):
+        return self.value
+
+
+class FakeConn:
+    dialect = PGDialect_asyncpg()
+
+    def __init__(self, plan_rows: int) -> None:
+        self.plan_rows = plan_rows
+        self.sent: list = []
+
+    async def exec_driver_sql(self, sql, parameters=None):
+        self.sent.append((sql, parameters))
+        return FakeResult([{"Plan": {"Plan Rows": self.plan_rows}}])
+
+
+class FakeSession:
+    def __init__(self, conn: FakeConn) -> None:
+        self.conn = conn
+
+    async def connection(self):
+        return self.conn
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("EXPLAIN phải đi qua exec_driver_sql")
+
+
+def test_explain_sends_literal_sql_verbatim():
+    conn = FakeConn(plan_rows=5000)
+    stmt = select(USERS).where(USERS.c.email.like("%:name%"))
+
+    total, estimated = asyncio.run(EstimatedTotal(exact_below=1000).total(FakeSession(conn), stmt))
+
+    assert (total, estimated) == (5000, True)
+    ((sql, params),) = conn.sent
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "LIKE '%:name%'" in sql  # không bị nhân đôi '%', ':name' không thành bind
+    assert params is None
+
+
+class CountingTotal(TotalStrategy):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def total(self, session, stmt):
+        self.calls += 1
+        return self.calls, False
+
+
+def test_cached_total_expires_after_ttl():
+    clock = FakeClock()
+    inner = CountingTotal()
+    cached = CachedTotal(inner, ttl=30, clock=clock)
+    stmt = select(USERS).where(USERS.c.email == "a@example.com")
+
+    async def total():
+        return await cached.total(None, stmt)
+
+    assert asyncio.run(total()) == (1, False)
+    clock.advance(29)
+    assert asyncio.run(total()) == (1, False)
+    # filter khác → fingerprint khác → entry riêng
+    assert asyncio.run(cached.total(None, select(USERS))) == (2, False)
+    clock.advance(1)
+    assert asyncio.run(total()) == (3, False)
+    assert inner.calls == 3
+
+
+class CachedBrandRepo(SQLAlchemyRepository[Brand]):
+    total_strategy: ClassVar[TotalStrategy] = CachedTotal(ttl=3600)
+
+
+def new_brand() -> Brand:
+    slug = uuid.uuid4().hex
+    return Brand(name=slug, slug=slug)
+
+
+def test_repo_writes_invalidate_cached_total(pg):
+    async def scenario(engine):
+        Session = pg.sessionmaker(engine)
+        CachedBrandRepo.total_strategy.invalidate()
+        async with Session() as s:
+            repo = CachedBrandRepo(s, Brand)
+            assert (await repo.paginate(PageParams(size=10))).total == 0
+
+            await repo.add(new_brand(), commit=True)
+            assert (await repo.paginate(PageParams(size=10))).total == 1
+
+            await repo.bulk_insert([{"name": "b", "slug": "b"}, {"name": "c", "slug": "c"}], commit=True)
+            assert (await repo.paginate(PageParams(size=10))).total == 3
+
+            await repo.soft_delete_where([Brand.slug == "b"], commit=True)
+            assert (await repo.paginate(PageParams(size=10))).total == 2
+
+    pg.run(scenario)
+
+
+def test_total_cached_before_commit_is_dropped_after_commit(pg):
+    async def scenario(engine):
+        Session = pg.sessionmaker(engine)
+        CachedBrandRepo.total_strategy.invalidate()
+        async with Session() as writer, Session() as reader:
+            await CachedBrandRepo(writer, Brand).add(new_brand())
+            # request khác đếm trong lúc transaction ghi chưa commit → cache giá trị cũ
+            assert (await CachedBrandRepo(reader, Brand).paginate(PageParams(size=10))).total == 0
+            await writer.commit()
+            assert (await CachedBrandRepo(reader, Brand).paginate(PageParams(size=10))).total == 1
+
+    pg.run(scenario)
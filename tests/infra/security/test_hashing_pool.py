@@ -0,0 +1,78 @@
+from __future__ import annotations
+import asyncio
+import threading
+
+import pytest
+
+from packages.infra.security.hashing_pool import HashingExecutor, HashingPoolSaturated
+from packages.infra.security.passwords import Argon2PasswordHasher
+
+
+def test_cancelled_caller_keeps_job_counted_until_it_finishes():
+    pool = HashingExecutor(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.create_task(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)  # job đã chạy trên worker
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Worker vẫn bận → admission control vẫn phải thấy 1 job
+        assert pool.metrics.in_flight == 1
+        with pytest.raises(HashingPoolSaturated):
+            await pool.run(sum, [1, 2])
+        release.set()
+        for _ in range(100):
+            if pool.metrics.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.metrics.in_flight == 0
+        assert await pool.run(sum, [1, 2]) == 3
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+    assert pool.metrics.rejected == 1
+    assert pool.metrics.completed == 2
+
+
+def test_cancelled_queued_job_is_released():
+    pool = HashingExecutor(workers=1, max_pending=4)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(pool.run(release.wait, 5))
+        queued = asyncio.create_task(pool.run(sum, [1]))
+        await asyncio.sleep(0.05)
+        queued.cancel()  # còn chờ trong pool → bị huỷ thật, slot trả ngay
+        await asyncio.gather(queued, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert pool.metrics.in_flight == 1
+        release.set()
+        await running
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+    assert pool.metrics.in_flight == 0
+
+
+def test_argon2_hasher_runs_on_process_pool():
+    pool = HashingExecutor(workers=1, kind="process")
+    hasher = Argon2PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1, executor=pool)
+
+    async def scenario():
+        hashed = await hasher.hash("s3cret")
+        assert hashed.startswith("$argon2id$v=19$m=1024,t=1,p=1$")
+        assert await hasher.verify("s3cret", hashed) is True
+        assert await hasher.verify("wrong", hashed) is False
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool._executor.shutdown(wait=True)
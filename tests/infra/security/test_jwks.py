@@ -0,0 +1,97 @@
+from __future__ import annotations
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from packages.infra.security.jwks import KeyRing
+
+DELAY = timedelta(minutes=10)
+GRACE = timedelta(days=1)
+
+
+def ring(keys_dir) -> KeyRing:
+    return KeyRing.load("EdDSA", grace=GRACE, keys_dir=str(keys_dir), publish_delay=DELAY)
+
+
+def sidecar(keys_dir, kid: str) -> dict:
+    return json.loads((keys_dir / f"{kid}.json").read_text())
+
+
+def test_rotation_publishes_new_key_and_signs_with_it_after_delay(tmp_path):
+    a = ring(tmp_path)
+    first = a.signing_key()
+    now = datetime.now(timezone.utc)
+
+    new = a.rotate(now)
+
+    assert new is not None and new.activate_at == now + DELAY
+    assert {k["kid"] for k in a.jwks()["keys"]} == {first.kid, new.kid}
+    assert a.signing_key(now).kid == first.kid
+    assert a.signing_key(now + DELAY - timedelta(seconds=1)).kid == first.kid
+    assert a.signing_key(now + DELAY).kid == new.kid
+    assert sidecar(tmp_path, new.kid)["activate_at"] == (now + DELAY).isoformat()
+
+
+def test_other_worker_reads_schedule_from_sidecar_not_mtime(tmp_path):
+    a = ring(tmp_path)
+    first = a.signing_key()
+    now = datetime.now(timezone.utc)
+    new = a.rotate(now)
+    # mtime vô nghĩa (vd. copy / restore backup): mốc thời gian vẫn lấy từ sidecar
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (0, 0))
+
+    b = ring(tmp_path)
+
+    assert b.get(new.kid).created_at == new.created_at
+    assert b.get(new.kid).activate_at == now + DELAY
+    assert b.get(first.kid).retire_at == now + DELAY + GRACE
+    assert b.signing_key(now).kid == first.kid
+    assert b.signing_key(now + DELAY).kid == new.kid
+
+
+def test_replaced_key_is_retired_after_grace_and_files_removed(tmp_path):
+    a = ring(tmp_path)
+    first = a.signing_key()
+    now = datetime.now(timezone.utc)
+    new = a.rotate(now)
+    retire_at = now + DELAY + GRACE
+    assert sidecar(tmp_path, first.kid)["retire_at"] == retire_at.isoformat()
+
+    a.reload(now + DELAY)
+    assert a.get(first.kid).retire_at == retire_at  # vẫn verify được trong grace
+
+    a.reload(retire_at)
+    assert a.get(first.kid) is None
+    assert [k["kid"] for k in a.jwks()["keys"]] == [new.kid]
+    assert not (tmp_path / f"{first.kid}.pem").exists()
+    assert not (tmp_path / f"{first.kid}.json").exists()
+
+
+def test_only_lock_holder_rotates(tmp_path):
+    a = ring(tmp_path)
+    lock = tmp_path / KeyRing.LOCK_NAME
+    lock.touch()
+
+    assert a.rotate() is None
+    assert a.maybe_rotate(timedelta(0)) is False
+    assert len(list(tmp_path.glob("*.pem"))) == 1
+
+    # Khoá của worker đã chết (quá lock_stale) bị gỡ
+    stale = (datetime.now(timezone.utc) - a.lock_stale - timedelta(seconds=1)).timestamp()
+    os.utime(lock, (stale, stale))
+    assert a.rotate() is not None
+    assert len(list(tmp_path.glob("*.pem"))) == 2
+    assert not lock.exists()
+
+
+def test_legacy_pem_without_sidecar_uses_mtime(tmp_path):
+    a = ring(tmp_path)
+    first = a.signing_key()
+    (tmp_path / f"{first.kid}.json").unlink()
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    os.utime(tmp_path / f"{first.kid}.pem", (created.timestamp(), created.timestamp()))
+
+    key = ring(tmp_path).get(first.kid)
+
+    assert (key.created_at, key.activate_at, key.retire_at) == (created, created + DELAY, None)
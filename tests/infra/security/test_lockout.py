@@ -0,0 +1,254 @@
+from __future__ import annotations
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from packages.infra.cache.local_redis import LocalRedis
+from packages.infra.repos.core.login_attemp_repo import LoginAttemptRepo
+from packages.infra.security.lockout import (
+    InMemoryLockoutBackend, LoginLockout, QueuedAttemptAudit, RedisLockoutBackend, SqlLockoutBackend, _to_dt,
+)
+from tests.clock import FakeClock
+
+WINDOW = timedelta(minutes=15)
+LOCKOUT = timedelta(minutes=10)
+
+
+async def fail(backend, times: int, *, email: str = "a@example.com", ip: str = "10.0.0.1", every: float = 0.0,
+               clock: FakeClock = None) -> None:
+    for _ in range(times):
+        await backend.record(email, ip, False)
+        if every:
+            clock.advance(every)
+
+
+# ---------- InMemoryLockoutBackend ----------
+
+def memory(clock: FakeClock, **kwargs) -> InMemoryLockoutBackend:
+    return InMemoryLockoutBackend(max_attempts=3, window=WINDOW, lockout=LOCKOUT, clock=clock, **kwargs)
+
+
+def test_memory_locks_after_max_failures_in_window_then_unlocks():
+    clock = FakeClock()
+    backend = memory(clock)
+
+    async def scenario():
+        await fail(backend, 2)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+        await fail(backend, 1)
+        assert await backend.is_locked("A@example.com", "10.0.0.1") == _to_dt(clock.now + LOCKOUT.total_seconds())
+        assert await backend.is_locked("a@example.com", "10.0.0.2") is None  # key gồm cả ip
+        clock.advance(LOCKOUT.total_seconds())
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+
+    asyncio.run(scenario())
+
+
+def test_memory_failures_older_than_window_do_not_count():
+    clock = FakeClock()
+    backend = memory(clock)
+    spacing = WINDOW.total_seconds() / 2 + 1
+
+    async def scenario():
+        # 3 lần thất bại nhưng lần đầu đã rơi khỏi cửa sổ khi lần thứ 3 tới
+        await fail(backend, 3, every=spacing, clock=clock)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+        assert len(backend._failures["a@example.com|10.0.0.1"]) == 3  # deque maxlen = max_attempts
+        await fail(backend, 2)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is not None
+
+    asyncio.run(scenario())
+
+
+def test_memory_success_clears_key():
+    backend = memory(FakeClock())
+
+    async def scenario():
+        await fail(backend, 3)
+        await backend.record("a@example.com", "10.0.0.1", True)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+        assert backend._failures == {}
+
+    asyncio.run(scenario())
+
+
+def test_memory_evicts_least_recently_failed_key():
+    backend = memory(FakeClock(), max_keys=2)
+
+    async def scenario():
+        await fail(backend, 3, email="old@example.com")
+        await fail(backend, 1, email="mid@example.com")
+        await fail(backend, 1, email="old@example.com")  # old thành mới dùng nhất
+        await fail(backend, 1, email="new@example.com")
+        assert list(backend._failures) == ["old@example.com|10.0.0.1", "new@example.com|10.0.0.1"]
+        await fail(backend, 1, email="newest@example.com")
+        assert "old@example.com|10.0.0.1" not in backend._failures
+        assert await backend.is_locked("old@example.com", "10.0.0.1") is None  # lock bị evict cùng key
+
+    asyncio.run(scenario())
+
+
+# ---------- RedisLockoutBackend trên LocalRedis ----------
+
+def redis(clock: FakeClock) -> RedisLockoutBackend:
+    return RedisLockoutBackend(LocalRedis(clock=clock), max_attempts=3, window=WINDOW, lockout=LOCKOUT, clock=clock)
+
+
+def test_redis_sorted_set_window_locks_and_sets_ttls():
+    clock = FakeClock()
+    backend = redis(clock)
+    client = backend.client
+    hits = "lockout:hits:a@example.com|10.0.0.1"
+    lock = "lockout:lock:a@example.com|10.0.0.1"
+
+    async def scenario():
+        await fail(backend, 2)
+        assert await client.zcard(hits) == 2
+        assert await client.ttl(hits) == int(WINDOW.total_seconds()) + 1
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+        await fail(backend, 1)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") == _to_dt(clock.now + LOCKOUT.total_seconds())
+        assert await client.ttl(lock) == int(LOCKOUT.total_seconds()) + 1
+        clock.advance(LOCKOUT.total_seconds())
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+
+    asyncio.run(scenario())
+
+
+def test_redis_trims_hits_outside_window():
+    clock = FakeClock()
+    backend = redis(clock)
+    hits = "lockout:hits:a@example.com|10.0.0.1"
+    spacing = WINDOW.total_seconds() / 2 + 1
+
+    async def scenario():
+        await fail(backend, 3, every=spacing, clock=clock)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+        # lần đầu đã bị zremrangebyscore bỏ khỏi set
+        assert await backend.client.zcard(hits) == 2
+
+    asyncio.run(scenario())
+
+
+def test_redis_success_deletes_hits_and_lock():
+    clock = FakeClock()
+    backend = redis(clock)
+
+    async def scenario():
+        await fail(backend, 3)
+        await backend.record("a@example.com", "10.0.0.1", True)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is None
+        assert await backend.client.zcard("lockout:hits:a@example.com|10.0.0.1") == 0
+
+    asyncio.run(scenario())
+
+
+def test_redis_memory_url_uses_local_redis():
+    backend = RedisLockoutBackend.from_url("memory://", max_attempts=2)
+    assert isinstance(backend.client, LocalRedis)
+
+    async def scenario():
+        await fail(backend, 2)
+        assert await backend.is_locked("a@example.com", "10.0.0.1") is not None
+
+    asyncio.run(scenario())
+
+
+# ---------- SqlLockoutBackend / LoginAttemptRepo (COUNT trong cửa sổ) ----------
+
+class CountResult:
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    def scalar(self) -> int:
+        return self.count
+
+
+class CountSession:
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return CountResult(self.count)
+
+
+def compiled(stmt):
+    return stmt.compile(dialect=postgresql.dialect())
+
+
+def test_sql_count_window_query():
+    session = CountSession(count=0)
+    repo = LoginAttemptRepo(session, max_attempts=3, window=WINDOW, lockout=LOCKOUT)
+
+    assert asyncio.run(SqlLockoutBackend(repo).is_locked("A@Example.com", "10.0.0.1")) is None
+
+    (stmt,) = session.statements
+    sql = str(compiled(stmt))
+    assert sql.startswith("SELECT count(*) AS count_1 \nFROM ops.login_attempts")
+    assert "ops.login_attempts.email_canon = %(email_canon_1)s" in sql
+    assert "ops.login_attempts.attempted_at >= %(attempted_at_1)s" in sql
+    assert "ops.login_attempts.ip = %(ip)s" in sql
+    params = compiled(stmt).params
+    assert params["email_canon_1"] == "a@example.com"
+    assert params["ip"] == "10.0.0.1"
+
+
+def test_sql_count_window_skips_empty_ip_and_locks_at_threshold():
+    session = CountSession(count=3)
+    repo = LoginAttemptRepo(session, max_attempts=3, window=WINDOW, lockout=LOCKOUT)
+
+    locked_until = asyncio.run(repo.is_locked("a@example.com", ""))
+
+    assert locked_until is not None
+    assert "login_attempts.ip" not in str(compiled(session.statements[0]))
+
+
+def test_login_lockout_records_backend_and_audit():
+    class Audit:
+        def __init__(self) -> None:
+            self.rows: list = []
+
+        async def add(self, **kwargs) -> None:
+            self.rows.append(kwargs)
+
+    audit = Audit()
+    lockout = LoginLockout(memory(FakeClock()), audit=audit)
+
+    async def scenario():
+        for _ in range(3):
+            await lockout.add(email="a@example.com", ip="10.0.0.1", success=False)
+        assert await lockout.is_locked("a@example.com", "10.0.0.1") is not None
+
+    asyncio.run(scenario())
+    assert len(audit.rows) == 3 and audit.rows[0]["success"] is False
+
+
+def test_queued_audit_stores_missing_ip_as_null():
+    class Writer:
+        def __init__(self) -> None:
+            self.rows: list = []
+
+        async def enqueue(self, table, row) -> None:
+            self.rows.append(row)
+
+    writer = Writer()
+    audit = QueuedAttemptAudit(writer)
+
+    asyncio.run(audit.add(email="a@example.com", ip="", success=False))
+    asyncio.run(audit.add(email="a@example.com", ip="10.0.0.1", success=False))
+
+    assert [r["ip"] for r in writer.rows] == [None, "10.0.0.1"]
+
+
+def test_attempt_without_ip_is_persisted(pg):
+    async def scenario(engine):
+        async with pg.sessionmaker(engine)() as s:
+            await LoginAttemptRepo(s).add(email="a@example.com", ip="", success=False, commit=True)
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT ip FROM ops.login_attempts"))).scalars().all()
+
+    assert pg.run(scenario) == [None]
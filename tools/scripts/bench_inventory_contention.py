@@ -0,0 +1,184 @@
+"""
+Benchmark tranh chấp tồn kho: nhiều checkout đồng thời cùng giữ một SKU nóng (InventoryRepo).
+
+Mỗi checkout: reserve(qty) → commit transaction → commit hold (xuất kho) → commit transaction.
+Cuối cùng kiểm tra không oversell: số đơn thành công * qty == tồn ban đầu - on_hand, reserved == 0.
+
+Refresh core.product_cards (in_stock) cũng được đo:
+- `--cards deferred` (mặc định, như InventoryRepo): ProductCardRefresher chạy song song, refresh sau commit;
+- `--cards inline`: thêm touch_products vào mỗi checkout → UPSERT card trong transaction checkout
+  (cách cũ, để so sánh mức xếp hàng trên row card của sản phẩm nóng).
+
+    # 200 checkout song song (cần DB_POOL_SIZE + DB_MAX_OVERFLOW >= concurrency), tồn 1000
+    python -m tools.scripts.bench_inventory_contention --stock 1000 --concurrency 200 -n 5000
+    python -m tools.scripts.bench_inventory_contention --stock 1000 --concurrency 200 -n 5000 --cards inline
+    # xoá dữ liệu bench
+    python -m tools.scripts.bench_inventory_contention --cleanup
+
+Dùng DATABASE_URL_ASYNC (đã chạy alembic upgrade head). Chỉ chạy trên DB dev / staging.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from packages.core.application.errors import InsufficientStock
+from packages.core.application.inventory.dto import ReserveLine
+from packages.infra.db.session import AsyncSessionLocal, engine
+from packages.infra.jobs.product_cards import ProductCardRefresher
+from packages.infra.repos.core.inventory_repo import InventoryRepo
+from packages.infra.repos.core.product_card_repo import PRODUCT_CARD_CURRENCY, card_refresh_queue, touch_products
+
+_SEED = """
+WITH p AS (
+    INSERT INTO core.products (id, name, slug, specs, is_published)
+    VALUES (gen_random_uuid(), 'Bench hot SKU', 'bench-hot-sku', '{}'::jsonb, true)
+    RETURNING id
+), v AS (
+    INSERT INTO core.product_variants (id, product_id, sku, attributes, status)
+    SELECT gen_random_uuid(), p.id, 'BENCH-HOT-SKU', '{}'::jsonb, 'active' FROM p
+    RETURNING id
+), l AS (
+    INSERT INTO core.inventory_locations (id, code, name)
+    VALUES (gen_random_uuid(), 'BENCH-WH', 'Bench warehouse')
+    RETURNING id
+)
+INSERT INTO core.inventory_levels (variant_id, location_id, on_hand, reserved)
+SELECT v.id, l.id, :stock, 0 FROM v, l
+RETURNING variant_id, location_id
+"""
+
+_LEVEL = """
+SELECT il.on_hand, il.reserved FROM core.inventory_levels il
+WHERE il.variant_id = :variant_id AND il.location_id = :location_id
+"""
+
+_CARD = """
+SELECT c.in_stock FROM core.product_cards c
+JOIN core.product_variants v ON v.product_id = c.product_id
+WHERE v.id = :variant_id
+"""
+
+
+async def cleanup() -> None:
+    async with engine.begin() as conn:
+        # inventory_levels / inventory_reservations / variants xoá theo FK cascade
+        n = (await conn.execute(text("DELETE FROM core.products WHERE slug = 'bench-hot-sku'"))).rowcount
+        await conn.execute(text("DELETE FROM core.inventory_locations WHERE code = 'BENCH-WH'"))
+    print(f"deleted {n} bench product(s)")
+
+
+async def seed(stock: int) -> Tuple[uuid.UUID, uuid.UUID]:
+    await cleanup()
+    async with engine.begin() as conn:
+        row = (await conn.execute(text(_SEED), {"stock": stock})).one()
+    return row.variant_id, row.location_id
+
+
+def _pct(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def run(stock: int, concurrency: int, total: int, qty: int, cards: str) -> None:
+    variant_id, location_id = await seed(stock)
+    refresher = ProductCardRefresher(engine, card_refresh_queue, currency=PRODUCT_CARD_CURRENCY)
+    await refresher._refresh(variant_ids=[variant_id])  # card ban đầu
+    line = ReserveLine(variant_id=variant_id, location_id=location_id, qty=qty)
+    reserve_ms: List[float] = []
+    checkout_ms: List[float] = []
+    sold = rejected = errors = 0
+    todo = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal sold, rejected, errors
+        for _ in todo:
+            t0 = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as session:
+                    repo = InventoryRepo(session)
+                    hold = await repo.reserve([line], reference="bench")
+                    if cards == "inline":
+                        touch_products(session, variant_ids=[variant_id])
+                    await session.commit()  # nhả row lock ngay; hold giữ hàng
+                    reserve_ms.append((time.perf_counter() - t0) * 1000)
+                    await repo.commit(hold.hold_id)
+                    if cards == "inline":
+                        touch_products(session, variant_ids=[variant_id])
+                    await session.commit()
+                sold += 1
+                checkout_ms.append((time.perf_counter() - t0) * 1000)
+            except InsufficientStock:
+                rejected += 1
+            except Exception as e:
+                errors += 1
+                print(f"error: {type(e).__name__}: {e}")
+
+    refresh_ms: List[float] = []
+
+    async def refresh_loop() -> None:
+        # Chỉ phần refresh hoãn của refresher (không quét giá / lệch in_stock toàn bảng)
+        while True:
+            await asyncio.sleep(0.2)
+            t = time.perf_counter()
+            await refresher.refresh_deferred()
+            refresh_ms.append((time.perf_counter() - t) * 1000)
+
+    refreshing = asyncio.create_task(refresh_loop()) if cards == "deferred" else None
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    if refreshing is not None:
+        refreshing.cancel()
+        await refresher.refresh_deferred()  # phần còn lại trong hàng đợi
+        if refresh_ms:
+            print(f"card refresher: {len(refresh_ms)} runs, {refresher.metrics.deferred_refreshed} ids, "
+                  f"p50 {_pct(refresh_ms, 50):.2f} ms, max {max(refresh_ms):.2f} ms")
+
+    async with engine.connect() as conn:
+        on_hand, reserved = (await conn.execute(
+            text(_LEVEL), {"variant_id": variant_id, "location_id": location_id}
+        )).one()
+        in_stock = (await conn.execute(text(_CARD), {"variant_id": variant_id})).scalar_one_or_none()
+    print(f"checkouts {total:,}  concurrency {concurrency}  stock {stock:,}  qty/checkout {qty}  cards {cards}")
+    print(f"sold {sold:,}  insufficient {rejected:,}  errors {errors}  "
+          f"{total / elapsed:,.0f} checkouts/s  ({elapsed:,.2f}s)")
+    for label, samples in (("reserve", reserve_ms), ("checkout", checkout_ms)):
+        if samples:
+            print(
+                f"{label:<9} p50 {_pct(samples, 50):>8.2f} ms  p95 {_pct(samples, 95):>8.2f} ms  "
+                f"p99 {_pct(samples, 99):>8.2f} ms  max {max(samples):>8.2f} ms  (mean {statistics.fmean(samples):.2f})"
+            )
+    expected = stock - sold * qty
+    ok = on_hand == expected and reserved == 0 and on_hand >= 0
+    print(f"on_hand {on_hand:,} (expected {expected:,})  reserved {reserved}  → {'OK, no oversell' if ok else 'MISMATCH'}")
+    print(f"card in_stock {in_stock} (expected {on_hand - reserved > 0})")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stock", type=int, default=1000, help="on_hand ban đầu của SKU nóng")
+    parser.add_argument("--concurrency", type=int, default=50, help="số checkout chạy song song")
+    parser.add_argument("-n", type=int, default=2000, help="tổng số checkout")
+    parser.add_argument("--qty", type=int, default=1, help="số lượng mỗi checkout")
+    parser.add_argument("--cards", choices=["deferred", "inline"], default="deferred",
+                        help="refresh product_cards sau commit (refresher) hay trong transaction checkout")
+    parser.add_argument("--cleanup", action="store_true", help="xoá dữ liệu bench rồi thoát")
+    args = parser.parse_args()
+
+    try:
+        if args.cleanup:
+            await cleanup()
+            return
+        await run(args.stock, args.concurrency, args.n, args.qty, args.cards)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark chi phí auth mỗi request của AsyncJWTService.decode.
+
+    python -m tools.scripts.bench_jwt_auth -n 20000
+
+So sánh: offload sang thread (cách cũ) / verify inline trên loop / cache hit.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+import jwt
+
+from packages.infra.security.tokens_async import AsyncJWTService
+
+SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+async def _timeit(label: str, n: int, fn) -> None:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await fn()
+    per_call = (time.perf_counter() - t0) / n * 1e6
+    print(f"{label:<28} {per_call:>9.1f} µs/request")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    args = parser.parse_args()
+
+    svc = AsyncJWTService(SECRET, issuer="askgear", default_ttl=timedelta(minutes=15))
+    token = await svc.create_access_token("user-1", extra={"roles": ["customer"], "email": "a@b.c"})
+    opts = dict(algorithms=["HS256"], options={"verify_aud": False}, audience=None, issuer="askgear")
+
+    async def threaded():
+        await asyncio.to_thread(jwt.decode, token, SECRET, **opts)
+
+    async def inline():
+        jwt.decode(token, SECRET, **opts)
+
+    await _timeit("to_thread decode (old)", args.n, threaded)
+    await _timeit("inline decode", args.n, inline)
+    await _timeit("AsyncJWTService (cached)", args.n, lambda: svc.decode(token))
+    print("cache:", svc.verified_cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
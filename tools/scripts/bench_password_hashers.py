@@ -0,0 +1,63 @@
+"""
+Benchmark hash/verify latency theo scheme để chọn cost phù hợp ngân sách CPU.
+
+    python -m tools.scripts.bench_password_hashers --rounds 10 12 --argon2 2,65536,4 3,102400,8 -n 20
+
+Mỗi cấu hình in p50/p95 (ms) cho hash và verify, chạy tuần tự trên một core.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+
+from packages.infra.security.passwords_async import MultiSchemeHasher
+
+
+def _pct(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+async def bench(hasher: MultiSchemeHasher, n: int) -> tuple[list[float], list[float]]:
+    hash_s, verify_s = [], []
+    hashed = await hasher.hash("warmup-password")
+    for i in range(n):
+        t0 = time.perf_counter()
+        hashed = await hasher.hash(f"password-{i}")
+        hash_s.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        assert await hasher.verify(f"password-{i}", hashed)
+        verify_s.append(time.perf_counter() - t0)
+    return hash_s, verify_s
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="*", default=[10, 12], help="bcrypt cost")
+    parser.add_argument("--argon2", nargs="*", default=["2,102400,8"], help="time_cost,memory_cost_kib,parallelism")
+    parser.add_argument("-n", type=int, default=10, help="số lần đo mỗi cấu hình")
+    args = parser.parse_args()
+
+    configs: list[tuple[str, MultiSchemeHasher]] = []
+    for r in args.rounds:
+        configs.append((f"bcrypt cost={r}", MultiSchemeHasher("bcrypt", bcrypt_rounds=r)))
+    for spec in args.argon2:
+        t, m, p = (int(x) for x in spec.split(","))
+        configs.append((
+            f"argon2id t={t} m={m}KiB p={p}",
+            MultiSchemeHasher("argon2", argon2_time_cost=t, argon2_memory_cost=m, argon2_parallelism=p),
+        ))
+
+    print(f"{'scheme':<32} {'hash p50':>9} {'hash p95':>9} {'verify p50':>11} {'verify p95':>11} {'verify/s':>9}")
+    for name, hasher in configs:
+        hash_s, verify_s = await bench(hasher, args.n)
+        per_sec = 1 / statistics.mean(verify_s)
+        print(
+            f"{name:<32} {_pct(hash_s, .5):>9.1f} {_pct(hash_s, .95):>9.1f} "
+            f"{_pct(verify_s, .5):>11.1f} {_pct(verify_s, .95):>11.1f} {per_sec:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
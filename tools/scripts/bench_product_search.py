@@ -0,0 +1,145 @@
+"""
+Benchmark độ trễ ProductRepo.search_products trên catalog giả lập (mặc định 1M sản phẩm).
+
+    # seed 1M sản phẩm "bench-*" (trigger tự dựng search_vector), rồi đo
+    python -m tools.scripts.bench_product_search --seed 1000000 -n 50
+    # chỉ đo (đã seed), in thêm EXPLAIN ANALYZE của từng query
+    python -m tools.scripts.bench_product_search -n 50 --explain
+    # xoá dữ liệu bench
+    python -m tools.scripts.bench_product_search --cleanup
+
+Dùng DATABASE_URL_ASYNC (đã chạy alembic upgrade head). Chỉ chạy trên DB dev / staging.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from packages.core.application.catalog.dto import ProductListFilters
+from packages.infra.db.session import AsyncSessionLocal, engine
+from packages.infra.repos.core.product_repo import ProductRepo
+
+QUERIES = [
+    "laptop",            # khớp rộng: nhiều dòng cần rank
+    "ban phim co",       # không dấu → khớp "bàn phím cơ"
+    "chuột không dây",
+    "rtx 40",            # tiền tố
+    "BX-12345",          # model chính xác
+    "bx12345",           # model gõ thiếu dấu gạch → trigram
+    "màn hình 27 inch ips",
+    "zzzz-khong-co",     # không khớp gì
+]
+
+_SEED_BRANDS = """
+INSERT INTO core.brands (id, name, slug)
+SELECT gen_random_uuid(), 'Bench Brand ' || i, 'bench-brand-' || i
+FROM generate_series(1, 50) AS i
+WHERE NOT EXISTS (SELECT 1 FROM core.brands WHERE starts_with(slug, 'bench-brand-'))
+"""
+
+_SEED_PRODUCTS = """
+WITH words AS (
+    SELECT ARRAY['Laptop', 'Bàn phím cơ', 'Chuột không dây', 'Màn hình', 'Tai nghe', 'Card đồ hoạ RTX',
+                 'Ổ cứng SSD', 'Loa bluetooth', 'Máy in', 'Router wifi'] AS kinds,
+           ARRAY['Pro', 'Gaming', 'Văn phòng', 'Mini', 'Ultra', 'Lite', 'Max', 'Air'] AS tiers,
+           (SELECT array_agg(id) FROM core.brands WHERE starts_with(slug, 'bench-brand-')) AS brands
+)
+INSERT INTO core.products (id, brand_id, name, slug, model_number, specs, description, is_published)
+SELECT gen_random_uuid(),
+       w.brands[1 + mod(i, array_length(w.brands, 1))],
+       w.kinds[1 + mod(i, 10)] || ' ' || w.tiers[1 + mod(i / 10, 8)] || ' ' || mod(i, 97),
+       'bench-' || i,
+       'BX-' || i,
+       jsonb_build_object('size', (13 + mod(i, 20)) || ' inch', 'panel', (ARRAY['IPS', 'VA', 'OLED'])[1 + mod(i, 3)],
+                          'switch', (ARRAY['Red', 'Blue', 'Brown'])[1 + mod(i, 3)]),
+       NULL,
+       true
+FROM words w, generate_series(:start, :stop) AS i
+"""
+
+
+async def seed(total: int, chunk: int = 50_000) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(_SEED_BRANDS))
+        existing = (await conn.execute(
+            text("SELECT count(*) FROM core.products WHERE starts_with(slug, 'bench-')")
+        )).scalar_one()
+    start = existing + 1
+    t0 = time.perf_counter()
+    while start <= total:
+        stop = min(start + chunk - 1, total)
+        async with engine.begin() as conn:
+            await conn.execute(text(_SEED_PRODUCTS), {"start": start, "stop": stop})
+        print(f"seeded {stop:>9,} products  ({time.perf_counter() - t0:,.1f}s)")
+        start = stop + 1
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE core.products"))
+
+
+async def cleanup() -> None:
+    async with engine.begin() as conn:
+        n = (await conn.execute(text("DELETE FROM core.products WHERE starts_with(slug, 'bench-')"))).rowcount
+        await conn.execute(text("DELETE FROM core.brands WHERE starts_with(slug, 'bench-brand-')"))
+    print(f"deleted {n:,} bench products")
+
+
+def _pct(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def run(n: int, size: int, explain: bool) -> None:
+    filters = ProductListFilters()
+    print(f"{'query':<24} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for q in QUERIES:
+        samples: List[float] = []
+        hits = 0
+        async with AsyncSessionLocal() as session:
+            repo = ProductRepo(session)
+            await repo.search_products(q, filters, size=size)  # warm cache / plan
+            for _ in range(n):
+                t0 = time.perf_counter()
+                page = await repo.search_products(q, filters, size=size)
+                samples.append((time.perf_counter() - t0) * 1000)
+                hits = len(page.items)
+            if explain:
+                built = repo.search_select(q, filters, size=size)
+                if built is not None:
+                    conn = await session.connection()
+                    sql = str(built[0].compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+                    plan = (await conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + sql)).scalars().all()
+        print(
+            f"{q:<24} {hits:>5} {_pct(samples, 50):>8.2f} {_pct(samples, 95):>8.2f} "
+            f"{_pct(samples, 99):>8.2f} {max(samples):>8.2f}   (mean {statistics.fmean(samples):.2f})"
+        )
+        if explain and built is not None:
+            print("\n".join("    " + line for line in plan))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="đảm bảo có N sản phẩm bench trước khi đo")
+    parser.add_argument("--cleanup", action="store_true", help="xoá dữ liệu bench rồi thoát")
+    parser.add_argument("-n", type=int, default=50, help="số lần đo mỗi query")
+    parser.add_argument("--size", type=int, default=24)
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        if args.cleanup:
+            await cleanup()
+            return
+        if args.seed:
+            await seed(args.seed)
+        await run(args.n, args.size, args.explain)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
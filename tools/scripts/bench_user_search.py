@@ -0,0 +1,148 @@
+"""
+Benchmark admin user search: ILIKE '%q%' cũ (seq scan) so với UserRepo.search_admin (trigram + prefix).
+
+    # seed 1M user "bench-user-*", rồi đo
+    python -m tools.scripts.bench_user_search --seed 1000000 -n 30
+    # chỉ đo, in thêm EXPLAIN ANALYZE của câu mới
+    python -m tools.scripts.bench_user_search -n 30 --explain
+    # xoá dữ liệu bench
+    python -m tools.scripts.bench_user_search --cleanup
+
+Dùng DATABASE_URL_ASYNC (đã chạy alembic upgrade head). Chỉ chạy trên DB dev / staging.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import or_, select, text
+
+from packages.infra.db.models.core.user import User
+from packages.infra.db.session import AsyncSessionLocal, engine
+from packages.infra.repos.core.user_repo import UserRepo
+
+QUERIES = [
+    "bench-user-4242",   # tiền tố email
+    "user-99999",        # chuỗi con của email
+    "nguyen van",        # tên không dấu → khớp "Nguyễn Văn"
+    "Trần Thị",
+    "hoang minh tuan",
+    "ng",                # ngắn: chỉ tiền tố email
+    "zzzz-khong-co",
+]
+
+_SEED_USERS = """
+WITH parts AS (
+    SELECT ARRAY['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng'] AS family,
+           ARRAY['Văn', 'Thị', 'Minh', 'Ngọc', 'Đức', 'Thu', 'Quang', 'Hữu'] AS middle,
+           ARRAY['An', 'Bình', 'Chi', 'Dũng', 'Hà', 'Hùng', 'Lan', 'Long', 'Mai', 'Nam', 'Phúc', 'Tuấn'] AS given
+)
+INSERT INTO core.users (id, email, password_hash, full_name, is_active)
+SELECT gen_random_uuid(),
+       'bench-user-' || i || '@example.test',
+       'x',
+       p.family[1 + mod(i, 10)] || ' ' || p.middle[1 + mod(i / 10, 8)] || ' ' || p.given[1 + mod(i / 80, 12)],
+       mod(i, 50) <> 0
+FROM parts p, generate_series(:start, :stop) AS i
+"""
+
+
+async def seed(total: int, chunk: int = 50_000) -> None:
+    async with engine.begin() as conn:
+        existing = (await conn.execute(
+            text("SELECT count(*) FROM core.users WHERE starts_with(email::text, 'bench-user-')")
+        )).scalar_one()
+    start = existing + 1
+    t0 = time.perf_counter()
+    while start <= total:
+        stop = min(start + chunk - 1, total)
+        async with engine.begin() as conn:
+            await conn.execute(text(_SEED_USERS), {"start": start, "stop": stop})
+        print(f"seeded {stop:>9,} users  ({time.perf_counter() - t0:,.1f}s)")
+        start = stop + 1
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE core.users"))
+
+
+async def cleanup() -> None:
+    async with engine.begin() as conn:
+        n = (await conn.execute(text("DELETE FROM core.users WHERE starts_with(email::text, 'bench-user-')"))).rowcount
+    print(f"deleted {n:,} bench users")
+
+
+def _pct(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def _measure(n: int, fn: Callable[[], Awaitable[int]]) -> tuple[List[float], int]:
+    await fn()  # warm cache / plan
+    samples: List[float] = []
+    hits = 0
+    for _ in range(n):
+        t0 = time.perf_counter()
+        hits = await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, hits
+
+
+async def run(n: int, size: int, explain: bool, legacy: bool) -> None:
+    print(f"{'query':<20} {'impl':<7} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for q in QUERIES:
+        async with AsyncSessionLocal() as session:
+            repo = UserRepo(session)
+
+            async def ranked() -> int:
+                return len((await repo.search_admin(q, size=size)).items)
+
+            async def ilike() -> int:
+                # Cách cũ: ILIKE hai phía, không ORDER BY → seq scan core.users
+                stmt = (
+                    select(User.id, User.email, User.full_name)
+                    .where(or_(User.email.ilike(f"%{q}%"), User.full_name.ilike(f"%{q}%")))
+                    .limit(size)
+                )
+                return len((await session.execute(stmt)).all())
+
+            impls = [("trgm", ranked)] + ([("ilike", ilike)] if legacy else [])
+            for label, fn in impls:
+                samples, hits = await _measure(n, fn)
+                print(
+                    f"{q:<20} {label:<7} {hits:>5} {_pct(samples, 50):>8.2f} {_pct(samples, 95):>8.2f} "
+                    f"{_pct(samples, 99):>8.2f} {max(samples):>8.2f}   (mean {statistics.fmean(samples):.2f})"
+                )
+            if explain:
+                built = repo.search_admin_select(q, size=size)
+                if built is not None:
+                    conn = await session.connection()
+                    sql = str(built[0].compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+                    plan = (await conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + sql)).scalars().all()
+                    print("\n".join("    " + line for line in plan))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="đảm bảo có N user bench trước khi đo")
+    parser.add_argument("--cleanup", action="store_true", help="xoá dữ liệu bench rồi thoát")
+    parser.add_argument("-n", type=int, default=30, help="số lần đo mỗi query")
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--no-legacy", action="store_true", help="bỏ đo ILIKE cũ (chậm trên 1M dòng)")
+    parser.add_argument("--explain", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        if args.cleanup:
+            await cleanup()
+            return
+        if args.seed:
+            await seed(args.seed)
+        await run(args.n, args.size, args.explain, legacy=not args.no_legacy)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())